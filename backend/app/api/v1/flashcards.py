@@ -3,25 +3,57 @@ Flashcard API Router
 Handles text-based flashcard generation
 """
 
-from fastapi import APIRouter, HTTPException
-from app.schemas.flashcard import FlashcardTextRequest, FlashcardResponse
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.schemas.flashcard import (
+    FlashcardTextRequest, FlashcardResponse, FlashcardBatchRequest, FlashcardBatchResponse
+)
+from app.services.document_sessions import discard_document, document_sessions, generate_document
 from app.services.flashcard_service import flashcard_service
 from app.services.stats_service import stats_service
+from app.services.worker_pool import nlp_pool, WorkerPoolError
+from contextlib import aclosing
+import json
 
 router = APIRouter()
 
+stats_service.register_cache("document_sessions", document_sessions)
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def encode_event(event: dict, fmt: str) -> str:
+    """Serialize a stream event as an NDJSON line or an SSE message"""
+    data = json.dumps(event)
+    if fmt == "sse":
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
 @router.post("/text", response_model=FlashcardResponse)
-async def generate_flashcards_from_text(request: FlashcardTextRequest):
+async def generate_flashcards_from_text(request: FlashcardTextRequest, response: Response):
     """
     Generate flashcards from input text
     
     - **text**: Input text for flashcard generation (minimum 10 characters)
+    - **document_id**: Optional id of an edited document; only changed sentences are reprocessed
     
-    Returns generated flashcards with statistics
+    Returns generated flashcards with statistics. Identical texts are served
+    from the result cache (see the X-Cache response header). With a
+    document_id, X-Reused-Sentences reports how much of the previous
+    version was reused.
     """
     try:
-        # Generate flashcards
-        flashcards, text_word_count, flashcard_word_count = flashcard_service.generate_flashcards(request.text)
+        if request.document_id:
+            # Incremental regeneration against the previous version of the document
+            (flashcards, text_word_count, flashcard_word_count), reuse = await nlp_pool.run(
+                generate_document, request.document_id, request.text
+            )
+            response.headers["X-Reused-Sentences"] = f"{reuse['reused']}/{reuse['sentences']}"
+        else:
+            # Generate flashcards (memoized per exact text + pipeline config)
+            (flashcards, text_word_count, flashcard_word_count), cache_hit = await nlp_pool.run(
+                flashcard_service.generate_flashcards_cached, request.text
+            )
+            response.headers["X-Cache"] = "hit" if cache_hit else "miss"
         
         if not flashcards:
             raise HTTPException(status_code=400, detail="Failed to generate flashcards. Text may be too short or invalid.")
@@ -37,5 +69,98 @@ async def generate_flashcards_from_text(request: FlashcardTextRequest):
             flashcard_word_count=flashcard_word_count
         )
         
+    except (HTTPException, WorkerPoolError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating flashcards: {str(e)}")
+
+@router.delete("/sessions/{document_id}")
+async def discard_document_session(document_id: str):
+    """
+    Forget the stored state of an edited document
+    
+    - **document_id**: Id previously sent with /text
+    
+    Sessions live where they were built: with NLP_POOL_MODE=process this
+    reaches one worker, and sessions in other workers expire after SESSION_TTL.
+    """
+    if not await nlp_pool.run(discard_document, document_id):
+        raise HTTPException(status_code=404, detail="Document session not found")
+    return {"message": "Document session discarded"}
+
+@router.post("/batch", response_model=FlashcardBatchResponse)
+async def generate_flashcards_batch(request: FlashcardBatchRequest):
+    """
+    Generate flashcards for many documents in one call
+    
+    - **texts**: List of input texts (each minimum 10 characters)
+    
+    Returns one flashcard result per document, in request order.
+    Documents that yield no flashcards are returned with a count of 0.
+    """
+    try:
+        batch = await nlp_pool.run(flashcard_service.generate_flashcards_batch, request.texts)
+        
+        results = []
+        for flashcards, text_word_count, flashcard_word_count in batch:
+            results.append(FlashcardResponse(
+                flashcards=flashcards,
+                count=len(flashcards),
+                text_word_count=text_word_count,
+                flashcard_word_count=flashcard_word_count
+            ))
+            
+            # Update stats
+            if flashcards:
+                stats_service.increment_flashcards(len(flashcards))
+                stats_service.increment_texts()
+        
+        return FlashcardBatchResponse(
+            results=results,
+            count=sum(result.count for result in results)
+        )
+        
+    except WorkerPoolError:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating flashcards: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error generating flashcards: {str(e)}")
+
+@router.post("/text/stream")
+async def stream_flashcards_from_text(
+    request: FlashcardTextRequest,
+    http_request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson or sse"),
+):
+    """
+    Stream flashcard generation progress and cards as they are selected
+    
+    - **text**: Input text for flashcard generation (minimum 10 characters)
+    - **format**: `ndjson` (default) or `sse`
+    
+    Emits `stage` events (sentence_split, embedding, ranking), one `card`
+    event per flashcard and a final `done` event. Disconnecting stops the
+    remaining pipeline work.
+    """
+    async def body():
+        events = nlp_pool.iterate(flashcard_service.generate_flashcards_stream, request.text)
+        async with aclosing(events):
+            try:
+                async for event in events:
+                    if event["event"] == "done" and event["count"]:
+                        # Update stats
+                        stats_service.increment_flashcards(event["count"])
+                        stats_service.increment_texts()
+                    
+                    yield encode_event(event, format)
+                    
+                    # Closing the events stops the remaining pipeline work
+                    if await http_request.is_disconnected():
+                        break
+            except Exception as e:
+                yield encode_event({"event": "error", "detail": str(e)}, format)
+    
+    return StreamingResponse(
+        body(),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Jobs API Router
+Submit long OCR and flashcard jobs and poll for their results
+"""
+
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from typing import List
+from app.api.v1.ocr import MAX_OCR_PAGES, MAX_REQUEST_UPLOAD_BYTES, MAX_UPLOAD_BYTES, extract_pages_cached
+from app.schemas.flashcard import FlashcardTextRequest
+from app.schemas.job import JobStatusResponse, JobSubmitResponse
+from app.services.flashcard_service import flashcard_service
+from app.services.job_queue import job_queue, job_runner
+from app.services.ocr_service import ocr_service
+from app.services.stats_service import stats_service
+from app.services.worker_pool import nlp_pool, ocr_pool
+from app.utils.file_handler import read_uploads
+from contextlib import aclosing
+import asyncio
+
+router = APIRouter()
+
+async def run_flashcard_pipeline(text: str, progress) -> dict:
+    """
+    Generate flashcards stage by stage, reporting each stage as progress
+    
+    Args:
+        text: Input text
+        progress: Job progress callback
+    
+    Returns:
+        FlashcardResponse fields
+    """
+    flashcards = {}
+    events = nlp_pool.iterate(flashcard_service.generate_flashcards_stream, text)
+    async with aclosing(events):
+        async for event in events:
+            if event["event"] == "stage":
+                details = {key: value for key, value in event.items() if key not in ("event", "stage", "elapsed_ms")}
+                await progress(event["stage"], **details)
+            elif event["event"] == "card":
+                flashcards[event["key"]] = event["text"]
+            elif event["event"] == "done":
+                text_word_count = event["text_word_count"]
+                flashcard_word_count = event["flashcard_word_count"]
+    
+    if not flashcards:
+        raise ValueError("Failed to generate flashcards. Text may be too short or invalid.")
+    await progress("selection", count=len(flashcards))
+    
+    # Update stats
+    stats_service.increment_flashcards(len(flashcards))
+    stats_service.increment_texts()
+    
+    return {
+        "flashcards": flashcards,
+        "count": len(flashcards),
+        "text_word_count": text_word_count,
+        "flashcard_word_count": flashcard_word_count,
+    }
+
+async def run_flashcard_job(params: dict, inputs: List[bytes], progress) -> dict:
+    """Job handler: flashcards from text"""
+    return await run_flashcard_pipeline(params["text"], progress)
+
+async def run_ocr_job(params: dict, inputs: List[bytes], progress) -> dict:
+    """Job handler: OCR uploaded images, optionally followed by flashcard generation"""
+    pages = []
+    for content in inputs:
+        pages.extend(await asyncio.to_thread(ocr_service.split_pages, content))
+    
+    # OCR in pool-sized batches so progress advances page by page
+    results = []
+    batch_size = max(1, ocr_pool.max_workers)
+    for start in range(0, len(pages), batch_size):
+        results.extend(await extract_pages_cached(pages[start:start + batch_size]))
+        await progress("ocr", pages_done=len(results), page_count=len(pages))
+    
+    texts = [result["text"] for result in results]
+    extracted_text = "\n\n".join(text for text in texts if text)
+    if not extracted_text:
+        raise ValueError("No text could be extracted from images")
+    
+    # Update stats
+    stats_service.increment_images(len(results))
+    
+    result = {
+        "pages": texts,
+        "page_count": len(results),
+        "extracted_text": extracted_text,
+        "word_count": len(extracted_text.split()),
+    }
+    if params.get("generate"):
+        result["flashcards"] = await run_flashcard_pipeline(extracted_text, progress)
+    return result
+
+job_runner.register("flashcards", run_flashcard_job)
+job_runner.register("ocr", run_ocr_job)
+
+def submitted(job_id: str, http_request: Request) -> JobSubmitResponse:
+    """Build the 202 response for a queued job and wake the runner"""
+    job_runner.notify()
+    return JobSubmitResponse(
+        job_id=job_id,
+        status="queued",
+        status_url=http_request.url_for("get_job", job_id=job_id).path
+    )
+
+@router.post("/flashcards", response_model=JobSubmitResponse, status_code=202)
+async def submit_flashcard_job(request: FlashcardTextRequest, http_request: Request):
+    """
+    Queue flashcard generation for a long text
+    
+    - **text**: Input text for flashcard generation (minimum 10 characters)
+    
+    Returns a job id immediately; poll the status URL for progress and the result.
+    """
+    job_id = await asyncio.to_thread(job_queue.submit, "flashcards", {"text": request.text})
+    return submitted(job_id, http_request)
+
+@router.post("/ocr", response_model=JobSubmitResponse, status_code=202)
+async def submit_ocr_job(
+    http_request: Request,
+    files: List[UploadFile] = File(...),
+    generate: bool = Form(False),
+):
+    """
+    Queue OCR of one or more images (multi-page TIFFs allowed)
+    
+    - **files**: Image files (PNG, JPG, JPEG, TIFF)
+    - **generate**: Also generate flashcards from the extracted text
+    
+    Returns a job id immediately; poll the status URL for progress and the result.
+    """
+    if len(files) > MAX_OCR_PAGES:
+        raise HTTPException(status_code=413, detail=f"Too many pages (maximum {MAX_OCR_PAGES})")
+    
+    for file in files:
+        if not file.content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail=f"File must be an image: {file.filename}")
+    contents = await read_uploads(files, MAX_UPLOAD_BYTES, MAX_REQUEST_UPLOAD_BYTES)
+    
+    # Count pages from the TIFF headers; the job decodes them later
+    page_count = 0
+    for file, content in zip(files, contents):
+        try:
+            page_count += ocr_service.count_pages(content, limit=MAX_OCR_PAGES)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{file.filename}: {str(e)}")
+    if page_count > MAX_OCR_PAGES:
+        raise HTTPException(status_code=413, detail=f"Too many pages (maximum {MAX_OCR_PAGES})")
+    
+    job_id = await asyncio.to_thread(job_queue.submit, "ocr", {"generate": generate}, contents)
+    return submitted(job_id, http_request)
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    Get a job's status, per-stage progress and, once completed, its result
+    
+    Finished jobs are kept for JOB_RESULT_TTL seconds.
+    """
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    
+    return JobStatusResponse(
+        job_id=job["id"],
+        kind=job["kind"],
+        status=job["status"],
+        progress=job["progress"],
+        result=job["result"],
+        error=job["error"],
+        attempts=job["attempts"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"]
+    )
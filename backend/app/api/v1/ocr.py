@@ -3,19 +3,62 @@ OCR API Router
 Handles image upload and text extraction
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.schemas.ocr import OCRResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from typing import List
+from app.schemas.ocr import OCRResponse, OCRPageResult, OCRPagesResponse
 from app.schemas.flashcard import FlashcardResponse
 from app.services.ocr_service import ocr_service
+from app.services.ocr_cache import ocr_cache
 from app.services.flashcard_service import flashcard_service
 from app.services.stats_service import stats_service
+from app.services.worker_pool import nlp_pool, ocr_pool, WorkerPoolError
+from app.utils.file_handler import read_upload, read_uploads
+import asyncio
 import os
-import uuid
+import time
 
 router = APIRouter()
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Uploads are decoded in memory; the app writes nothing to disk (Starlette
+# still spools multipart files over 1 MB to a temporary file while parsing)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_OCR_PAGES = int(os.getenv("MAX_OCR_PAGES", "100"))
+# All files of one multi-file request together
+MAX_REQUEST_UPLOAD_BYTES = int(os.getenv("MAX_REQUEST_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+
+if ocr_cache is not None:
+    stats_service.register_cache("ocr", ocr_cache)
+
+async def extract_pages_cached(pages: list) -> list:
+    """
+    OCR pages in parallel, reusing cached text for images seen before
+    
+    Args:
+        pages: Raw image bytes, one per page
+        
+    Returns:
+        List of {"text", "duration_ms", "cached"} dicts in page order
+    """
+    if ocr_cache is None:
+        results = await ocr_pool.map(ocr_service.extract_page, pages)
+        return [dict(result, cached=False) for result in results]
+    
+    # Hashing and SQLite lookups stay off the event loop
+    lookups = await asyncio.to_thread(lambda: [ocr_cache.lookup(page) for page in pages])
+    results = [
+        None if text is None else {"text": text, "duration_ms": 0.0, "cached": True}
+        for text, _ in lookups
+    ]
+    
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        extracted = await ocr_pool.map(ocr_service.extract_page, [pages[i] for i in missing])
+        for i, result in zip(missing, extracted):
+            results[i] = dict(result, cached=False)
+        await asyncio.to_thread(lambda: [
+            ocr_cache.store_result(lookups[i][1], results[i]["text"]) for i in missing
+        ])
+    return results
 
 @router.post("/extract", response_model=OCRResponse)
 async def extract_text_from_image(file: UploadFile = File(...)):
@@ -31,20 +74,12 @@ async def extract_text_from_image(file: UploadFile = File(...)):
         if not file.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Save uploaded file
-        file_ext = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # Read upload into memory (capped at MAX_UPLOAD_BYTES)
+        content = await read_upload(file, MAX_UPLOAD_BYTES)
         
-        # Extract text
-        extracted_text = ocr_service.extract_text(file_path)
-        
-        # Clean up
-        os.remove(file_path)
+        # Extract text (or reuse the result for an image seen before)
+        result, = await extract_pages_cached([content])
+        extracted_text = result["text"]
         
         if not extracted_text:
             raise HTTPException(status_code=400, detail="No text could be extracted from image")
@@ -55,10 +90,11 @@ async def extract_text_from_image(file: UploadFile = File(...)):
         return OCRResponse(
             extracted_text=extracted_text,
             word_count=len(extracted_text.split()),
-            success=True
+            success=True,
+            cached=result["cached"]
         )
         
-    except HTTPException:
+    except (HTTPException, WorkerPoolError):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
@@ -77,8 +113,8 @@ async def extract_and_generate_flashcards(file: UploadFile = File(...)):
         ocr_response = await extract_text_from_image(file)
         
         # Generate flashcards
-        flashcards, text_word_count, flashcard_word_count = flashcard_service.generate_flashcards(
-            ocr_response.extracted_text
+        flashcards, text_word_count, flashcard_word_count = await nlp_pool.run(
+            flashcard_service.generate_flashcards, ocr_response.extracted_text
         )
         
         if not flashcards:
@@ -95,7 +131,97 @@ async def extract_and_generate_flashcards(file: UploadFile = File(...)):
             flashcard_word_count=flashcard_word_count
         )
         
-    except HTTPException:
+    except (HTTPException, WorkerPoolError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+@router.post("/extract-pages", response_model=OCRPagesResponse)
+async def extract_text_from_pages(
+    files: List[UploadFile] = File(...),
+    generate: bool = Form(False),
+):
+    """
+    Extract text from many images or a multi-page TIFF in parallel
+    
+    - **files**: Image files (PNG, JPG, JPEG, TIFF); TIFFs may contain many pages
+    - **generate**: Also generate flashcards from the joined text
+    
+    Returns per-page text and timings in upload order, plus flashcards if requested
+    """
+    try:
+        start = time.perf_counter()
+        
+        # Read uploads and split multi-page files
+        for file in files:
+            if not file.content_type.startswith("image/"):
+                raise HTTPException(status_code=400, detail=f"File must be an image: {file.filename}")
+        contents = await read_uploads(files, MAX_UPLOAD_BYTES, MAX_REQUEST_UPLOAD_BYTES)
+        
+        # Count pages from the TIFF headers before decoding any of them
+        page_count = 0
+        for file, content in zip(files, contents):
+            try:
+                page_count += ocr_service.count_pages(content, limit=MAX_OCR_PAGES)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{file.filename}: {str(e)}")
+            if page_count > MAX_OCR_PAGES:
+                raise HTTPException(status_code=413, detail=f"Too many pages (maximum {MAX_OCR_PAGES})")
+        
+        # Decoding stays off the event loop; workers receive per-page bytes
+        pages = []
+        for file, content in zip(files, contents):
+            try:
+                pages.extend(await asyncio.to_thread(ocr_service.split_pages, content))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{file.filename}: {str(e)}")
+        
+        # OCR pages in parallel; results keep page order
+        results = await extract_pages_cached(pages)
+        
+        page_results = [
+            OCRPageResult(
+                page=number,
+                text=result["text"],
+                word_count=len(result["text"].split()),
+                duration_ms=result["duration_ms"],
+                cached=result["cached"]
+            )
+            for number, result in enumerate(results, start=1)
+        ]
+        extracted_text = "\n\n".join(page.text for page in page_results if page.text)
+        
+        if not extracted_text:
+            raise HTTPException(status_code=400, detail="No text could be extracted from images")
+        
+        # Update stats
+        stats_service.increment_images(len(page_results))
+        
+        flashcard_response = None
+        if generate:
+            flashcards, text_word_count, flashcard_word_count = await nlp_pool.run(
+                flashcard_service.generate_flashcards, extracted_text
+            )
+            if flashcards:
+                stats_service.increment_flashcards(len(flashcards))
+                stats_service.increment_texts()
+            flashcard_response = FlashcardResponse(
+                flashcards=flashcards,
+                count=len(flashcards),
+                text_word_count=text_word_count,
+                flashcard_word_count=flashcard_word_count
+            )
+        
+        return OCRPagesResponse(
+            pages=page_results,
+            page_count=len(page_results),
+            extracted_text=extracted_text,
+            word_count=len(extracted_text.split()),
+            total_ms=round((time.perf_counter() - start) * 1000, 1),
+            flashcards=flashcard_response
+        )
+        
+    except (HTTPException, WorkerPoolError):
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error processing images: {str(e)}")
\ No newline at end of file
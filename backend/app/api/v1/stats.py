@@ -4,8 +4,10 @@ Handles usage statistics
 """
 
 from fastapi import APIRouter
-from app.schemas.stats import StatsResponse
+import asyncio
+from app.schemas.stats import StageStatsResponse, StatsResponse
 from app.services.stats_service import stats_service
+from app.services.tracing import stage_histograms
 
 router = APIRouter()
 
@@ -16,9 +18,23 @@ async def get_statistics():
     
     Returns total flashcards, texts, and images processed
     """
-    stats = stats_service.get_stats()
+    # Metrics and cache counters may read SQLite; keep that off the event loop
+    stats = await asyncio.to_thread(stats_service.get_stats)
     return StatsResponse(**stats)
 
+@router.get("/stages", response_model=StageStatsResponse)
+async def get_stage_statistics():
+    """
+    Get recent latency of each processing stage
+    
+    Returns count, mean and percentiles per stage over the rolling window
+    (per server process; see /metrics for cumulative histograms)
+    """
+    return StageStatsResponse(
+        window_seconds=stage_histograms.window_seconds,
+        stages=stage_histograms.summary()
+    )
+
 @router.post("/reset")
 async def reset_statistics():
     """
@@ -26,5 +42,5 @@ async def reset_statistics():
     
     Returns success message
     """
-    stats_service.reset_stats()
+    await asyncio.to_thread(stats_service.reset_stats)
     return {"message": "Statistics reset successfully"}
\ No newline at end of file
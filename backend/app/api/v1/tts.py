@@ -3,14 +3,67 @@ TTS API Router
 Handles text-to-speech conversion
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from app.schemas.tts import TTSRequest, TTSResponse
+from contextlib import aclosing
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.schemas.tts import TTSRequest, TTSResponse, DeckAudioRequest, DeckAudioResponse, DeckCardAudio
 from app.services.tts_service import tts_service
-import uuid
+from app.services.stats_service import stats_service
+from app.services.worker_pool import tts_pool, WorkerPoolError
+from app.utils.file_handler import file_range_response
+from functools import partial
+import os
+import re
 
 router = APIRouter()
 
+stats_service.register_cache("tts", tts_service)
+
+# Cached audio files are named <32 hex digits>.<extension>
+AUDIO_FILENAME = re.compile(r"^[0-9a-f]{32}\.(mp3|wav|zip)$")
+AUDIO_MEDIA_TYPES = {"mp3": "audio/mpeg", "wav": "audio/wav", "zip": "application/zip"}
+
+async def stream_speech_response(text: str, lang: Optional[str], http_request: Request, filename: str = None):
+    """
+    Serve cached audio with Range support, or stream it while it is synthesized
+    
+    Args:
+        text: Text to convert to speech
+        lang: Language code (server default if None)
+        http_request: Incoming request (Range header, disconnect detection)
+        filename: Download filename, if the audio should be an attachment
+        
+    Returns:
+        Ranged file response on a cache hit, streaming response otherwise
+    """
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="No text provided for speech synthesis")
+    
+    backend = tts_service.backend
+    cached_path = await tts_pool.run(tts_service.cached_path, text, lang)
+    if cached_path:
+        return file_range_response(
+            cached_path, http_request.headers.get("range"), backend.media_type,
+            filename=filename, headers={"X-Cache": "hit"}
+        )
+    
+    async def body():
+        # Headers are already sent, so a synthesis error aborts the response
+        chunks = tts_pool.iterate(tts_service.stream_speech, text, lang)
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+                
+                # Closing the chunks cancels the remaining synthesis
+                if await http_request.is_disconnected():
+                    break
+    
+    headers = {"X-Cache": "miss", "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(body(), media_type=backend.media_type, headers=headers)
+
 @router.post("/generate", response_model=TTSResponse)
 async def generate_speech(request: TTSRequest):
     """
@@ -21,35 +74,125 @@ async def generate_speech(request: TTSRequest):
     Returns audio file path
     """
     try:
-        filename = f"{uuid.uuid4()}.mp3"
-        audio_path = tts_service.text_to_speech(request.text, filename)
+        audio_path, cached = await tts_pool.run(
+            tts_service.text_to_speech_cached, request.text, request.lang
+        )
         
         return TTSResponse(
             audio_file=audio_path,
-            success=True
+            success=True,
+            cached=cached
         )
         
+    except WorkerPoolError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating speech: {str(e)}")
 
 @router.post("/generate-and-download")
-async def generate_and_download_speech(request: TTSRequest):
+async def generate_and_download_speech(
+    request: TTSRequest,
+    http_request: Request,
+    stream: bool = Query(False, description="Send audio while it is being synthesized"),
+):
     """
     Generate speech and return audio file for download
     
     - **text**: Text to convert to speech
+    - **stream**: Start sending audio as soon as the first sentence is synthesized
     
-    Returns audio file
+    Returns audio file. Cached audio honors HTTP Range requests.
     """
     try:
-        filename = f"{uuid.uuid4()}.mp3"
-        audio_path = tts_service.text_to_speech(request.text, filename)
+        filename = f"flashcard.{tts_service.backend.extension}"
+        if stream:
+            return await stream_speech_response(request.text, request.lang, http_request, filename)
         
-        return FileResponse(
+        audio_path, cached = await tts_pool.run(
+            tts_service.text_to_speech_cached, request.text, request.lang
+        )
+        
+        return file_range_response(
             audio_path,
-            media_type="audio/mpeg",
-            filename="flashcard.mp3"
+            http_request.headers.get("range"),
+            tts_service.backend.media_type,
+            filename=filename,
+            headers={"X-Cache": "hit" if cached else "miss"}
+        )
+        
+    except (HTTPException, WorkerPoolError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+@router.get("/stream")
+async def stream_speech(
+    http_request: Request,
+    text: str = Query(..., min_length=1, max_length=5000, description="Text to convert to speech"),
+    lang: Optional[str] = Query(None, description="Language code"),
+):
+    """
+    Stream speech for use as an audio element source
+    
+    - **text**: Text to convert to speech
+    - **lang**: Language code (server default if omitted)
+    
+    Browsers start playback with the first synthesized sentence; once
+    cached, the audio supports seeking through Range requests.
+    """
+    try:
+        return await stream_speech_response(text, lang, http_request)
+    except (HTTPException, WorkerPoolError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+@router.get("/audio/{filename}")
+async def get_audio_file(filename: str, http_request: Request):
+    """
+    Serve a previously generated audio file (supports Range requests)
+    
+    - **filename**: Name returned as audio_file by /generate
+    """
+    path = os.path.join(tts_service.audio_dir, filename)
+    if not AUDIO_FILENAME.match(filename) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    
+    media_type = AUDIO_MEDIA_TYPES[filename.rsplit(".", 1)[1]]
+    return file_range_response(path, http_request.headers.get("range"), media_type)
+
+@router.post("/deck", response_model=DeckAudioResponse)
+async def generate_deck_audio(request: DeckAudioRequest, http_request: Request):
+    """
+    Generate audio for a whole deck in one request
+    
+    - **flashcards**: Flashcards as returned by /flashcards/text
+    - **format**: `track` (one file with per-card offsets) or `zip` (one file per card)
+    
+    Cards are synthesized concurrently and cached individually, so cards
+    already spoken through /generate are reused.
+    """
+    try:
+        cards = list(request.flashcards.items())
+        texts = [text for _, text in cards]
+        if not all(text.strip() for text in texts):
+            raise HTTPException(status_code=400, detail="Flashcards must not be empty")
+        
+        # All cards in one pool job, synthesized in parallel
+        audio = await tts_pool.map(partial(tts_service.card_audio, lang=request.lang), texts)
+        deck = await tts_pool.run(tts_service.build_deck, cards, audio, request.format)
+        
+        audio_name = os.path.basename(deck["audio_file"])
+        return DeckAudioResponse(
+            audio_file=deck["audio_file"],
+            audio_url=http_request.url_for("get_audio_file", filename=audio_name).path,
+            format=deck["format"],
+            duration=deck["duration"],
+            count=len(cards),
+            cards=[DeckCardAudio(**card) for card in deck["cards"]]
         )
         
+    except (HTTPException, WorkerPoolError):
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error generating deck audio: {str(e)}")
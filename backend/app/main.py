@@ -3,23 +3,68 @@ Smart Flashcard Generator - FastAPI Backend
 Main application entry point
 """
 
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Load environment variables
 load_dotenv()
 
 # Import routers (we'll create these next)
-from app.api.v1 import flashcards, ocr, tts, stats
+from app.api.v1 import flashcards, ocr, tts, stats, jobs
+from app.services.nlp_pipeline import nlp_pipeline
+from app.services.job_queue import job_runner
+from app.services.metrics import metrics
+from app.services.tracing import request_profiler, start_trace
+from app.services.worker_pool import (
+    nlp_pool, ocr_pool, tts_pool, PoolOverloadedError, JobTimeoutError
+)
+
+# Startup measurements reported by /ready
+startup_info = {"model_loading": "lazy", "warmup_error": None}
+
+async def warm_up_models():
+    """Load NLP models in a worker thread so the event loop keeps serving"""
+    try:
+        await asyncio.to_thread(nlp_pipeline.load)
+        print(f"Models loaded: {nlp_pipeline.load_times}")
+    except Exception as e:
+        startup_info["warmup_error"] = str(e)
+        print(f"Error loading models: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start model warm-up (MODEL_LOADING=eager) and the job runner; stop both on shutdown"""
+    startup_info["model_loading"] = os.getenv("MODEL_LOADING", "eager").lower()
+    warmup = None
+    if startup_info["model_loading"] == "eager":
+        warmup = asyncio.create_task(warm_up_models())
+    await job_runner.start()
+    
+    yield
+    
+    # Running jobs go back to the queue for the next start
+    await job_runner.stop()
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    for pool in (nlp_pool, ocr_pool, tts_pool):
+        pool.shutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
     title=os.getenv("APP_NAME", "Smart Flashcard Generator"),
     description="AI-powered flashcard generation with NLP and OCR",
     version="1.0.0",
-    debug=os.getenv("DEBUG", "false").lower() == "true"
+    debug=os.getenv("DEBUG", "false").lower() == "true",
+    lifespan=lifespan
 )
 
 # CORS configuration (for React frontend)
@@ -31,11 +76,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-endpoint request counts and latency
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route templates keep label cardinality bounded (unmatched paths share one label)
+        route = request.scope.get("route")
+        labels = {"method": request.method, "route": getattr(route, "path", "unmatched")}
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - start, **labels)
+        metrics.inc("http_requests_total", status=status, **labels)
+
+# Per-stage timings as a Server-Timing header; profiles of slow requests when enabled
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    with start_trace(profiling=request_profiler.wants(request.headers)) as trace:
+        response = await call_next(request)
+        # Streaming responses only report stages finished before the headers
+        elapsed = time.perf_counter() - trace.started
+    response.headers["Server-Timing"] = trace.server_timing(elapsed)
+    
+    if trace.profiling and elapsed >= request_profiler.threshold:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        path = await asyncio.to_thread(request_profiler.save, trace, request.method, route, elapsed)
+        if path:
+            response.headers["X-Profile"] = os.path.basename(path)
+    return response
+
 # Include API routers
 app.include_router(flashcards.router, prefix="/api/v1/flashcards", tags=["Flashcards"])
 app.include_router(ocr.router, prefix="/api/v1/ocr", tags=["OCR"])
 app.include_router(tts.router, prefix="/api/v1/tts", tags=["TTS"])
 app.include_router(stats.router, prefix="/api/v1/stats", tags=["Stats"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["Jobs"])
+
+# Worker pool errors
+@app.exception_handler(PoolOverloadedError)
+async def pool_overloaded_handler(request: Request, exc: PoolOverloadedError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(JobTimeoutError)
+async def job_timeout_handler(request: Request, exc: JobTimeoutError):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
 
 # Health check endpoint
 @app.get("/")
@@ -50,4 +137,36 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """
+    Report whether models are loaded and the app can serve quickly
+    
+    With MODEL_LOADING=eager this returns 503 until warm-up finishes;
+    with lazy loading the app is ready and models load on first request.
+    """
+    models_loaded = nlp_pipeline.is_loaded
+    ready = startup_info["warmup_error"] is None and (
+        models_loaded or startup_info["model_loading"] != "eager"
+    )
+    if not ready:
+        response.status_code = 503
+    
+    return {
+        "status": "ready" if ready else "loading",
+        "models_loaded": models_loaded,
+        "model_loading": startup_info["model_loading"],
+        "model_load_seconds": nlp_pipeline.load_times,
+        "import_seconds": startup_info["import_seconds"],
+        "error": startup_info["warmup_error"],
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Counters and latency histograms in the Prometheus text format"""
+    body = await asyncio.to_thread(metrics.render_prometheus)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+startup_info["import_seconds"] = round(time.perf_counter() - _import_started, 3)
+
 # Run with: uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
\ No newline at end of file
@@ -4,11 +4,15 @@ Input validation & response structure
 """
 
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import Annotated, Dict, List, Optional
 
 class FlashcardTextRequest(BaseModel):
     """Request body for text-based flashcard generation"""
     text: str = Field(..., min_length=10, description="Input text for flashcard generation")
+    document_id: Optional[str] = Field(
+        default=None, min_length=1, max_length=128,
+        description="Reuse work from earlier versions of the same document (incremental regeneration)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -35,4 +39,25 @@ class FlashcardResponse(BaseModel):
                 "text_word_count": 15,
                 "flashcard_word_count": 12
             }
-        }
\ No newline at end of file
+        }
+
+class FlashcardBatchRequest(BaseModel):
+    """Request body for generating flashcards from many documents at once"""
+    texts: List[Annotated[str, Field(min_length=10)]] = Field(
+        ..., min_length=1, max_length=500, description="Input texts, one per document"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "texts": [
+                    "Machine learning is a subset of artificial intelligence that focuses on data and algorithms.",
+                    "Photosynthesis converts light energy into chemical energy stored in glucose."
+                ]
+            }
+        }
+
+class FlashcardBatchResponse(BaseModel):
+    """Response structure for batch flashcard generation"""
+    results: List[FlashcardResponse] = Field(..., description="Flashcards per document, in request order")
+    count: int = Field(..., description="Total number of flashcards generated across documents")
@@ -0,0 +1,53 @@
+"""
+Pydantic schemas for background job endpoints
+"""
+
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class JobSubmitResponse(BaseModel):
+    """Response returned as soon as a job is queued"""
+    job_id: str = Field(..., description="Id to poll for status and result")
+    status: str = Field(..., description="Initial job status (queued)")
+    status_url: str = Field(..., description="URL to poll for status and result")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "3f2b8c0e9d6a4f1b8e7c5a2d1f0e9b8c",
+                "status": "queued",
+                "status_url": "/api/v1/jobs/3f2b8c0e9d6a4f1b8e7c5a2d1f0e9b8c"
+            }
+        }
+
+class JobStatusResponse(BaseModel):
+    """Status, progress and result of a background job"""
+    job_id: str = Field(..., description="Job id")
+    kind: str = Field(..., description="Job type (flashcards or ocr)")
+    status: str = Field(..., description="queued, running, completed or failed")
+    progress: List[Dict[str, Any]] = Field(default_factory=list, description="Completed pipeline stages with elapsed time")
+    result: Optional[Dict[str, Any]] = Field(default=None, description="Job result once completed")
+    error: Optional[str] = Field(default=None, description="Error message if the job failed")
+    attempts: int = Field(default=0, description="Times the job was started")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    started_at: Optional[float] = Field(default=None, description="Start of the latest attempt (Unix seconds)")
+    finished_at: Optional[float] = Field(default=None, description="Completion time (Unix seconds)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "3f2b8c0e9d6a4f1b8e7c5a2d1f0e9b8c",
+                "kind": "flashcards",
+                "status": "running",
+                "progress": [
+                    {"stage": "sentence_split", "elapsed_ms": 12.4, "sentences": 48},
+                    {"stage": "embedding", "elapsed_ms": 310.2}
+                ],
+                "result": None,
+                "error": None,
+                "attempts": 1,
+                "created_at": 1700000000.0,
+                "started_at": 1700000000.5,
+                "finished_at": None
+            }
+        }
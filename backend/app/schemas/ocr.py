@@ -3,18 +3,39 @@ Pydantic schemas for OCR endpoints
 """
 
 from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.schemas.flashcard import FlashcardResponse
 
 class OCRResponse(BaseModel):
     """Response for OCR text extraction"""
     extracted_text: str = Field(..., description="Text extracted from image")
     word_count: int = Field(..., description="Word count of extracted text")
     success: bool = Field(default=True, description="Extraction success status")
+    cached: bool = Field(default=False, description="Text was reused from the OCR cache")
     
     class Config:
         json_schema_extra = {
             "example": {
                 "extracted_text": "This is extracted text from image",
                 "word_count": 6,
-                "success": True
+                "success": True,
+                "cached": False
             }
-        }
\ No newline at end of file
+        }
+
+class OCRPageResult(BaseModel):
+    """Text extracted from a single page"""
+    page: int = Field(..., description="Page number, starting at 1, in upload order")
+    text: str = Field(..., description="Text extracted from the page")
+    word_count: int = Field(..., description="Word count of the page text")
+    duration_ms: float = Field(..., description="Preprocessing + OCR time for the page")
+    cached: bool = Field(default=False, description="Text was reused from the OCR cache")
+
+class OCRPagesResponse(BaseModel):
+    """Response for multi-page OCR"""
+    pages: List[OCRPageResult] = Field(..., description="Per-page results in order")
+    page_count: int = Field(..., description="Number of pages processed")
+    extracted_text: str = Field(..., description="Text of all pages joined in order")
+    word_count: int = Field(..., description="Word count of the joined text")
+    total_ms: float = Field(..., description="Wall-clock time for all pages")
+    flashcards: Optional[FlashcardResponse] = Field(default=None, description="Flashcards from the joined text, if requested")
@@ -3,18 +3,48 @@ Pydantic schemas for stats endpoints
 """
 
 from pydantic import BaseModel, Field
+from typing import Any, Dict
 
 class StatsResponse(BaseModel):
     """Response for usage statistics"""
     total_flashcards_generated: int = Field(default=0)
     total_texts_processed: int = Field(default=0)
     total_images_processed: int = Field(default=0)
+    caches: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="Hit/miss counters per cache")
     
     class Config:
         json_schema_extra = {
             "example": {
                 "total_flashcards_generated": 50,
                 "total_texts_processed": 10,
-                "total_images_processed": 5
+                "total_images_processed": 5,
+                "caches": {
+                    "ocr": {"hits": 3, "misses": 5, "hit_rate": 0.375, "size": 5}
+                }
             }
-        }
\ No newline at end of file
+        }
+
+class StageSummary(BaseModel):
+    """Recent latency of one processing stage"""
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+class StageStatsResponse(BaseModel):
+    """Response for rolling per-stage latency"""
+    window_seconds: float
+    stages: Dict[str, StageSummary] = Field(default_factory=dict)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "window_seconds": 300,
+                "stages": {
+                    "embedding": {"count": 42, "mean_ms": 38.2, "p50_ms": 31.0,
+                                  "p95_ms": 90.4, "p99_ms": 120.7, "max_ms": 131.2}
+                }
+            }
+        }
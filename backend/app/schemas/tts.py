@@ -3,10 +3,12 @@ Pydantic schemas for TTS endpoints
 """
 
 from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 
 class TTSRequest(BaseModel):
     """Request for text-to-speech conversion"""
     text: str = Field(..., min_length=1, description="Text to convert to speech")
+    lang: Optional[str] = Field(default=None, description="Language code (server default if omitted)")
     
     class Config:
         json_schema_extra = {
@@ -18,4 +20,39 @@ class TTSRequest(BaseModel):
 class TTSResponse(BaseModel):
     """Response for TTS generation"""
     audio_file: str = Field(..., description="Generated audio filename")
-    success: bool = Field(default=True, description="Generation success status")
\ No newline at end of file
+    success: bool = Field(default=True, description="Generation success status")
+    cached: bool = Field(default=False, description="Existing audio was reused")
+
+class DeckAudioRequest(BaseModel):
+    """Request for whole-deck audio (a FlashcardResponse body is accepted as-is)"""
+    flashcards: Dict[str, str] = Field(..., min_length=1, max_length=200, description="Flashcards as key-value pairs, in deck order")
+    lang: Optional[str] = Field(default=None, description="Language code (server default if omitted)")
+    format: Literal["track", "zip"] = Field(default="track", description="One concatenated track or a zip of per-card files")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "flashcards": {
+                    "Point 1": "Machine learning is a subset of artificial intelligence.",
+                    "Point 2": "It focuses on data and algorithms."
+                },
+                "format": "track"
+            }
+        }
+
+class DeckCardAudio(BaseModel):
+    """Audio for one card of a deck"""
+    key: str = Field(..., description="Flashcard key")
+    text: str = Field(..., description="Flashcard text")
+    file: str = Field(..., description="Card audio file, or entry name inside the zip")
+    offset: Optional[float] = Field(default=None, description="Start of the card in the track, in seconds")
+    duration: float = Field(..., description="Card audio length in seconds")
+
+class DeckAudioResponse(BaseModel):
+    """Response for whole-deck audio"""
+    audio_file: str = Field(..., description="Deck track or archive path")
+    audio_url: str = Field(..., description="URL serving the deck file")
+    format: str = Field(..., description="track or zip")
+    duration: float = Field(..., description="Total audio length in seconds")
+    count: int = Field(..., description="Number of cards")
+    cards: List[DeckCardAudio] = Field(..., description="Per-card audio in deck order")
@@ -0,0 +1,282 @@
+"""
+Document Session Service
+Incremental flashcard regeneration for documents edited between requests
+
+A session keeps a document's sentences, embeddings, similarity graph and
+PageRank scores. Regenerating after an edit re-splits only the changed
+paragraphs, diffs the sentence list, embeds only new sentences, updates
+only their rows and columns of the similarity graph and warm-starts
+PageRank from the previous scores.
+
+Sessions live in process memory; a request that reaches a worker without
+the session simply runs the full pipeline and starts a new one. Pool jobs
+call the module-level generate_document and discard_document, which
+pickle by reference, so with NLP_POOL_MODE=process each worker process
+keeps its own sessions.
+"""
+
+import difflib
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from app.services.flashcard_service import SPARSE_GRAPH_MIN_SENTENCES, FlashcardService
+from app.services.nlp_pipeline import nlp_pipeline, split_paragraphs
+from app.services.ranking import neighbour_graph, normalize_rows, topk_neighbours
+from app.services.tracing import trace_stage
+from app.utils.cache import LRUCache
+
+load_dotenv()
+
+# Above this share of changed sentences, rebuilding from scratch is cheaper
+REBUILD_FRACTION = 0.5
+
+# Beyond this many unchanged runs, copy the reused block with fancy indexing
+MAX_BLOCK_COPIES = 8
+
+
+class DocumentSession:
+    """
+    Pipeline state of one document version
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the stored version"""
+        self.paragraphs: Dict[str, List[str]] = {}
+        self.sentences: List[str] = []
+        self.embeddings: Optional[np.ndarray] = None
+        # Dense documents: full similarity matrix
+        self.similarity: Optional[np.ndarray] = None
+        # Sparse documents: unit vectors and per-row top-k neighbours
+        self.vectors: Optional[np.ndarray] = None
+        self.neighbours: Optional[np.ndarray] = None
+        self.neighbour_sims: Optional[np.ndarray] = None
+        self.scores: Optional[np.ndarray] = None
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the stored version"""
+        arrays = (self.embeddings, self.similarity, self.vectors, self.neighbours, self.neighbour_sims, self.scores)
+        text = sum(len(sentence) for sentence in self.sentences) + sum(len(p) for p in self.paragraphs)
+        return sum(array.nbytes for array in arrays if array is not None) + 2 * text
+
+
+class DocumentSessionService:
+    """
+    Keeps recent document sessions and regenerates flashcards incrementally
+    """
+
+    def __init__(self, max_documents: int = 32, ttl: float = 3600, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_documents: Sessions kept before the least recently used is dropped
+            ttl: Seconds an unused session is kept
+            max_bytes: Memory all sessions may hold together; a dense 2000-sentence
+                document keeps a 16-32 MB similarity matrix
+        """
+        self.sessions = LRUCache(max_size=max_documents, ttl=ttl, max_bytes=max_bytes,
+                                 sizeof=lambda session: session.nbytes)
+        self._lock = threading.Lock()
+
+    def _session(self, document_id: str) -> DocumentSession:
+        with self._lock:
+            session = self.sessions.get(document_id)
+            if session is None:
+                session = DocumentSession()
+            # Re-set to refresh the session's TTL
+            self.sessions.set(document_id, session)
+            return session
+
+    def discard(self, document_id: str) -> bool:
+        """Drop a document's session; returns whether one existed"""
+        return self.sessions.pop(document_id) is not None
+
+    def stats(self) -> dict:
+        """Session count and reuse counters"""
+        return self.sessions.stats()
+
+    def generate(self, document_id: str, text: str) -> Tuple[Tuple[Dict[str, str], int, int], dict]:
+        """
+        Generate flashcards for a new version of a document
+
+        Args:
+            document_id: Client-chosen id shared by all versions of the document
+            text: Full text of the current version
+
+        Returns:
+            Tuple of (generate_flashcards result, {"sentences", "reused", "embedded"})
+        """
+        session = self._session(document_id)
+        with session.lock:
+            result = self._update(session, text)
+        # Re-measure the session against the memory budget
+        if document_id in self.sessions:
+            self.sessions.set(document_id, session)
+        return result
+
+    def _update(self, session: DocumentSession, text: str):
+        # Sentence split, reusing the sentences of unchanged paragraphs
+        with trace_stage("sentence_split"):
+            # Same paragraphs as nlp_pipeline.preprocess_text, so the sentences match a full run
+            paragraphs = split_paragraphs(text)
+            new_paragraphs = list(dict.fromkeys(p for p in paragraphs if p not in session.paragraphs))
+            split = dict(zip(new_paragraphs, nlp_pipeline.preprocess_texts(new_paragraphs))) if new_paragraphs else {}
+            paragraph_sentences = {p: split[p] if p in split else session.paragraphs[p] for p in paragraphs}
+            sentences = [sentence for p in paragraphs for sentence in paragraph_sentences[p]]
+
+        if not sentences:
+            session.reset()
+            return ({}, 0, 0), {"sentences": 0, "reused": 0, "embedded": 0}
+
+        # Map each new sentence to its position in the previous version
+        blocks = []
+        old_index = np.full(len(sentences), -1)
+        matcher = difflib.SequenceMatcher(None, session.sentences, sentences, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                old_index[j1:j2] = np.arange(i1, i2)
+                blocks.append((i1, i2, j1, j2))
+        kept = np.flatnonzero(old_index >= 0)
+        changed = np.flatnonzero(old_index < 0)
+        if len(changed) > REBUILD_FRACTION * len(sentences):
+            kept, changed, blocks = kept[:0], np.arange(len(sentences)), []
+
+        with trace_stage("embedding"):
+            new_embeddings = nlp_pipeline.generate_embeddings([sentences[i] for i in changed]) if len(changed) else None
+            reference = new_embeddings if new_embeddings is not None else session.embeddings
+            embeddings = np.empty((len(sentences), reference.shape[1]), dtype=reference.dtype)
+            if len(kept):
+                embeddings[kept] = session.embeddings[old_index[kept]]
+            if new_embeddings is not None:
+                embeddings[changed] = new_embeddings
+
+        with trace_stage("similarity"):
+            if len(sentences) > SPARSE_GRAPH_MIN_SENTENCES:
+                dense = None
+                vectors, neighbours, neighbour_sims = self._update_sparse(session, embeddings, old_index, kept, changed)
+                similarity = neighbour_graph(neighbours, neighbour_sims, nlp_pipeline.similarity_threshold)
+            else:
+                dense = similarity = self._update_dense(session, embeddings, blocks, old_index, kept, changed)
+                vectors = neighbours = neighbour_sims = None
+
+        # Warm start: previous scores for kept sentences, their mean for new ones
+        nstart = None
+        if len(kept):
+            previous = session.scores[old_index[kept]]
+            nstart = np.full(len(sentences), previous.mean())
+            nstart[kept] = previous
+
+        with trace_stage("pagerank"):
+            scores = nlp_pipeline.rank_sentences_pagerank(similarity, nstart=nstart)
+
+        # Replace the stored version only once every stage has succeeded
+        session.paragraphs = paragraph_sentences
+        session.sentences = sentences
+        session.embeddings = embeddings
+        session.similarity = dense
+        session.vectors, session.neighbours, session.neighbour_sims = vectors, neighbours, neighbour_sims
+        session.scores = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+
+        result = FlashcardService.select_flashcards(text, sentences, scores)
+        return result, {"sentences": len(sentences), "reused": len(kept), "embedded": len(changed)}
+
+    @staticmethod
+    def _update_dense(session: DocumentSession, embeddings: np.ndarray, blocks: list,
+                      old_index: np.ndarray, kept: np.ndarray, changed: np.ndarray) -> np.ndarray:
+        """Reuse the previous similarity matrix, recomputing rows/columns of changed sentences"""
+        if session.similarity is None or not len(kept):
+            return nlp_pipeline.calculate_similarity_matrix(embeddings)
+
+        previous = session.similarity
+        n = len(embeddings)
+        similarity = np.empty((n, n), dtype=previous.dtype)
+        if len(blocks) <= MAX_BLOCK_COPIES:
+            # Unchanged runs map to contiguous blocks; copy them as slices
+            for a1, a2, b1, b2 in blocks:
+                for c1, c2, d1, d2 in blocks:
+                    similarity[b1:b2, d1:d2] = previous[a1:a2, c1:c2]
+        else:
+            similarity[np.ix_(kept, kept)] = previous[np.ix_(old_index[kept], old_index[kept])]
+
+        if len(changed):
+            rows = nlp_pipeline.calculate_similarity_matrix(embeddings[changed], embeddings)
+            similarity[changed] = rows
+            similarity[:, changed] = rows.T
+        return similarity
+
+    @staticmethod
+    def _update_sparse(session: DocumentSession, embeddings: np.ndarray,
+                       old_index: np.ndarray, kept: np.ndarray, changed: np.ndarray):
+        """
+        Update per-row top-k neighbour lists, recomputing only rows that need it
+
+        Returns:
+            Tuple of (unit vectors, neighbour indices, neighbour similarities)
+        """
+        top_k = nlp_pipeline.similarity_top_k
+        block_size = nlp_pipeline.similarity_block_size
+        n = len(embeddings)
+        k = min(top_k, n)
+
+        vectors = np.empty((n, embeddings.shape[1]), dtype=np.float32)
+        if session.vectors is not None:
+            vectors[kept] = session.vectors[old_index[kept]]
+        else:
+            vectors[kept] = normalize_rows(embeddings[kept])
+        vectors[changed] = normalize_rows(embeddings[changed])
+
+        if session.neighbours is None or session.neighbours.shape[1] != k or not len(kept):
+            neighbours, sims = topk_neighbours(vectors, vectors, top_k, block_size)
+        else:
+            old_to_new = np.full(len(session.sentences), -1)
+            old_to_new[old_index[kept]] = kept
+            remapped = old_to_new[session.neighbours[old_index[kept]]]
+
+            # Rows that lost a neighbour to a deletion need a full recomputation
+            lost = (remapped < 0).any(axis=1)
+            merge = kept[~lost]
+            recompute = np.concatenate([changed, kept[lost]])
+
+            neighbours = np.empty((n, k), dtype=np.int64)
+            sims = np.empty((n, k), dtype=np.float32)
+            neighbours[merge] = remapped[~lost]
+            sims[merge] = session.neighbour_sims[old_index[merge]]
+
+            # Other rows only need to consider the new sentences as candidates
+            if len(changed) and len(merge):
+                candidates = vectors[merge] @ vectors[changed].T
+                all_neighbours = np.hstack([neighbours[merge], np.broadcast_to(changed, candidates.shape)])
+                all_sims = np.hstack([sims[merge], candidates])
+                top = np.argpartition(all_sims, -k, axis=1)[:, -k:]
+                neighbours[merge] = np.take_along_axis(all_neighbours, top, axis=1)
+                sims[merge] = np.take_along_axis(all_sims, top, axis=1)
+
+            if len(recompute):
+                neighbours[recompute], sims[recompute] = topk_neighbours(
+                    vectors[recompute], vectors, top_k, block_size
+                )
+
+        return vectors, neighbours, sims
+
+
+# Singleton instance
+document_sessions = DocumentSessionService(
+    max_documents=int(os.getenv("SESSION_MAX_DOCUMENTS", "32")),
+    ttl=float(os.getenv("SESSION_TTL", "3600")),
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024))),
+)
+
+
+def generate_document(document_id: str, text: str) -> Tuple[Tuple[Dict[str, str], int, int], dict]:
+    """document_sessions.generate, importable by worker processes"""
+    return document_sessions.generate(document_id, text)
+
+
+def discard_document(document_id: str) -> bool:
+    """document_sessions.discard, importable by worker processes"""
+    return document_sessions.discard(document_id)
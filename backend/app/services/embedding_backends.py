@@ -0,0 +1,280 @@
+"""
+Embedding Backends
+Sentence embedding engines selected with EMBEDDING_BACKEND
+
+- torch: SentenceTransformer in PyTorch fp32 (default)
+- onnx: the same model exported to ONNX and run with ONNX Runtime
+- onnx-int8: the ONNX export with dynamically quantized int8 weights
+- hashing: hashed word n-gram counts; needs no model download, for
+  offline benchmarks and tests rather than production quality
+
+The ONNX backends export the model once into EMBEDDING_ONNX_DIR (which
+needs torch and sentence-transformers); a server that finds an existing
+export only needs onnxruntime and transformers' tokenizer.
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from typing import List
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKENDS = ("torch", "onnx", "onnx-int8", "hashing")
+
+# Pooling modes the ONNX backend reproduces (sentence-transformers names)
+POOLING_MODES = ("mean", "cls", "max")
+
+META_FILE = "embedder.json"
+
+WORD_PATTERN = re.compile(r"\w+")
+
+_export_lock = threading.Lock()
+
+
+def pool_embeddings(token_embeddings: np.ndarray, attention_mask: np.ndarray, mode: str = "mean") -> np.ndarray:
+    """
+    Pool token embeddings into one vector per sentence
+
+    Args:
+        token_embeddings: Array of shape (batch, tokens, dim)
+        attention_mask: Array of shape (batch, tokens), 1 for real tokens
+        mode: mean, cls or max
+
+    Returns:
+        Array of shape (batch, dim)
+    """
+    mask = attention_mask[..., None].astype(token_embeddings.dtype)
+    if mode == "mean":
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    if mode == "cls":
+        return token_embeddings[:, 0]
+    if mode == "max":
+        return np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+    raise ValueError(f"Unsupported pooling mode: {mode}")
+
+
+def export_dir(model_name: str, root: str) -> str:
+    """Directory holding the ONNX export of a model"""
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name))
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = False) -> str:
+    """
+    Export a SentenceTransformer model to ONNX (and optionally int8)
+
+    The graph covers the transformer only; pooling and normalization
+    settings are read from the SentenceTransformer modules and stored
+    next to the model so ONNXEmbedder can reproduce them in NumPy.
+
+    Args:
+        model_name: SentenceTransformer model name or path
+        output_dir: Directory for model files, tokenizer and metadata
+        quantize: Also write a dynamically quantized int8 model
+
+    Returns:
+        Path of the model file to load (int8 when quantize is set)
+    """
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model-int8.onnx")
+    target = int8_path if quantize else fp32_path
+
+    with _export_lock:
+        if os.path.exists(target) and os.path.exists(os.path.join(output_dir, META_FILE)):
+            return target
+        os.makedirs(output_dir, exist_ok=True)
+
+        if not os.path.exists(fp32_path):
+            import torch
+            from sentence_transformers import SentenceTransformer, models
+
+            st_model = SentenceTransformer(model_name, device="cpu")
+            transformer = st_model[0]
+            pooling = next((m for m in st_model if isinstance(m, models.Pooling)), None)
+            mode = pooling.get_pooling_mode_str() if pooling is not None else "mean"
+            if mode not in POOLING_MODES:
+                raise ValueError(f"Pooling mode {mode} is not supported by the ONNX backend")
+
+            sample = transformer.tokenizer(["Export this sentence."], return_tensors="pt")
+            input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+            class TokenEmbeddings(torch.nn.Module):
+                def __init__(self, model):
+                    super().__init__()
+                    self.model = model
+
+                def forward(self, *inputs):
+                    return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+            dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in input_names + ["token_embeddings"]}
+            partial_path = fp32_path + f".{os.getpid()}.tmp"
+            with torch.no_grad():
+                torch.onnx.export(
+                    TokenEmbeddings(transformer.auto_model).eval(),
+                    tuple(sample[name] for name in input_names),
+                    partial_path,
+                    input_names=input_names,
+                    output_names=["token_embeddings"],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=14,
+                )
+            transformer.tokenizer.save_pretrained(output_dir)
+            with open(os.path.join(output_dir, META_FILE), "w") as f:
+                json.dump({
+                    "model": model_name,
+                    "pooling": mode,
+                    "normalize": any(isinstance(m, models.Normalize) for m in st_model),
+                    "max_length": st_model.max_seq_length,
+                }, f)
+            os.replace(partial_path, fp32_path)
+
+        if quantize and not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            partial_path = int8_path + f".{os.getpid()}.tmp"
+            quantize_dynamic(fp32_path, partial_path, weight_type=QuantType.QInt8)
+            os.replace(partial_path, int8_path)
+
+    return target
+
+
+class ONNXEmbedder:
+    """
+    Exported transformer in ONNX Runtime with pooling done in NumPy
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, intra_op_threads: int = 0,
+                 allow_spinning: bool = False, batch_size: int = 32):
+        """
+        Args:
+            model_dir: Directory written by export_onnx
+            quantized: Load the int8 model instead of fp32
+            intra_op_threads: Threads per inference call (0 = one per physical core)
+            allow_spinning: Let idle ONNX Runtime threads busy-wait for work
+            batch_size: Sentences per inference call
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.batch_size = batch_size
+        with open(os.path.join(model_dir, META_FILE)) as f:
+            meta = json.load(f)
+        self.pooling = meta["pooling"]
+        self.normalize = meta["normalize"]
+        self.max_length = meta["max_length"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        # Spinning threads burn CPU between requests that the other pools need
+        options.add_session_config_entry("session.intra_op.allow_spinning", "1" if allow_spinning else "0")
+        model_file = "model-int8.onnx" if quantized else "model.onnx"
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    def encode(self, sentences: List[str]) -> np.ndarray:
+        """
+        Embed sentences like SentenceTransformer.encode
+
+        Args:
+            sentences: List of sentence strings
+
+        Returns:
+            float32 array of shape (len(sentences), dim)
+        """
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Batch sentences of similar length together to minimize padding
+        order = np.argsort([-len(sentence) for sentence in sentences], kind="stable")
+        batches = []
+        for start in range(0, len(sentences), self.batch_size):
+            batch = [sentences[i] for i in order[start:start + self.batch_size]]
+            encoded = self.tokenizer(
+                batch, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            token_embeddings = self.session.run(None, feed)[0]
+            batches.append(pool_embeddings(token_embeddings, encoded["attention_mask"], self.pooling))
+
+        embeddings = np.empty((len(sentences), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.vstack(batches)
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+
+class HashingEmbedder:
+    """
+    Bag of hashed word unigrams and bigrams, L2-normalized
+
+    Deterministic across processes and machines (crc32, not hash()), and
+    counts are non-negative so cosine similarities stay in [0, 1] like
+    those of a sentence-transformer model.
+    """
+
+    def __init__(self, dim: int = 384):
+        """
+        Args:
+            dim: Embedding dimension (384 matches all-MiniLM-L6-v2)
+        """
+        self.dim = dim
+
+    def encode(self, sentences: List[str]) -> np.ndarray:
+        """
+        Embed sentences like SentenceTransformer.encode
+
+        Args:
+            sentences: List of sentence strings
+
+        Returns:
+            float32 array of shape (len(sentences), dim)
+        """
+        embeddings = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            words = WORD_PATTERN.findall(sentence.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                embeddings[row, zlib.crc32(feature.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.clip(norms, 1e-12, None)
+
+
+def create_embedder(model_name: str, backend: str = None):
+    """
+    Build the embedding engine named by backend or EMBEDDING_BACKEND
+
+    Args:
+        model_name: SentenceTransformer model name or path
+        backend: torch, onnx, onnx-int8 or hashing
+
+    Returns:
+        Object with encode(sentences) -> np.ndarray
+    """
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name)
+    if backend == "hashing":
+        return HashingEmbedder(int(os.getenv("HASHING_EMBEDDING_DIM", "384")))
+
+    quantized = backend == "onnx-int8"
+    model_dir = export_dir(model_name, os.getenv("EMBEDDING_ONNX_DIR", "cache/onnx"))
+    export_onnx(model_name, model_dir, quantize=quantized)
+    return ONNXEmbedder(
+        model_dir,
+        quantized=quantized,
+        intra_op_threads=int(os.getenv("ONNX_INTRA_OP_THREADS", "0")),
+        allow_spinning=os.getenv("ONNX_ALLOW_SPINNING", "false").lower() == "true",
+        batch_size=int(os.getenv("ONNX_BATCH_SIZE", "32")),
+    )
@@ -0,0 +1,119 @@
+"""
+Embedding Batcher Service
+Cross-request micro-batching for sentence embeddings
+Concurrent callers are coalesced into one encode call per short window
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """
+    Collects sentences from concurrent callers and encodes them together
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 256, max_wait_ms: float = 5.0):
+        """
+        Args:
+            encode_fn: Function encoding a list of sentences into an array
+            max_batch_size: Sentences per encode call before flushing early
+            max_wait_ms: How long to wait for more callers after the first
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._active = 0
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def encode(self, sentences: List[str]) -> np.ndarray:
+        """
+        Encode sentences as part of the next shared batch
+
+        Args:
+            sentences: List of sentence strings
+
+        Returns:
+            Array of embeddings aligned with sentences
+        """
+        if not sentences:
+            return self.encode_fn(sentences)
+
+        self._ensure_worker()
+        future = Future()
+        with self._lock:
+            self._active += 1
+        try:
+            self._queue.put((list(sentences), future))
+            return future.result()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self) -> list:
+        """
+        Block for the first request, then gather more until full or timed out
+
+        Waiting stops early once every active caller has joined the batch,
+        so a lone request is never delayed.
+        """
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size and len(pending) < self._active:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            sentences = [s for batch, _ in pending for s in batch]
+            try:
+                embeddings = np.asarray(self.encode_fn(sentences))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(pending)
+
+            # Route each slice back to its caller
+            offset = 0
+            for batch, future in pending:
+                future.set_result(embeddings[offset:offset + len(batch)])
+                offset += len(batch)
+
+    def stats(self) -> dict:
+        """Return batching counters"""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_requests_per_batch": self.requests / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,109 @@
+"""
+Embedding Cache Service
+Content-addressed sentence embedding cache
+In-memory LRU in front of a persistent SQLite store
+"""
+
+import hashlib
+import numpy as np
+from typing import List, Optional
+from app.utils.cache import LRUCache, SQLiteStore
+from app.utils.text_cleaner import text_hash
+
+
+class EmbeddingCache:
+    """
+    Cache of sentence embeddings keyed by (model name, normalized sentence hash)
+    """
+
+    def __init__(self, model_name: str, path: Optional[str] = None,
+                 memory_size: int = 10_000, disk_size: int = 200_000):
+        """
+        Args:
+            model_name: Embedding model the vectors belong to
+            path: SQLite file for the persistent store (memory only if None)
+            memory_size: Entries kept in the in-memory LRU
+            disk_size: Entries kept on disk before LRU eviction
+        """
+        self.model_name = model_name
+        self._model_key = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:16]
+        self.memory = LRUCache(max_size=memory_size)
+        self.disk = SQLiteStore(path, max_entries=disk_size) if path else None
+        self.hits = 0
+        self.misses = 0
+
+        # Invalidate stored vectors when EMBEDDING_MODEL changes
+        if self.disk is not None and self.disk.get_meta("model") != model_name:
+            self.disk.clear()
+            self.disk.set_meta("model", model_name)
+
+    def _key(self, sentence: str) -> str:
+        return f"{self._model_key}:{text_hash(sentence)}"
+
+    def get_many(self, sentences: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings for sentences
+
+        Args:
+            sentences: List of sentence strings
+
+        Returns:
+            List aligned with sentences; None for cache misses
+        """
+        keys = [self._key(s) for s in sentences]
+        vectors = [self.memory.get(key) for key in keys]
+
+        missing = [key for key, vector in zip(keys, vectors) if vector is None]
+        if missing and self.disk is not None:
+            stored = {
+                key: np.frombuffer(blob, dtype=np.float32)
+                for key, blob in self.disk.get_many(missing).items()
+            }
+            for key, vector in stored.items():
+                self.memory.set(key, vector)
+            vectors = [
+                stored.get(key) if vector is None else vector
+                for key, vector in zip(keys, vectors)
+            ]
+
+        found = sum(vector is not None for vector in vectors)
+        self.hits += found
+        self.misses += len(vectors) - found
+        return vectors
+
+    def put_many(self, sentences: List[str], embeddings: np.ndarray):
+        """
+        Store embeddings for sentences
+
+        Args:
+            sentences: List of sentence strings
+            embeddings: Array of shape (len(sentences), dim)
+        """
+        items = {}
+        for sentence, vector in zip(sentences, embeddings):
+            key = self._key(sentence)
+            vector = np.asarray(vector, dtype=np.float32)
+            self.memory.set(key, vector)
+            items[key] = vector.tobytes()
+        if self.disk is not None:
+            self.disk.set_many(items)
+
+    def clear(self):
+        """Drop all cached embeddings and reset counters"""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and cache sizes"""
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_size": len(self.memory),
+            "disk_size": len(self.disk) if self.disk is not None else 0,
+        }
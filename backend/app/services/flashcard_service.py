@@ -5,7 +5,25 @@ Converted from your original flashcard.py
 """
 
 from app.services.nlp_pipeline import nlp_pipeline
-from typing import Dict, Tuple
+from app.services.result_cache import ResultCache
+from app.services.tracing import trace_stage
+from typing import Dict, Iterator, List, Tuple
+import hashlib
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Above this many sentences a sparse top-k graph replaces the dense n x n matrix
+SPARSE_GRAPH_MIN_SENTENCES = int(os.getenv("SPARSE_GRAPH_MIN_SENTENCES", "2000"))
+
+# Whole-result cache for repeated texts
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+result_cache = ResultCache(
+    max_size=int(os.getenv("RESULT_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "3600")),
+)
 
 class FlashcardService:
     """
@@ -45,28 +63,94 @@ class FlashcardService:
         Returns:
             Tuple of (flashcards dict, text_word_count, flashcard_word_count)
         """
-        # Determine number of flashcards
-        num_flashcards = FlashcardService.determine_flashcard_count(text)
-        
         # Preprocess text into sentences
-        sentences = nlp_pipeline.preprocess_text(text)
+        with trace_stage("sentence_split"):
+            sentences = nlp_pipeline.preprocess_text(text)
         
         if not sentences:
             return {}, 0, 0
         
         # Generate embeddings
-        embeddings = nlp_pipeline.generate_embeddings(sentences)
+        with trace_stage("embedding"):
+            embeddings = nlp_pipeline.generate_embeddings(sentences)
+        
+        return FlashcardService.build_flashcards(text, sentences, embeddings)
+    
+    @staticmethod
+    def generate_flashcards_batch(texts: List[str]) -> List[Tuple[Dict[str, str], int, int]]:
+        """
+        Generate flashcards for many documents in one pass
+        
+        Sentences are split with batched spaCy processing and embedded in a
+        single call across all documents; ranking stays per document.
         
-        # Calculate similarity
-        similarity_matrix = nlp_pipeline.calculate_similarity_matrix(embeddings)
+        Args:
+            texts: List of input texts
+            
+        Returns:
+            List of generate_flashcards results, one per text
+        """
+        # Preprocess all texts together
+        with trace_stage("sentence_split"):
+            all_sentences = nlp_pipeline.preprocess_texts(texts)
+        
+        # Embed every sentence of every document in one pass
+        flat_sentences = [sentence for sentences in all_sentences for sentence in sentences]
+        with trace_stage("embedding"):
+            embeddings = nlp_pipeline.generate_embeddings(flat_sentences) if flat_sentences else None
+        
+        results = []
+        offset = 0
+        for text, sentences in zip(texts, all_sentences):
+            if not sentences:
+                results.append(({}, 0, 0))
+                continue
+            
+            doc_embeddings = embeddings[offset:offset + len(sentences)]
+            offset += len(sentences)
+            results.append(FlashcardService.build_flashcards(text, sentences, doc_embeddings))
+        
+        return results
+    
+    @staticmethod
+    def build_flashcards(text: str, sentences: List[str], embeddings) -> Tuple[Dict[str, str], int, int]:
+        """
+        Rank embedded sentences and build the flashcards for one document
         
+        Args:
+            text: Original input text
+            sentences: Sentences of the text
+            embeddings: Sentence embeddings aligned with sentences
+            
+        Returns:
+            Tuple of (flashcards dict, text_word_count, flashcard_word_count)
+        """
         # Rank sentences using PageRank
-        scores = nlp_pipeline.rank_sentences_pagerank(similarity_matrix)
+        scores = FlashcardService.rank_sentences(sentences, embeddings)
+        
+        return FlashcardService.select_flashcards(text, sentences, scores)
+    
+    @staticmethod
+    def select_flashcards(text: str, sentences: List[str], scores: Dict[int, float]) -> Tuple[Dict[str, str], int, int]:
+        """
+        Build the flashcards for one document from its sentence scores
+        
+        Args:
+            text: Original input text
+            sentences: Sentences of the text
+            scores: PageRank score per sentence index
+            
+        Returns:
+            Tuple of (flashcards dict, text_word_count, flashcard_word_count)
+        """
+        # Determine number of flashcards
+        num_flashcards = FlashcardService.determine_flashcard_count(text)
         
         # Extract top sentences
-        selected_sentences = nlp_pipeline.extract_top_sentences(
-            sentences, scores, num_flashcards
-        )
+        with trace_stage("selection"):
+            selected_sentences = nlp_pipeline.extract_top_sentences(
+                sentences, scores, num_flashcards
+            )
         
         # Create flashcards dictionary
         flashcards = {
@@ -80,5 +164,120 @@ class FlashcardService:
         
         return flashcards, text_word_count, flashcard_word_count
 
+    @staticmethod
+    def rank_sentences(sentences: List[str], embeddings) -> Dict[int, float]:
+        """
+        Build the similarity graph and score sentences with PageRank
+        
+        Args:
+            sentences: Sentences of the text
+            embeddings: Sentence embeddings aligned with sentences
+            
+        Returns:
+            Dictionary of sentence indices and their PageRank scores
+        """
+        # Calculate similarity (sparse graph for long documents to bound memory)
+        with trace_stage("similarity"):
+            if len(sentences) > SPARSE_GRAPH_MIN_SENTENCES:
+                similarity_matrix = nlp_pipeline.calculate_sparse_similarity_matrix(embeddings)
+            else:
+                similarity_matrix = nlp_pipeline.calculate_similarity_matrix(embeddings)
+        
+        with trace_stage("pagerank"):
+            return nlp_pipeline.rank_sentences_pagerank(similarity_matrix)
+    
+    @staticmethod
+    def generate_flashcards_stream(text: str) -> Iterator[dict]:
+        """
+        Generate flashcards as a stream of progress and card events
+        
+        Work happens lazily between events, so closing the generator
+        stops the remaining pipeline stages.
+        
+        Args:
+            text: Input text for flashcard generation
+            
+        Yields:
+            Event dicts: "stage" after each pipeline stage, "card" for each
+            selected flashcard, then a final "done" with word counts
+        """
+        start = time.perf_counter()
+        
+        def stage(name: str, **details) -> dict:
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            return {"event": "stage", "stage": name, "elapsed_ms": elapsed_ms, **details}
+        
+        with trace_stage("sentence_split"):
+            sentences = nlp_pipeline.preprocess_text(text)
+        yield stage("sentence_split", sentences=len(sentences))
+        
+        if not sentences:
+            yield {"event": "done", "count": 0, "text_word_count": 0, "flashcard_word_count": 0}
+            return
+        
+        with trace_stage("embedding"):
+            embeddings = nlp_pipeline.generate_embeddings(sentences)
+        yield stage("embedding")
+        
+        scores = FlashcardService.rank_sentences(sentences, embeddings)
+        yield stage("ranking")
+        
+        num_flashcards = FlashcardService.determine_flashcard_count(text)
+        flashcard_word_count = 0
+        count = 0
+        for count, sentence in enumerate(
+            nlp_pipeline.iter_top_sentences(sentences, scores, num_flashcards), start=1
+        ):
+            flashcard_word_count += len(sentence.split())
+            yield {"event": "card", "key": f"Point {count}", "text": sentence}
+        
+        yield {
+            "event": "done",
+            "count": count,
+            "text_word_count": len(text.split()),
+            "flashcard_word_count": flashcard_word_count,
+        }
+    
+    @staticmethod
+    def cache_key(text: str) -> str:
+        """
+        Build the result cache key for a text
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            Hash of the exact text, card count and pipeline configuration
+        """
+        # The raw text, not a normalized form: unicode forms and whitespace
+        # change how spaCy splits sentences and what the cards say
+        key = "\0".join((
+            text,
+            str(FlashcardService.determine_flashcard_count(text)),
+            str(SPARSE_GRAPH_MIN_SENTENCES),
+            nlp_pipeline.config_fingerprint(),
+        ))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def generate_flashcards_cached(text: str) -> Tuple[Tuple[Dict[str, str], int, int], bool]:
+        """
+        Generate flashcards, reusing results for identical texts
+        
+        Args:
+            text: Input text for flashcard generation
+            
+        Returns:
+            Tuple of (generate_flashcards result, cache hit flag)
+        """
+        if not RESULT_CACHE_ENABLED:
+            return FlashcardService.generate_flashcards(text), False
+        
+        (flashcards, text_word_count, flashcard_word_count), hit = result_cache.get_or_compute(
+            FlashcardService.cache_key(text),
+            lambda: FlashcardService.generate_flashcards(text),
+        )
+        return (dict(flashcards), text_word_count, flashcard_word_count), hit
+
 # Singleton instance
 flashcard_service = FlashcardService()
\ No newline at end of file
@@ -0,0 +1,416 @@
+"""
+Job Queue Service
+Persistent background jobs for long OCR and flashcard requests
+
+Jobs are stored in SQLite so they survive restarts and can be claimed by
+any uvicorn worker sharing the database file. Each process runs a
+JobRunner that claims queued jobs up to its concurrency limit and
+executes them through the existing worker pools.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from app.services.worker_pool import PoolOverloadedError
+
+load_dotenv()
+
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+# handler(params, inputs, progress) -> result dict
+JobHandler = Callable[[dict, List[bytes], Callable[..., Awaitable[None]]], Awaitable[dict]]
+
+
+class JobQueueFullError(PoolOverloadedError):
+    """Raised when too many jobs are waiting (mapped to HTTP 503)"""
+
+
+class JobQueue:
+    """
+    SQLite-backed job store shared by all worker processes
+    """
+
+    def __init__(self, path: str, max_queued: int = 1000, max_attempts: int = 3):
+        """
+        Args:
+            path: SQLite database file path
+            max_queued: Queued jobs allowed before submissions are rejected
+            max_attempts: Claims per job before a lost job is marked failed
+        """
+        self.path = path
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for this process (reopened after fork)"""
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "params TEXT NOT NULL, progress TEXT NOT NULL DEFAULT '[]', "
+                "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, heartbeat_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_inputs ("
+                "job_id TEXT NOT NULL, position INTEGER NOT NULL, data BLOB NOT NULL, "
+                "PRIMARY KEY (job_id, position))"
+            )
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def submit(self, kind: str, params: dict, inputs: List[bytes] = ()) -> str:
+        """
+        Add a job to the queue
+
+        Args:
+            kind: Handler name
+            params: JSON-serializable job parameters
+            inputs: Binary inputs (e.g. uploaded images), kept until the job finishes
+
+        Returns:
+            New job id
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+                if queued >= self.max_queued:
+                    raise JobQueueFullError("Job queue is full, try again later")
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, status, params, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, kind, QUEUED, json.dumps(params), time.time()),
+                )
+                conn.executemany(
+                    "INSERT INTO job_inputs (job_id, position, data) VALUES (?, ?, ?)",
+                    [(job_id, position, data) for position, data in enumerate(inputs)],
+                )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """
+        Atomically mark the oldest queued job as running
+
+        Args:
+            worker: Id of the claiming worker
+
+        Returns:
+            Claimed job, or None if the queue is empty
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            # Write lock up front so two processes never claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.rollback()
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, heartbeat_at = ?, progress = '[]' WHERE id = ?",
+                    (RUNNING, worker, now, now, row["id"]),
+                )
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        return self._to_dict(job)
+
+    def inputs(self, job_id: str) -> List[bytes]:
+        """Binary inputs of a job in submission order"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT data FROM job_inputs WHERE job_id = ? ORDER BY position", (job_id,)
+            ).fetchall()
+        return [row["data"] for row in rows]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Current state of a job, or None if unknown or expired"""
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def add_progress(self, job_id: str, event: dict):
+        """Append a progress event to a running job (also refreshes its heartbeat)"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET progress = json_insert(progress, '$[#]', json(?)), heartbeat_at = ? "
+                    "WHERE id = ? AND status = ?",
+                    (json.dumps(event), time.time(), job_id, RUNNING),
+                )
+
+    def heartbeat(self, job_ids: List[str]):
+        """Mark running jobs as still alive"""
+        if not job_ids:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                    [(now, job_id, RUNNING) for job_id in job_ids],
+                )
+
+    def _finish(self, job_id: str, status: str, result: Optional[dict], error: Optional[str]):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+                )
+                conn.execute("DELETE FROM job_inputs WHERE job_id = ?", (job_id,))
+
+    def complete(self, job_id: str, result: dict):
+        """Store a job's result and drop its inputs"""
+        self._finish(job_id, COMPLETED, result, None)
+
+    def fail(self, job_id: str, error: str):
+        """Mark a job as failed and drop its inputs"""
+        self._finish(job_id, FAILED, None, error)
+
+    def release(self, job_ids: List[str]):
+        """Put running jobs back in the queue without counting the attempt"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "UPDATE jobs SET status = ?, worker = NULL, attempts = MAX(attempts - 1, 0) "
+                    "WHERE id = ? AND status = ?",
+                    [(QUEUED, job_id, RUNNING) for job_id in job_ids],
+                )
+
+    def requeue_stale(self, stale_after: float) -> int:
+        """
+        Recover jobs whose worker stopped sending heartbeats
+
+        Args:
+            stale_after: Seconds without a heartbeat before a job counts as lost
+
+        Returns:
+            Number of jobs requeued or failed
+        """
+        cutoff = time.time() - stale_after
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                failed = conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                    "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                    (FAILED, "Worker lost while running the job", time.time(), RUNNING, cutoff, self.max_attempts),
+                ).rowcount
+                conn.execute(
+                    "DELETE FROM job_inputs WHERE job_id IN (SELECT id FROM jobs WHERE status = ?)", (FAILED,)
+                )
+                requeued = conn.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat_at < ?",
+                    (QUEUED, RUNNING, cutoff),
+                ).rowcount
+        return failed + requeued
+
+    def cleanup(self, ttl: float) -> int:
+        """
+        Delete finished jobs older than ttl seconds
+
+        Returns:
+            Number of jobs deleted
+        """
+        cutoff = time.time() - ttl
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                    (COMPLETED, FAILED, cutoff),
+                ).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, COMPLETED, FAILED)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+class JobRunner:
+    """
+    Claims queued jobs and runs their handlers on the event loop
+
+    Handlers do their heavy lifting through the worker pools, so the
+    runner only awaits them; the concurrency limit caps how many jobs
+    this process runs at once.
+    """
+
+    def __init__(self, queue: JobQueue, concurrency: int = 2, poll_interval: float = 0.5,
+                 stale_after: float = 30.0, result_ttl: float = 3600.0):
+        """
+        Args:
+            queue: Job store
+            concurrency: Jobs this process runs at the same time
+            poll_interval: Seconds between queue polls when idle
+            stale_after: Seconds without a heartbeat before a running job is requeued
+            result_ttl: Seconds finished jobs are kept for polling
+        """
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.result_ttl = result_ttl
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self._active: Dict[str, asyncio.Task] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = None
+        self._slots = None
+
+    def register(self, kind: str, handler: JobHandler):
+        """Register the coroutine function that runs jobs of a kind"""
+        self.handlers[kind] = handler
+
+    def notify(self):
+        """Wake the dispatcher after a submission"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Recover lost jobs and start dispatching (call from the app's event loop)"""
+        if self.running:
+            return
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        await asyncio.to_thread(self.queue.requeue_stale, self.stale_after)
+        self._tasks = [
+            asyncio.create_task(self._dispatch()),
+            asyncio.create_task(self._maintain()),
+        ]
+
+    async def stop(self):
+        """Stop dispatching and hand running jobs back to the queue"""
+        tasks = self._tasks + list(self._active.values())
+        self._tasks = []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._active:
+            await asyncio.to_thread(self.queue.release, list(self._active))
+            self._active.clear()
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+            except BaseException:
+                self._slots.release()
+                raise
+
+            if job is None:
+                self._slots.release()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._active[job["id"]] = asyncio.create_task(self._execute(job))
+
+    async def _maintain(self):
+        """Heartbeat running jobs, recover lost ones and drop expired results"""
+        interval = max(self.stale_after / 3, 0.05)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.queue.heartbeat, list(self._active))
+                await asyncio.to_thread(self.queue.requeue_stale, self.stale_after)
+                await asyncio.to_thread(self.queue.cleanup, self.result_ttl)
+            except sqlite3.Error as e:
+                print(f"Error maintaining job queue: {e}")
+
+    async def _execute(self, job: dict):
+        job_id = job["id"]
+        start = time.perf_counter()
+
+        async def progress(stage: str, **details):
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            event = {"stage": stage, "elapsed_ms": elapsed_ms, **details}
+            await asyncio.to_thread(self.queue.add_progress, job_id, event)
+
+        try:
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {job['kind']}")
+            inputs = await asyncio.to_thread(self.queue.inputs, job_id)
+            result = await handler(job["params"], inputs, progress)
+        except asyncio.CancelledError:
+            # Runner is stopping; stop() releases the job
+            raise
+        except PoolOverloadedError:
+            # Pools are busy with interactive requests; back off, then retry
+            await asyncio.to_thread(self.queue.release, [job_id])
+            del self._active[job_id]
+            await asyncio.sleep(self.poll_interval)
+        except Exception as e:
+            await asyncio.to_thread(self.queue.fail, job_id, str(e) or type(e).__name__)
+            del self._active[job_id]
+        else:
+            await asyncio.to_thread(self.queue.complete, job_id, result)
+            del self._active[job_id]
+        self._slots.release()
+
+
+# Singleton instances
+job_queue = JobQueue(
+    path=os.getenv("JOB_DB_PATH", "cache/jobs.sqlite3"),
+    max_queued=int(os.getenv("JOB_MAX_QUEUED", "1000")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+)
+job_runner = JobRunner(
+    job_queue,
+    concurrency=int(os.getenv("JOB_CONCURRENCY", "2")),
+    poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "0.5")),
+    stale_after=float(os.getenv("JOB_STALE_SECONDS", "30")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", "3600")),
+)
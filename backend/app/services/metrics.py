@@ -0,0 +1,290 @@
+"""
+Metrics Service
+Counters and latency histograms shared across threads and worker processes
+
+Each process buffers updates in memory under a lock and periodically adds
+them to a SQLite file, so every uvicorn worker (and OCR worker process)
+contributes to the same totals. Reads flush the local buffer first.
+"""
+
+import atexit
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "flashcards_generated_total": "Flashcards returned to clients",
+    "texts_processed_total": "Texts turned into flashcards",
+    "images_processed_total": "Images run through OCR",
+    "http_requests_total": "HTTP requests by route and status",
+    "http_request_duration_seconds": "Time to produce HTTP response headers",
+    "pipeline_stage_seconds": "Time spent in each processing stage",
+    "ocr_cache_lookups_total": "OCR result cache lookups by result",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Process-safe counters and fixed-bucket histograms
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 1.0,
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Args:
+            path: SQLite file aggregating all processes (per-process memory only if None)
+            flush_interval: Seconds between background flushes of buffered updates
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Updates not yet flushed (without a database, these are the totals)
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], list] = {}
+        self._conn = None
+        self._pid = None
+        self._flusher_pid = None
+
+    # Recording
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add value to a counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._ensure_flusher()
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record a duration in a histogram"""
+        key = (name, _label_key(labels))
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            # Per-bucket counts (last is +Inf), then sum and count
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            histogram[index] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+        self._ensure_flusher()
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of a with-block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # Persistence
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Connection for this process (reopened after fork)"""
+        if not self.path:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                "name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, "
+                "PRIMARY KEY (name, labels))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS histograms ("
+                "name TEXT NOT NULL, labels TEXT NOT NULL, buckets TEXT NOT NULL, "
+                "PRIMARY KEY (name, labels))"
+            )
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _ensure_flusher(self):
+        """Start the background flush thread on first use in this process"""
+        if not self.path or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid != os.getpid():
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+                atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Error flushing metrics: {e}")
+
+    def flush(self):
+        """Add buffered updates to the shared database"""
+        if not self.path:
+            return
+        # Recording threads only wait for the buffer swap, never for SQLite
+        with self._flush_lock:
+            with self._lock:
+                counters, self._counters = self._counters, {}
+                histograms, self._histograms = self._histograms, {}
+            if not counters and not histograms:
+                return
+
+            conn = self._connect()
+            try:
+                # Write lock up front: histogram rows are read, merged and rewritten
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO counters (name, labels, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                    [(name, json.dumps(labels), value) for (name, labels), value in counters.items()],
+                )
+                for (name, labels), deltas in histograms.items():
+                    labels = json.dumps(labels)
+                    row = conn.execute(
+                        "SELECT buckets FROM histograms WHERE name = ? AND labels = ?", (name, labels)
+                    ).fetchone()
+                    if row is not None:
+                        deltas = [a + b for a, b in zip(json.loads(row[0]), deltas)]
+                    conn.execute(
+                        "INSERT OR REPLACE INTO histograms (name, labels, buckets) VALUES (?, ?, ?)",
+                        (name, labels, json.dumps(deltas)),
+                    )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                # Keep the updates for the next attempt
+                with self._lock:
+                    for key, value in counters.items():
+                        self._counters[key] = self._counters.get(key, 0) + value
+                    for key, deltas in histograms.items():
+                        current = self._histograms.get(key)
+                        self._histograms[key] = deltas if current is None else [a + b for a, b in zip(current, deltas)]
+                raise
+
+    # Reading
+
+    def snapshot(self) -> dict:
+        """
+        Current totals across all processes
+
+        Returns:
+            {"counters": {(name, labels): value},
+             "histograms": {(name, labels): [bucket counts..., sum, count]}}
+        """
+        if not self.path:
+            with self._lock:
+                return {
+                    "counters": dict(self._counters),
+                    "histograms": {key: list(value) for key, value in self._histograms.items()},
+                }
+
+        self.flush()
+        with self._flush_lock:
+            conn = self._connect()
+            counters = {
+                (name, tuple(map(tuple, json.loads(labels)))): value
+                for name, labels, value in conn.execute("SELECT name, labels, value FROM counters")
+            }
+            histograms = {
+                (name, tuple(map(tuple, json.loads(labels)))): json.loads(buckets)
+                for name, labels, buckets in conn.execute("SELECT name, labels, buckets FROM histograms")
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def counter_value(self, name: str, **labels) -> float:
+        """Total of one counter (summed over label sets when labels is empty)"""
+        counters = self.snapshot()["counters"]
+        wanted = _label_key(labels)
+        return sum(
+            value for (counter, key), value in counters.items()
+            if counter == name and (not labels or key == wanted)
+        )
+
+    def reset(self, *names: str):
+        """Delete the given metrics (all metrics if none are given)"""
+        with self._flush_lock, self._lock:
+            for store in (self._counters, self._histograms):
+                for key in [key for key in store if not names or key[0] in names]:
+                    del store[key]
+            conn = self._connect()
+            if conn is not None:
+                with conn:
+                    for table in ("counters", "histograms"):
+                        if names:
+                            placeholders = ",".join("?" * len(names))
+                            conn.execute(f"DELETE FROM {table} WHERE name IN ({placeholders})", names)
+                        else:
+                            conn.execute(f"DELETE FROM {table}")
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def header(name: str, kind: str, seen: set):
+            if name not in seen:
+                seen.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        def label_text(labels, extra=()) -> str:
+            pairs = [f'{key}="{_escape(value)}"' for key, value in (*labels, *extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        seen = set()
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            header(name, "counter", seen)
+            lines.append(f"{name}{label_text(labels)} {_number(value)}")
+
+        for (name, labels), values in sorted(snapshot["histograms"].items()):
+            header(name, "histogram", seen)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values[:-2]):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{name}_bucket{label_text(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{label_text(labels)} {_number(values[-2])}")
+            lines.append(f"{name}_count{label_text(labels)} {values[-1]}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+# Singleton instance
+metrics = MetricsRegistry(
+    path=os.getenv("METRICS_DB_PATH", "cache/metrics.sqlite3") or None,
+    flush_interval=float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0")),
+)
@@ -4,47 +4,300 @@ Handles sentence preprocessing, embeddings, and PageRank
 Converted from your original flashcard.py
 """
 
-import spacy
 import numpy as np
-import networkx as nx
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+import scipy.sparse as sp
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
+from app.services.ranking import pagerank, topk_similarity_graph
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_backends import BACKENDS, create_embedder
 
 load_dotenv()
 
+# spaCy components that sentence segmentation does not need
+SEGMENTATION_EXCLUDES = {
+    "full": [],
+    "parser": ["tagger", "attribute_ruler", "lemmatizer", "ner"],
+    "senter": ["parser", "tagger", "attribute_ruler", "lemmatizer", "ner"],
+    "sentencizer": ["tok2vec", "parser", "senter", "tagger", "morphologizer",
+                    "attribute_ruler", "lemmatizer", "ner"],
+}
+
+def load_spacy(model_name: str, mode: str = "parser"):
+    """
+    Load spaCy with only the components needed for sentence splitting
+    
+    Args:
+        model_name: spaCy model package name
+        mode: full, parser, senter or sentencizer
+        
+    Returns:
+        spaCy Language object
+    """
+    import spacy
+    
+    nlp = spacy.load(model_name, exclude=SEGMENTATION_EXCLUDES[mode])
+    
+    if mode == "senter":
+        # Trained sentence recognizer ships disabled in the core models
+        if "senter" in nlp.disabled:
+            nlp.enable_pipe("senter")
+        elif "senter" not in nlp.pipe_names:
+            nlp.add_pipe("sentencizer")
+    elif mode == "sentencizer":
+        nlp.add_pipe("sentencizer")
+    
+    return nlp
+
+# Sentences never span a blank line, so paragraphs are segmented independently
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+def split_paragraphs(text: str) -> list:
+    """
+    Split text at blank lines, dropping empty paragraphs
+    
+    Args:
+        text: Input text string
+        
+    Returns:
+        List of paragraphs in order
+    """
+    return [paragraph for paragraph in PARAGRAPH_BREAK.split(text) if paragraph.strip()]
+
+def chunk_text(text: str, limit: int) -> list:
+    """
+    Split text into chunks of at most limit characters
+    
+    Chunks end at line or sentence boundaries where possible so sentence
+    segmentation is unaffected.
+    
+    Args:
+        text: Input text string
+        limit: Maximum chunk length
+        
+    Returns:
+        List of text chunks
+    """
+    chunks = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = max(window.rfind("\n"), window.rfind(". ") + 1)
+        if cut <= 0:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:]
+    chunks.append(text)
+    return chunks
+
 class NLPPipeline:
     """
     NLP processing pipeline for text analysis
     """
     
     def __init__(self):
-        """Initialize spaCy and SentenceTransformer models"""
+        """Read configuration; models are loaded on first use or by load()"""
         self.spacy_model = os.getenv("SPACY_MODEL", "en_core_web_sm")
         self.embedding_model_name = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
         
-        # Load models
-        self.nlp = spacy.load(self.spacy_model)
-        self.embedder = SentenceTransformer(self.embedding_model_name)
+        # Embedding engine: torch, onnx, onnx-int8 or hashing (see embedding_backends)
+        self.embedding_backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+        if self.embedding_backend not in BACKENDS:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {self.embedding_backend}")
+        
+        # Sentence segmentation mode: full, parser, senter or sentencizer
+        self.segmentation_mode = os.getenv("SPACY_SEGMENTATION", "parser").lower()
+        if self.segmentation_mode not in SEGMENTATION_EXCLUDES:
+            raise ValueError(f"Unknown SPACY_SEGMENTATION mode: {self.segmentation_mode}")
+        self.spacy_chunk_size = int(os.getenv("SPACY_CHUNK_SIZE", "100000"))
+        
+        # spaCy batch settings for multi-document processing
+        self.spacy_batch_size = int(os.getenv("SPACY_BATCH_SIZE", "32"))
+        self.spacy_n_process = int(os.getenv("SPACY_N_PROCESS", "1"))
+        
+        # PageRank settings
+        self.pagerank_damping = float(os.getenv("PAGERANK_DAMPING", "0.85"))
+        self.pagerank_tol = float(os.getenv("PAGERANK_TOL", "1e-6"))
+        self.pagerank_max_iter = int(os.getenv("PAGERANK_MAX_ITER", "100"))
+        
+        # Sparse similarity graph settings
+        self.similarity_top_k = int(os.getenv("SIMILARITY_TOP_K", "100"))
+        self.similarity_threshold = float(os.getenv("SIMILARITY_THRESHOLD", "0.0"))
+        self.similarity_block_size = int(os.getenv("SIMILARITY_BLOCK_SIZE", "1024"))
+        
+        # Sentence embedding cache (only misses reach the model)
+        self.embedding_cache = None
+        if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true":
+            self.embedding_cache = EmbeddingCache(
+                self.embedding_identity,
+                path=os.getenv("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite3") or None,
+                memory_size=int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "10000")),
+                disk_size=int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "200000")),
+            )
+        
+        # Cross-request micro-batching of encode calls
+        self.embedding_batcher = None
+        if os.getenv("EMBEDDING_BATCH_ENABLED", "true").lower() == "true":
+            self.embedding_batcher = EmbeddingBatcher(
+                lambda batch: self.embedder.encode(batch),
+                max_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "256")),
+                max_wait_ms=float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5")),
+            )
+        
+        # Models (loaded lazily)
+        self._nlp = None
+        self._embedder = None
+        self._load_lock = threading.Lock()
+        self.load_times = {}
+    
+    @property
+    def embedding_identity(self) -> str:
+        """Model name plus backend, since quantized vectors differ from fp32"""
+        if self.embedding_backend == "torch":
+            return self.embedding_model_name
+        return f"{self.embedding_model_name}@{self.embedding_backend}"
+    
+    @property
+    def nlp(self):
+        """spaCy pipeline, loaded on first access"""
+        if self._nlp is None:
+            self.load()
+        return self._nlp
+    
+    @property
+    def embedder(self):
+        """Embedding model (SentenceTransformer or ONNX), loaded on first access"""
+        if self._embedder is None:
+            self.load()
+        return self._embedder
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether both models are in memory"""
+        return self._nlp is not None and self._embedder is not None
+    
+    def load(self):
+        """
+        Load spaCy and the embedding model if not loaded yet
+        
+        Safe to call from several threads; models load once and the
+        time each took is recorded in load_times.
+        """
+        with self._load_lock:
+            if self._nlp is None:
+                start = time.perf_counter()
+                self._nlp = load_spacy(self.spacy_model, self.segmentation_mode)
+                self.load_times["spacy"] = round(time.perf_counter() - start, 3)
+            
+            if self._embedder is None:
+                start = time.perf_counter()
+                self._embedder = create_embedder(self.embedding_model_name, self.embedding_backend)
+                self.load_times["embedder"] = round(time.perf_counter() - start, 3)
+    
+    @property
+    def chunk_limit(self) -> int:
+        """Longest text passed to spaCy in one piece"""
+        return min(self.spacy_chunk_size, self.nlp.max_length)
+    
+    def _split_docs(self, docs) -> list:
+        """Extract cleaned sentences from spaCy docs"""
+        return [sent.text.strip() for doc in docs for sent in doc.sents if sent.text.strip()]
+    
+    def config_fingerprint(self) -> str:
+        """
+        Describe every setting that affects pipeline output
+        
+        Returns:
+            String used in result cache keys
+        """
+        return "|".join(str(value) for value in (
+            self.spacy_model,
+            self.segmentation_mode,
+            self.embedding_identity,
+            self.pagerank_damping,
+            self.pagerank_tol,
+            self.pagerank_max_iter,
+            self.similarity_top_k,
+            self.similarity_threshold,
+        ))
     
     def preprocess_text(self, text: str) -> list:
         """
         Split text into sentences using spaCy
         
+        Paragraphs (separated by blank lines) are segmented independently,
+        so a heading without a full stop never merges into the next
+        sentence, and document sessions can re-split only edited
+        paragraphs with the same result. Paragraphs longer than
+        SPACY_CHUNK_SIZE are processed in chunks so nlp.max_length is
+        never exceeded.
+        
         Args:
             text: Input text string
             
         Returns:
             List of cleaned sentences
         """
-        doc = self.nlp(text)
-        sentences = [sent.text.strip() for sent in doc.sents if sent.text.strip()]
-        return sentences
+        return [sentence for sentences in self._segment(split_paragraphs(text)) for sentence in sentences]
+    
+    def preprocess_texts(self, texts: list) -> list:
+        """
+        Split many texts into sentences with batched spaCy processing
+        
+        Each text is segmented exactly as preprocess_text would.
+        
+        Args:
+            texts: List of input text strings
+            
+        Returns:
+            List of sentence lists, one per text
+        """
+        # Paragraphs of all texts go through one nlp.pipe call and are regrouped per text
+        paragraphs, owners = [], []
+        for index, text in enumerate(texts):
+            pieces = split_paragraphs(text)
+            paragraphs.extend(pieces)
+            owners.extend([index] * len(pieces))
+        
+        results = [[] for _ in texts]
+        for owner, sentences in zip(owners, self._segment(paragraphs, self.spacy_n_process)):
+            results[owner].extend(sentences)
+        return results
+    
+    def _segment(self, paragraphs: list, n_process: int = 1) -> list:
+        """
+        Sentences of each paragraph, chunking oversized ones
+        
+        Args:
+            paragraphs: Texts without blank lines
+            n_process: spaCy worker processes for nlp.pipe
+            
+        Returns:
+            List of sentence lists, one per paragraph
+        """
+        chunks, owners = [], []
+        for index, paragraph in enumerate(paragraphs):
+            pieces = chunk_text(paragraph, self.chunk_limit) if len(paragraph) > self.chunk_limit else [paragraph]
+            chunks.extend(pieces)
+            owners.extend([index] * len(pieces))
+        
+        docs = self.nlp.pipe(chunks, batch_size=self.spacy_batch_size, n_process=n_process)
+        results = [[] for _ in paragraphs]
+        for owner, doc in zip(owners, docs):
+            results[owner].extend(self._split_docs([doc]))
+        return results
     
     def generate_embeddings(self, sentences: list) -> np.ndarray:
         """
-        Generate sentence embeddings using SentenceTransformer
+        Generate sentence embeddings with the configured embedding backend
+        
+        Cached embeddings are reused; only unseen sentences are encoded,
+        batched together with concurrent callers.
         
         Args:
             sentences: List of sentence strings
@@ -52,35 +305,79 @@ class NLPPipeline:
         Returns:
             Numpy array of embeddings
         """
-        embeddings = self.embedder.encode(sentences)
-        return embeddings
+        if self.embedding_cache is None or not sentences:
+            return self._encode(sentences)
+        
+        vectors = self.embedding_cache.get_many(sentences)
+        missing = list(dict.fromkeys(s for s, v in zip(sentences, vectors) if v is None))
+        
+        # Encode all cache misses in one batch
+        if missing:
+            encoded = self._encode(missing)
+            self.embedding_cache.put_many(missing, encoded)
+            lookup = dict(zip(missing, encoded))
+            vectors = [lookup[s] if v is None else v for s, v in zip(sentences, vectors)]
+        
+        return np.vstack(vectors).astype(np.float32, copy=False)
     
-    def calculate_similarity_matrix(self, embeddings: np.ndarray) -> np.ndarray:
+    def _encode(self, sentences: list) -> np.ndarray:
+        """Encode sentences, sharing model calls with concurrent requests"""
+        if self.embedding_batcher is None:
+            return self.embedder.encode(sentences)
+        return self.embedding_batcher.encode(sentences)
+    
+    def calculate_similarity_matrix(self, embeddings: np.ndarray, other: np.ndarray = None) -> np.ndarray:
         """
         Calculate cosine similarity between sentence embeddings
         
         Args:
             embeddings: Sentence embeddings
+            other: Optional second set of embeddings (defaults to embeddings)
             
         Returns:
-            Similarity matrix
+            Similarity matrix of shape (len(embeddings), len(other))
         """
-        similarity_matrix = cosine_similarity(embeddings)
+        from sklearn.metrics.pairwise import cosine_similarity
+        
+        similarity_matrix = cosine_similarity(embeddings, other)
         return similarity_matrix
     
-    def rank_sentences_pagerank(self, similarity_matrix: np.ndarray) -> dict:
+    def calculate_sparse_similarity_matrix(self, embeddings: np.ndarray) -> sp.csr_array:
+        """
+        Calculate a sparse top-k cosine similarity graph for large inputs
+        
+        Args:
+            embeddings: Sentence embeddings
+            
+        Returns:
+            Sparse symmetric similarity matrix
+        """
+        return topk_similarity_graph(
+            embeddings,
+            top_k=self.similarity_top_k,
+            threshold=self.similarity_threshold,
+            block_size=self.similarity_block_size,
+        )
+    
+    def rank_sentences_pagerank(self, similarity_matrix: np.ndarray, nstart=None) -> dict:
         """
         Apply PageRank algorithm to identify important sentences
         
         Args:
-            similarity_matrix: Cosine similarity matrix
+            similarity_matrix: Cosine similarity matrix (dense or scipy.sparse)
+            nstart: Optional previous scores to warm-start the iteration
             
         Returns:
             Dictionary of sentence indices and their PageRank scores
         """
-        graph = nx.from_numpy_array(similarity_matrix)
-        scores = nx.pagerank(graph)
-        return scores
+        scores = pagerank(
+            similarity_matrix,
+            damping=self.pagerank_damping,
+            tol=self.pagerank_tol,
+            max_iter=self.pagerank_max_iter,
+            nstart=nstart,
+        )
+        return dict(enumerate(scores.tolist()))
     
     def extract_top_sentences(self, sentences: list, scores: dict, num_sentences: int) -> list:
         """
@@ -94,6 +391,20 @@ class NLPPipeline:
         Returns:
             List of selected important sentences
         """
+        return list(self.iter_top_sentences(sentences, scores, num_sentences))
+    
+    def iter_top_sentences(self, sentences: list, scores: dict, num_sentences: int):
+        """
+        Yield top-ranked sentences one at a time as they are selected
+        
+        Args:
+            sentences: List of all sentences
+            scores: PageRank scores
+            num_sentences: Number of sentences to extract
+            
+        Yields:
+            Selected important sentences in rank order
+        """
         # Rank sentences by score
         ranked_sentences = sorted(
             ((scores[i], s) for i, s in enumerate(sentences)),
@@ -101,11 +412,11 @@ class NLPPipeline:
         )
         
         # Select top sentences, avoid duplicates
-        selected = []
+        selected = 0
         used_phrases = set()
         
         for _, sentence in ranked_sentences:
-            if len(selected) >= num_sentences:
+            if selected >= num_sentences:
                 break
                 
             cleaned = sentence.strip()
@@ -115,10 +426,9 @@ class NLPPipeline:
                 if not trimmed.endswith('.'):
                     trimmed += '.'
                     
-                selected.append(trimmed)
+                selected += 1
                 used_phrases.add(trimmed)
-        
-        return selected
+                yield trimmed
 
 # Singleton instance
 nlp_pipeline = NLPPipeline()
\ No newline at end of file
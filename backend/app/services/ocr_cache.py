@@ -0,0 +1,215 @@
+"""
+OCR Cache Service
+Reuses extracted text for images that were already processed
+Exact content hash lookups with an optional perceptual hash fallback
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+from app.services.metrics import MetricsRegistry, metrics
+from app.services.ocr_service import ocr_service
+from app.utils.cache import SQLiteStore
+
+load_dotenv()
+
+# dHash grid (HASH_SIZE x HASH_SIZE bits)
+HASH_SIZE = 16
+# Brightness steps below this are treated as flat (JPEG noise on white backgrounds)
+HASH_MIN_GRADIENT = 2
+
+# Lookups by result label ("exact", "perceptual" or "miss")
+LOOKUPS_METRIC = "ocr_cache_lookups_total"
+
+
+def content_hash(image) -> str:
+    """SHA-256 of raw image bytes, or of a decoded array and its shape"""
+    if isinstance(image, np.ndarray):
+        digest = hashlib.sha256(str(image.shape).encode("utf-8"))
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+    return hashlib.sha256(image).hexdigest()
+
+
+def perceptual_hash(image) -> Optional[int]:
+    """
+    Difference hash that survives re-encoding, resizing and small lighting changes
+
+    Args:
+        image: Raw image bytes or BGR/grayscale array
+
+    Returns:
+        HASH_SIZE * HASH_SIZE bit integer, or None if the image can't be decoded
+    """
+    if isinstance(image, np.ndarray):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    else:
+        # Reduced decoding keeps this cheap for large JPEG photos
+        gray = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if gray is None:
+            return None
+
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1] + HASH_MIN_GRADIENT).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class OCRResultCache:
+    """
+    Persistent cache of OCR text keyed by image content
+
+    Entries are stored in a bounded SQLite file with LRU eviction. When
+    perceptual matching is enabled, a miss on the exact hash falls back to
+    the closest stored image within max_distance differing hash bits, so a
+    re-encoded or resized slide reuses the earlier result. Slides that differ
+    by a single word can hash a few bits apart, so keep max_distance small.
+
+    Hit and miss counts are kept in a metrics registry, so with the shared
+    registry they add up across worker processes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10_000,
+                 perceptual: bool = False, max_distance: int = 4,
+                 fingerprint: str = "", registry: MetricsRegistry = None):
+        """
+        Args:
+            path: SQLite file for the store (":memory:" if None)
+            max_entries: Entries kept before the least recently used are evicted
+            perceptual: Fall back to perceptual hash matching on exact misses
+            max_distance: Maximum differing dHash bits for a perceptual match
+            fingerprint: OCR settings; stored results are dropped when it changes
+            registry: Metrics registry for lookup counts (per-instance memory if None)
+        """
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.store = SQLiteStore(path or ":memory:", max_entries=max_entries)
+        self.metrics = registry or MetricsRegistry()
+        self._index = None  # content key -> perceptual hash, loaded on first use
+        self._lock = threading.Lock()
+
+        # Results from other preprocessing/Tesseract settings are not reusable
+        if self.store.get_meta("fingerprint") != fingerprint:
+            self.store.clear()
+            self.store.set_meta("fingerprint", fingerprint)
+
+    def _load_index(self) -> dict:
+        """Perceptual hashes of stored entries (caller holds the lock)"""
+        if self._index is None or len(self._index) > 1.2 * self.store.max_entries:
+            self._index = {}
+            for key, value in self.store.items().items():
+                phash = json.loads(value).get("phash")
+                if phash is not None:
+                    self._index[key] = int(phash, 16)
+        return self._index
+
+    def _closest(self, phash: int) -> Optional[Tuple[str, str]]:
+        """Closest stored (key, text) within max_distance, skipping evicted entries"""
+        with self._lock:
+            index = self._load_index()
+            candidates = sorted(
+                (bin(phash ^ other).count("1"), key) for key, other in index.items()
+            )
+            for distance, key in candidates:
+                if distance > self.max_distance:
+                    break
+                value = self.store.get(key)
+                if value is not None:
+                    return key, json.loads(value)["text"]
+                del index[key]
+        return None
+
+    def lookup(self, image) -> Tuple[Optional[str], dict]:
+        """
+        Find cached text for an image
+
+        Args:
+            image: Raw image bytes or decoded array
+
+        Returns:
+            (text or None, signature to pass to store_result() on a miss)
+        """
+        key = content_hash(image)
+        signature = {"key": key, "phash": None}
+
+        value = self.store.get(key)
+        if value is not None:
+            self.metrics.inc(LOOKUPS_METRIC, result="exact")
+            return json.loads(value)["text"], signature
+
+        if self.perceptual:
+            signature["phash"] = perceptual_hash(image)
+            if signature["phash"] is not None:
+                match = self._closest(signature["phash"])
+                if match is not None:
+                    self.metrics.inc(LOOKUPS_METRIC, result="perceptual")
+                    return match[1], signature
+
+        self.metrics.inc(LOOKUPS_METRIC, result="miss")
+        return None, signature
+
+    def store_result(self, signature: dict, text: str):
+        """
+        Store extracted text for an image looked up with lookup()
+
+        Args:
+            signature: Second value returned by lookup()
+            text: Extracted text
+        """
+        phash = signature["phash"]
+        value = {"text": text, "phash": None if phash is None else format(phash, "x")}
+        self.store.set(signature["key"], json.dumps(value).encode("utf-8"))
+        if phash is not None:
+            with self._lock:
+                if self._index is not None:
+                    self._index[signature["key"]] = phash
+
+    def clear(self):
+        """Drop all cached results and reset counters"""
+        self.store.clear()
+        with self._lock:
+            self._index = None
+        self.metrics.reset(LOOKUPS_METRIC)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and store size"""
+        counters = self.metrics.snapshot()["counters"]
+        exact_hits, perceptual_hits, misses = (
+            int(counters.get((LOOKUPS_METRIC, (("result", result),)), 0))
+            for result in ("exact", "perceptual", "miss")
+        )
+        hits = exact_hits + perceptual_hits
+        total = hits + misses
+        return {
+            "hits": hits,
+            "exact_hits": exact_hits,
+            "perceptual_hits": perceptual_hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "size": len(self.store),
+            "max_size": self.store.max_entries,
+        }
+
+
+def _create_cache() -> Optional[OCRResultCache]:
+    """Build the OCR cache from OCR_CACHE_* environment variables"""
+    if os.getenv("OCR_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return OCRResultCache(
+        path=os.getenv("OCR_CACHE_PATH", "cache/ocr.sqlite3") or None,
+        max_entries=int(os.getenv("OCR_CACHE_MAX_ENTRIES", "10000")),
+        perceptual=os.getenv("OCR_CACHE_PERCEPTUAL", "false").lower() == "true",
+        max_distance=int(os.getenv("OCR_CACHE_MAX_DISTANCE", "4")),
+        fingerprint=ocr_service.config_fingerprint(),
+        registry=metrics,
+    )
+
+
+# Singleton instance (None when disabled)
+ocr_cache = _create_cache()
@@ -8,10 +8,32 @@ import cv2
 import pytesseract
 import numpy as np
 import os
+import struct
+import threading
+import time
 from dotenv import load_dotenv
+from app.services.tracing import trace_stage
+
+# Optional in-process Tesseract bindings (pip install tesserocr; needs libtesseract)
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
 
 load_dotenv()
 
+# Longest side of the downsampled copy used to analyse layout
+ANALYSIS_MAX_DIMENSION = 1024
+
+TESSERACT_CONFIG = "--psm 6 --oem 3"
+
+# Struct byte order for each TIFF header (little- and big-endian)
+TIFF_BYTE_ORDERS = {b"II*\x00": "<", b"MM\x00*": ">"}
+
+# Resident Tesseract handles per thread, keyed by (tessdata path, language).
+# Kept outside OCRService so the service stays picklable for process pools.
+_engines = threading.local()
+
 class OCRService:
     """
     Service for extracting text from images
@@ -22,26 +44,122 @@ class OCRService:
         tesseract_cmd = os.getenv("TESSERACT_CMD")
         if tesseract_cmd:
             pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        
+        # Adaptive preprocessing (text height in pixels; 0 disables rescaling).
+        # Cropping and rescaling stay opt-in until benchmarks.bench_ocr_preprocess
+        # has measured their accuracy with Tesseract (e.g. OCR_TARGET_TEXT_HEIGHT=30).
+        self.target_text_height = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", "0"))
+        self.max_dimension = int(os.getenv("OCR_MAX_DIMENSION", "3000"))
+        self.crop_to_text = os.getenv("OCR_CROP_TO_TEXT", "false").lower() == "true"
+        self.deskew = os.getenv("OCR_DESKEW", "false").lower() == "true"
+        
+        # OCR engine: resident libtesseract handles or one tesseract process per image
+        self.backend = self._select_backend(os.getenv("OCR_BACKEND", "auto").lower())
+        self.tessdata_path = os.getenv("TESSDATA_PATH")
+        self.language = os.getenv("OCR_LANGUAGE", "eng")
+    
+    @staticmethod
+    def _select_backend(requested: str) -> str:
+        """Resolve OCR_BACKEND (auto, tesserocr or pytesseract) to an available backend"""
+        if requested not in ("auto", "tesserocr", "pytesseract"):
+            raise ValueError(f"Unknown OCR_BACKEND: {requested}")
+        if requested == "pytesseract":
+            return "pytesseract"
+        if tesserocr is None:
+            if requested == "tesserocr":
+                print("tesserocr is not installed, falling back to pytesseract")
+            return "pytesseract"
+        return "tesserocr"
+    
+    def _tesseract_api(self):
+        """
+        Engine handle for the current thread, created on first use
+        
+        Loading language data takes far longer than recognizing a small
+        image, so each worker thread/process keeps its handle for reuse.
+        """
+        apis = getattr(_engines, "apis", None)
+        if apis is None:
+            apis = _engines.apis = {}
+        key = (self.tessdata_path, self.language)
+        api = apis.get(key)
+        if api is None:
+            kwargs = {"path": self.tessdata_path} if self.tessdata_path else {}
+            api = tesserocr.PyTessBaseAPI(
+                lang=self.language,
+                psm=tesserocr.PSM.SINGLE_BLOCK,
+                oem=tesserocr.OEM.DEFAULT,
+                **kwargs
+            )
+            apis[key] = api
+        return api
+    
+    def recognize(self, processed: np.ndarray) -> str:
+        """
+        Run Tesseract on a preprocessed grayscale image
+        
+        Args:
+            processed: 8-bit single-channel image
+            
+        Returns:
+            Raw recognized text
+        """
+        if self.backend == "tesserocr":
+            api = self._tesseract_api()
+            height, width = processed.shape
+            api.SetImageBytes(np.ascontiguousarray(processed).tobytes(), width, height, 1, width)
+            return api.GetUTF8Text()
+        
+        return pytesseract.image_to_string(
+            processed, 
+            lang=self.language,
+            config=TESSERACT_CONFIG
+        )
+    
+    def load_image(self, source) -> np.ndarray:
+        """
+        Load an image from a path, raw bytes or an already decoded array
+        
+        Args:
+            source: File path, bytes-like object (decoded in memory) or BGR array
+            
+        Returns:
+            BGR image as numpy array
+        """
+        if isinstance(source, np.ndarray):
+            return source
+        
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError("Unable to decode image data")
+            return img
+        
+        img = cv2.imread(source)
+        if img is None:
+            raise FileNotFoundError(f"Unable to load image: {source}")
+        return img
     
-    def preprocess_image(self, image_path: str) -> np.ndarray:
+    def preprocess_image(self, image) -> np.ndarray:
         """
         Preprocess image for better OCR accuracy
         
         Args:
-            image_path: Path to image file
+            image: Image file path, raw image bytes or BGR array
             
         Returns:
             Preprocessed image as numpy array
         """
         try:
             # Load image
-            img = cv2.imread(image_path)
-            if img is None:
-                raise FileNotFoundError(f"Unable to load image: {image_path}")
+            img = self.load_image(image)
             
             # Convert to grayscale
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             
+            # Crop to text, normalize text size and straighten before thresholding
+            gray = self.normalize_layout(gray)
+            
             # Apply Gaussian blur
             blurred = cv2.GaussianBlur(gray, (5, 5), 0)
             
@@ -58,28 +176,238 @@ class OCRService:
             print(f"Error preprocessing image: {e}")
             return None
     
-    def extract_text(self, image_path: str) -> str:
+    def normalize_layout(self, gray: np.ndarray) -> np.ndarray:
+        """
+        Crop to text regions, rescale to the target text height and deskew
+        
+        Layout is analysed on a small downsampled copy so the cost does not
+        grow with camera resolution; only the final crop and resize touch
+        the full-resolution image.
+        
+        Args:
+            gray: Grayscale image
+            
+        Returns:
+            Grayscale image ready for thresholding
+        """
+        height, width = gray.shape
+        proxy_scale = min(1.0, ANALYSIS_MAX_DIMENSION / max(height, width))
+        proxy = cv2.resize(gray, None, fx=proxy_scale, fy=proxy_scale, interpolation=cv2.INTER_AREA) \
+            if proxy_scale < 1.0 else gray
+        
+        # Dark text becomes foreground
+        _, binary = cv2.threshold(proxy, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        
+        if self.crop_to_text:
+            box = self._text_bounding_box(binary)
+            if box is not None:
+                x, y, w, h = (int(round(v / proxy_scale)) for v in box)
+                pad = max(10, int(0.01 * max(height, width)))
+                x0, y0 = max(0, x - pad), max(0, y - pad)
+                x1, y1 = min(width, x + w + pad), min(height, y + h + pad)
+                gray = gray[y0:y1, x0:x1]
+                bx, by = int(x0 * proxy_scale), int(y0 * proxy_scale)
+                binary = binary[by:int(y1 * proxy_scale) + 1, bx:int(x1 * proxy_scale) + 1]
+        
+        scale = self._resolution_scale(binary, proxy_scale, gray.shape)
+        if abs(scale - 1.0) > 0.1:
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+        
+        if self.deskew:
+            angle = self.estimate_skew(binary)
+            if abs(angle) > 0.5:
+                gray = self._rotate(gray, angle)
+        
+        return gray
+    
+    def _text_bounding_box(self, binary: np.ndarray):
+        """Union bounding box (x, y, w, h) of text-like blocks, or None"""
+        # Merge characters into words/lines so text forms solid blocks
+        kernel_width = max(3, binary.shape[1] // 50)
+        blocks = cv2.dilate(binary, cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_width, 3)))
+        contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        min_area = 0.0005 * binary.shape[0] * binary.shape[1]
+        boxes = [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) >= min_area]
+        # Ignore blocks spanning the whole image (page borders, shadows)
+        boxes = [b for b in boxes if b[2] < 0.98 * binary.shape[1] or b[3] < 0.98 * binary.shape[0]]
+        if not boxes:
+            return None
+        
+        x0 = min(b[0] for b in boxes)
+        y0 = min(b[1] for b in boxes)
+        x1 = max(b[0] + b[2] for b in boxes)
+        y1 = max(b[1] + b[3] for b in boxes)
+        return x0, y0, x1 - x0, y1 - y0
+    
+    def _resolution_scale(self, binary: np.ndarray, proxy_scale: float, shape: tuple) -> float:
+        """Scale factor bringing median character height to the target"""
+        scale = 1.0
+        if self.target_text_height > 0:
+            count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+            heights = stats[1:count, cv2.CC_STAT_HEIGHT]
+            widths = stats[1:count, cv2.CC_STAT_WIDTH]
+            # Character-like components only (skip specks, lines and blocks)
+            plausible = (heights >= 3) & (heights < 0.2 * binary.shape[0]) & (widths < 5 * heights)
+            if plausible.sum() >= 5:
+                text_height = np.median(heights[plausible]) / proxy_scale
+                scale = min(2.0, self.target_text_height / text_height)
+        
+        if self.max_dimension > 0:
+            scale = min(scale, self.max_dimension / max(shape))
+        return scale
+    
+    @staticmethod
+    def estimate_skew(binary: np.ndarray) -> float:
+        """
+        Estimate text rotation in degrees from foreground pixels
+        
+        Args:
+            binary: Binary image with text as foreground (255)
+            
+        Returns:
+            Counter-clockwise angle that straightens the text
+        """
+        # Merge characters into lines so the rectangle follows the baselines
+        lines = cv2.dilate(binary, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1)))
+        coords = cv2.findNonZero(lines)
+        if coords is None or len(coords) < 50:
+            return 0.0
+        
+        angle = cv2.minAreaRect(coords)[2]
+        if angle > 45:
+            angle -= 90
+        elif angle < -45:
+            angle += 90
+        return float(angle)
+    
+    @staticmethod
+    def _rotate(gray: np.ndarray, angle: float) -> np.ndarray:
+        """Rotate around the center, keeping size and replicating borders"""
+        height, width = gray.shape
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        return cv2.warpAffine(gray, matrix, (width, height),
+                              flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    
+    def config_fingerprint(self) -> str:
+        """
+        Describe every setting that affects extracted text
+        
+        Returns:
+            String stored alongside cached OCR results
+        """
+        return "|".join(str(value) for value in (
+            self.backend,
+            self.language,
+            TESSERACT_CONFIG,
+            self.target_text_height,
+            self.max_dimension,
+            self.crop_to_text,
+            self.deskew,
+        ))
+    
+    def extract_text(self, image) -> str:
         """
         Extract text from image using Tesseract OCR
         
         Args:
-            image_path: Path to image file
+            image: Image file path, raw image bytes or BGR array
             
         Returns:
             Extracted text string
         """
-        processed_img = self.preprocess_image(image_path)
+        with trace_stage("ocr_preprocess"):
+            processed_img = self.preprocess_image(image)
         
         if processed_img is None:
             return ""
         
         # Run OCR
-        text = pytesseract.image_to_string(
-            processed_img, 
-            config="--psm 6 --oem 3"
-        )
+        with trace_stage("ocr_recognize"):
+            text = self.recognize(processed_img)
         
         return text.strip()
+    
+    def extract_page(self, image) -> dict:
+        """
+        Extract text from one page and time it
+        
+        Args:
+            image: Image file path, raw image bytes or BGR array
+            
+        Returns:
+            Dict with extracted text and duration in milliseconds
+        """
+        start = time.perf_counter()
+        text = self.extract_text(image)
+        return {"text": text, "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+    
+    @staticmethod
+    def count_pages(data: bytes, limit: int = None) -> int:
+        """
+        Count the pages of an uploaded file without decoding them
+        
+        Walks the chain of TIFF image directories (ValueError if it is
+        malformed); any other image is a single page.
+        
+        Args:
+            data: Raw uploaded file content
+            limit: Stop counting once the count exceeds limit
+            
+        Returns:
+            Number of pages (at most limit + 1)
+        """
+        order = TIFF_BYTE_ORDERS.get(data[:4])
+        if order is None:
+            return 1
+        
+        count = 0
+        seen = set()
+        try:
+            offset, = struct.unpack_from(order + "I", data, 4)
+            while offset and (limit is None or count <= limit):
+                if offset in seen:
+                    raise ValueError("Unable to read TIFF pages")
+                seen.add(offset)
+                entries, = struct.unpack_from(order + "H", data, offset)
+                offset, = struct.unpack_from(order + "I", data, offset + 2 + 12 * entries)
+                count += 1
+        except struct.error:
+            raise ValueError("Unable to read TIFF pages")
+        
+        if not count:
+            raise ValueError("Unable to read TIFF pages")
+        return count
+    
+    @staticmethod
+    def split_pages(data: bytes) -> list:
+        """
+        Split an uploaded file into pages
+        
+        Pages of a multi-page TIFF are decoded one at a time and re-encoded
+        as lossless PNG, so only one decoded page is held in memory and
+        pool workers receive compressed bytes. Any other image (or a
+        single-page TIFF) is returned unchanged as a single page.
+        
+        Args:
+            data: Raw uploaded file content
+            
+        Returns:
+            List of raw image bytes, one per page
+        """
+        page_count = OCRService.count_pages(data)
+        if page_count == 1:
+            return [data]
+        
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        pages = []
+        for number in range(page_count):
+            ok, decoded = cv2.imdecodemulti(buffer, cv2.IMREAD_COLOR, range=(number, number + 1))
+            if not ok or not decoded:
+                raise ValueError("Unable to decode TIFF pages")
+            pages.append(cv2.imencode(".png", decoded[0])[1].tobytes())
+        return pages
 
 # Singleton instance
 ocr_service = OCRService()
\ No newline at end of file
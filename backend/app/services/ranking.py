@@ -0,0 +1,180 @@
+"""
+Ranking Service
+Similarity graph construction and weighted PageRank for sentence ranking
+Runs directly on dense NumPy or scipy.sparse matrices (no NetworkX graph)
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class PageRankConvergenceError(RuntimeError):
+    """Raised when power iteration does not converge within max_iter"""
+
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """Scale embeddings to unit length as float32 (zero vectors stay zero)"""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def topk_neighbours(
+    queries: np.ndarray,
+    vectors: np.ndarray,
+    top_k: int = 100,
+    block_size: int = 1024,
+):
+    """
+    Find each query's top_k most similar vectors
+
+    Args:
+        queries: Unit-length query rows of shape (m, dim)
+        vectors: Unit-length candidate rows of shape (n, dim)
+        top_k: Neighbours kept per query (capped at n)
+        block_size: Query rows multiplied per block
+
+    Returns:
+        Tuple of (neighbour indices, similarities), both of shape (m, min(top_k, n))
+    """
+    n = vectors.shape[0]
+    k = min(top_k, n)
+    neighbours = np.empty((queries.shape[0], k), dtype=np.int64)
+    sims = np.empty((queries.shape[0], k), dtype=np.float32)
+    for start in range(0, queries.shape[0], block_size):
+        block = queries[start:start + block_size] @ vectors.T
+        if k < n:
+            chosen = np.argpartition(block, n - k, axis=1)[:, n - k:]
+        else:
+            chosen = np.broadcast_to(np.arange(n), block.shape)
+        neighbours[start:start + block_size] = chosen
+        sims[start:start + block_size] = np.take_along_axis(block, chosen, axis=1)
+    return neighbours, sims
+
+
+def neighbour_graph(neighbours: np.ndarray, sims: np.ndarray, threshold: float = 0.0) -> sp.csr_array:
+    """
+    Build the symmetric sparse graph from per-row neighbour lists
+
+    Args:
+        neighbours: Neighbour indices of shape (n, k)
+        sims: Matching similarities of shape (n, k)
+        threshold: Minimum similarity for an edge to be kept
+
+    Returns:
+        Symmetric (n, n) CSR similarity matrix
+    """
+    n = neighbours.shape[0]
+    keep = sims > threshold
+    graph = sp.csr_array(
+        (sims[keep], (np.nonzero(keep)[0], neighbours[keep])),
+        shape=(n, n),
+    )
+    return graph.maximum(graph.T).tocsr()
+
+
+def topk_similarity_graph(
+    embeddings: np.ndarray,
+    top_k: int = 100,
+    threshold: float = 0.0,
+    block_size: int = 1024,
+) -> sp.csr_array:
+    """
+    Build a sparse k-nearest-neighbour cosine similarity graph
+
+    Embeddings are normalized to float32 and multiplied in row blocks, so
+    peak memory is O(block_size * n) instead of the dense O(n * n) matrix.
+    Each row keeps its top_k neighbours above threshold; the result is
+    symmetrized so the graph stays undirected like the dense matrix.
+
+    Args:
+        embeddings: Sentence embeddings of shape (n, dim)
+        top_k: Neighbours kept per sentence (including itself)
+        threshold: Minimum similarity for an edge to be kept
+        block_size: Rows multiplied per block
+
+    Returns:
+        Symmetric (n, n) CSR similarity matrix
+    """
+    if len(embeddings) == 0:
+        return sp.csr_array((0, 0), dtype=np.float32)
+
+    vectors = normalize_rows(embeddings)
+    neighbours, sims = topk_neighbours(vectors, vectors, top_k, block_size)
+    return neighbour_graph(neighbours, sims, threshold)
+
+
+def pagerank(
+    matrix,
+    damping: float = 0.85,
+    tol: float = 1e-6,
+    max_iter: int = 100,
+    nstart=None,
+) -> np.ndarray:
+    """
+    Weighted PageRank via power iteration on a similarity matrix
+
+    Mirrors ``nx.pagerank(nx.from_numpy_array(matrix))``: rows are
+    normalized by their weight sums, rows summing to zero are treated as
+    dangling nodes, and convergence is reached when the L1 change between
+    iterations drops below ``n * tol``.
+
+    Args:
+        matrix: Square similarity matrix (np.ndarray or scipy.sparse)
+        damping: Damping factor (NetworkX ``alpha``)
+        tol: Per-node convergence tolerance
+        max_iter: Maximum number of power iterations
+        nstart: Optional warm-start scores (array or {index: score} dict)
+
+    Returns:
+        Array of PageRank scores indexed by sentence position
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0)
+
+    if sp.issparse(matrix):
+        weights = sp.csr_array(matrix, dtype=np.float64)
+        row_sums = np.asarray(weights.sum(axis=1)).ravel()
+    else:
+        weights = np.asarray(matrix, dtype=np.float64)
+        row_sums = weights.sum(axis=1)
+
+    # Scale x by inverse row sums instead of copying a row-normalized matrix
+    inv_row_sums = np.zeros(n)
+    nonzero = row_sums != 0
+    inv_row_sums[nonzero] = 1.0 / row_sums[nonzero]
+    is_dangling = ~nonzero
+
+    teleport = np.full(n, 1.0 / n)
+    x = _initial_vector(nstart, n)
+
+    for _ in range(max_iter):
+        x_last = x
+        x = damping * ((x * inv_row_sums) @ weights + x[is_dangling].sum() * teleport)
+        x += (1 - damping) * teleport
+        if np.abs(x - x_last).sum() < n * tol:
+            return x
+
+    raise PageRankConvergenceError(
+        f"PageRank failed to converge in {max_iter} iterations"
+    )
+
+
+def _initial_vector(nstart, n: int) -> np.ndarray:
+    """Build a normalized starting vector (uniform when nstart is empty)"""
+    if nstart is None:
+        return np.full(n, 1.0 / n)
+
+    if isinstance(nstart, dict):
+        x = np.array([nstart.get(i, 0.0) for i in range(n)], dtype=np.float64)
+    else:
+        x = np.asarray(nstart, dtype=np.float64)
+        if x.shape != (n,):
+            raise ValueError(f"nstart has shape {x.shape}, expected ({n},)")
+
+    total = x.sum()
+    if total == 0:
+        return np.full(n, 1.0 / n)
+    return x / total
@@ -0,0 +1,80 @@
+"""
+Result Cache Service
+TTL + LRU memoization of whole pipeline results
+Concurrent identical requests are coalesced into a single computation
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+from app.utils.cache import LRUCache
+
+_MISSING = object()
+
+
+class ResultCache:
+    """
+    Memoizes expensive results with single-flight de-duplication
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 3600):
+        """
+        Args:
+            max_size: Maximum number of cached results
+            ttl: Time-to-live for cached results in seconds
+        """
+        self.cache = LRUCache(max_size=max_size, ttl=ttl)
+        self.coalesced = 0
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Return the cached result for key, computing it at most once
+
+        Args:
+            key: Cache key
+            compute: Zero-argument function producing the result
+
+        Returns:
+            Tuple of (result, hit) where hit is False only for the caller
+            that actually ran compute
+        """
+        with self._lock:
+            value = self.cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value, True
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            # Another request is computing the same key; wait for it
+            return future.result(), True
+
+        try:
+            value = compute()
+            self.cache.set(key, value)
+            future.set_result(value)
+            return value, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        """Drop all cached results"""
+        self.cache.clear()
+        with self._lock:
+            self.coalesced = 0
+
+    def stats(self) -> dict:
+        """Return cache counters"""
+        return {**self.cache.stats(), "coalesced": self.coalesced}
@@ -1,44 +1,55 @@
 """
 Stats Service
-Track usage statistics (in-memory for now, can be moved to DB later)
+Track usage statistics (persisted and shared across workers via the metrics registry)
 """
 
+from app.services.metrics import MetricsRegistry, metrics
+
+COUNTERS = {
+    "total_flashcards_generated": "flashcards_generated_total",
+    "total_texts_processed": "texts_processed_total",
+    "total_images_processed": "images_processed_total",
+}
+
 class StatsService:
     """
     Service for tracking application statistics
     """
     
-    def __init__(self):
-        """Initialize stats counters"""
-        self.total_flashcards_generated = 0
-        self.total_texts_processed = 0
-        self.total_images_processed = 0
+    def __init__(self, registry: MetricsRegistry = None):
+        """Initialize stats on top of a metrics registry"""
+        self.metrics = registry or metrics
+        self.caches = {}
+    
+    def register_cache(self, name: str, cache):
+        """Report a cache's stats() under the given name"""
+        self.caches[name] = cache
     
     def increment_flashcards(self, count: int):
         """Increment flashcard generation counter"""
-        self.total_flashcards_generated += count
+        self.metrics.inc("flashcards_generated_total", count)
     
     def increment_texts(self):
         """Increment text processing counter"""
-        self.total_texts_processed += 1
+        self.metrics.inc("texts_processed_total")
     
-    def increment_images(self):
+    def increment_images(self, count: int = 1):
         """Increment image processing counter"""
-        self.total_images_processed += 1
+        self.metrics.inc("images_processed_total", count)
     
     def get_stats(self) -> dict:
         """Get current statistics"""
-        return {
-            "total_flashcards_generated": self.total_flashcards_generated,
-            "total_texts_processed": self.total_texts_processed,
-            "total_images_processed": self.total_images_processed
+        counters = self.metrics.snapshot()["counters"]
+        stats = {
+            field: int(counters.get((name, ()), 0))
+            for field, name in COUNTERS.items()
         }
+        stats["caches"] = {name: cache.stats() for name, cache in self.caches.items()}
+        return stats
     
     def reset_stats(self):
         """Reset all counters"""
-        self.total_flashcards_generated = 0
-        self.total_texts_processed = 0
-        self.total_images_processed = 0
+        self.metrics.reset(*COUNTERS.values())
 
 # Singleton instance
-stats_service = StatsService()
\ No newline at end of file
+stats_service = StatsService()
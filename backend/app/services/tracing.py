@@ -0,0 +1,343 @@
+"""
+Tracing Service
+Per-request stage timings, rolling stage histograms and opt-in profiling
+
+Pipeline stages are timed with trace_stage(). Each duration is added to
+the shared pipeline_stage_seconds histogram, to a rolling window of recent
+durations per stage, and to the trace of the request being served. The
+trace lives in a context variable; WorkerPool carries it into worker
+threads and brings stage timings back from worker processes, and the HTTP
+middleware returns it as a Server-Timing header.
+
+With PROFILE_REQUESTS=header (requests sending X-Profile: 1) or all, pool
+jobs run under cProfile and requests slower than PROFILE_THRESHOLD_MS
+are dumped to PROFILE_DIR as .prof files (open with pstats or snakeviz).
+"""
+
+import contextvars
+import cProfile
+import os
+import pstats
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from app.services.metrics import metrics
+
+load_dotenv()
+
+PROFILE_MODES = ("off", "header", "all")
+
+
+class RequestTrace:
+    """
+    Stage timings (and cProfile stats, when profiling) of one request
+    """
+
+    def __init__(self, profiling: bool = False):
+        """
+        Args:
+            profiling: Run this request's pool jobs under cProfile
+        """
+        self.profiling = profiling
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        # Raw cProfile stats dicts (picklable, so worker processes can send them back)
+        self.profiles: List[dict] = []
+        # Worker threads of a batch add stages concurrently
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        """Record one stage duration"""
+        with self._lock:
+            self.stages.append((name, seconds))
+
+    def call(self, fn):
+        """Run fn, under cProfile if this request is being profiled"""
+        if not self.profiling:
+            return fn()
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn)
+        finally:
+            profiler.create_stats()
+            with self._lock:
+                self.profiles.append(profiler.stats)
+
+    def add_profiles(self, profiles: List[dict]):
+        """Add cProfile stats collected elsewhere (e.g. in a worker process)"""
+        with self._lock:
+            self.profiles.extend(profiles)
+
+    def merged_profile(self) -> Optional[pstats.Stats]:
+        """All collected cProfile stats as one pstats.Stats (None if nothing was profiled)"""
+        with self._lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(_RawStats(profiles[0]))
+        for raw in profiles[1:]:
+            stats.add(_RawStats(raw))
+        return stats
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """Total seconds and call count per stage, in first-seen order"""
+        totals = {}
+        with self._lock:
+            for name, seconds in self.stages:
+                total, count = totals.get(name, (0.0, 0))
+                totals[name] = (total + seconds, count + 1)
+        return totals
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """
+        Format the stages as a Server-Timing header value
+
+        Args:
+            total: Optional whole-request duration in seconds
+
+        Returns:
+            e.g. 'sentence_split;dur=12.1, embedding;dur=40.3, total;dur=55.0'
+        """
+        entries = []
+        for name, (seconds, count) in self.totals().items():
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+class _RawStats:
+    """Lets pstats load a stats dict produced in another thread or process"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar(
+    "request_trace", default=None
+)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Trace of the request being served, if any"""
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(profiling: bool = False) -> Iterator[RequestTrace]:
+    """Make a new trace current for the duration of a with-block"""
+    trace = RequestTrace(profiling)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+class StageHistograms:
+    """
+    Durations of each stage over a rolling time window
+
+    The Prometheus histograms are cumulative since the metrics database
+    was created; these only cover recent requests, so a slowdown shows
+    up right away. Windows are per process.
+    """
+
+    def __init__(self, window_seconds: float = 300, max_samples: int = 2000):
+        """
+        Args:
+            window_seconds: Age of the oldest duration reported
+            max_samples: Durations kept per stage
+        """
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        """Record one stage duration"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append((time.monotonic(), seconds))
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Percentiles of each stage over the window
+
+        Returns:
+            {stage: {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}
+        """
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            recent = {
+                name: [seconds for observed, seconds in samples if observed >= cutoff]
+                for name, samples in self._samples.items()
+            }
+
+        summary = {}
+        for name, durations in sorted(recent.items()):
+            if not durations:
+                continue
+            values = np.array(durations) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[name] = {
+                "count": len(values),
+                "mean_ms": round(float(values.mean()), 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(values.max()), 2),
+            }
+        return summary
+
+    def reset(self):
+        """Forget all durations"""
+        with self._lock:
+            self._samples.clear()
+
+
+def record_stage(name: str, seconds: float):
+    """Add a stage duration to the metrics, the rolling window and the current trace"""
+    metrics.observe("pipeline_stage_seconds", seconds, stage=name)
+    stage_histograms.observe(name, seconds)
+    trace = current_trace()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def trace_stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage (also when it raises)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def _record_queue_wait(trace: RequestTrace, pool: str, submitted: float):
+    # Waiting for a worker is reported per request but not in pipeline_stage_seconds
+    waited = time.monotonic() - submitted
+    trace.add(f"{pool}_queue", waited)
+    stage_histograms.observe(f"{pool}_queue", waited)
+
+
+def call_traced(fn, pool: str, submitted: float):
+    """
+    Worker-thread entry point for a job submitted during a traced request
+
+    Runs inside a copy of the submitting context, so the request's trace
+    is current here too.
+    """
+    trace = current_trace()
+    _record_queue_wait(trace, pool, submitted)
+    return trace.call(fn)
+
+
+def run_traced(fn, pool: str, submitted: float, profiling: bool) -> tuple:
+    """
+    Worker-process entry point for a job submitted during a traced request
+
+    Returns:
+        Tuple of (fn result, stages, cProfile stats) for absorb_traced
+    """
+    with start_trace(profiling) as trace:
+        _record_queue_wait(trace, pool, submitted)
+        result = trace.call(fn)
+    return result, trace.stages, trace.profiles
+
+
+def absorb_traced(trace: RequestTrace, packed: tuple):
+    """Merge what run_traced sent back into the request's trace; return the job result"""
+    result, stages, profiles = packed
+    for name, seconds in stages:
+        trace.add(name, seconds)
+        # The worker's own rolling window is not visible from this process
+        stage_histograms.observe(name, seconds)
+    trace.add_profiles(profiles)
+    return result
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and writes profiles of slow ones
+    """
+
+    def __init__(self, mode: str = "off", threshold: float = 1.0,
+                 directory: str = "cache/profiles", keep: int = 50):
+        """
+        Args:
+            mode: off, header (requests with X-Profile: 1) or all
+            threshold: Seconds a profiled request must take to be dumped
+            directory: Where .prof files are written
+            keep: Newest profiles kept; older ones are deleted
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown PROFILE_REQUESTS mode: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.directory = directory
+        self.keep = keep
+
+    def wants(self, headers) -> bool:
+        """Whether a request with these headers should be profiled"""
+        if self.mode == "all":
+            return True
+        return self.mode == "header" and headers.get("x-profile") == "1"
+
+    def save(self, trace: RequestTrace, method: str, route: str, seconds: float) -> Optional[str]:
+        """
+        Merge a request's profiles into one .prof file
+
+        Returns:
+            Path of the file, or None if no pool job was profiled
+        """
+        stats = trace.merged_profile()
+        if stats is None:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{int(time.time() * 1000)}-{method.lower()}-{slug}-{int(seconds * 1000)}ms.prof"
+        path = os.path.join(self.directory, name)
+        stats.dump_stats(path)
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Delete all but the newest keep profiles"""
+        files = sorted(
+            (entry.path for entry in os.scandir(self.directory) if entry.name.endswith(".prof")),
+            key=os.path.getmtime,
+        )
+        for path in files[:max(0, len(files) - self.keep)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Singleton instances
+stage_histograms = StageHistograms(
+    window_seconds=float(os.getenv("STAGE_WINDOW_SECONDS", "300")),
+    max_samples=int(os.getenv("STAGE_WINDOW_SAMPLES", "2000")),
+)
+request_profiler = RequestProfiler(
+    mode=os.getenv("PROFILE_REQUESTS", "off").lower(),
+    threshold=float(os.getenv("PROFILE_THRESHOLD_MS", "1000")) / 1000,
+    directory=os.getenv("PROFILE_DIR", "cache/profiles"),
+    keep=int(os.getenv("PROFILE_KEEP", "50")),
+)
@@ -0,0 +1,326 @@
+"""
+TTS Backends
+Speech synthesis engines behind one interface
+gTTS (online MP3), espeak-ng (offline WAV) and a stub tone generator
+"""
+
+import io
+import math
+import os
+import shutil
+import struct
+import subprocess
+import time
+import wave
+from typing import Iterable, Iterator, List
+
+from gtts import gTTS
+
+
+class TTSBackend:
+    """
+    Synthesizes text to audio bytes in a single format
+
+    Backends must be thread-safe: TTSService synthesizes chunks of one
+    text concurrently.
+    """
+
+    name = "base"
+    extension = "mp3"
+    media_type = "audio/mpeg"
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        """
+        Args:
+            text: Text to speak
+            lang: Language code
+
+        Returns:
+            Encoded audio
+        """
+        raise NotImplementedError
+
+    def concat(self, parts: List[bytes]) -> bytes:
+        """Join audio produced by synthesize() into one playable file"""
+        raise NotImplementedError
+
+    def stream(self, parts: Iterable[bytes]) -> Iterator[bytes]:
+        """Re-encode audio parts as they arrive into one progressive stream"""
+        raise NotImplementedError
+
+    def duration(self, audio: bytes) -> float:
+        """Playback length of encoded audio in seconds"""
+        raise NotImplementedError
+
+
+class MP3Backend(TTSBackend):
+    """Backends producing raw MPEG frames, which can simply be appended"""
+
+    extension = "mp3"
+    media_type = "audio/mpeg"
+
+    def concat(self, parts: List[bytes]) -> bytes:
+        return b"".join(self.stream(parts))
+
+    def stream(self, parts: Iterable[bytes]) -> Iterator[bytes]:
+        # Tags between frames are played as noise or end playback early in some
+        # players; only the first part's ID3v2 header is kept
+        for index, part in enumerate(parts):
+            yield strip_id3(part, keep_header=index == 0)
+
+    def duration(self, audio: bytes) -> float:
+        return mp3_duration(audio)
+
+
+class WAVBackend(TTSBackend):
+    """Backends producing PCM WAV files"""
+
+    extension = "wav"
+    media_type = "audio/wav"
+
+    def concat(self, parts: List[bytes]) -> bytes:
+        return concat_wav(parts)
+
+    def stream(self, parts: Iterable[bytes]) -> Iterator[bytes]:
+        params = None
+        for part in parts:
+            with wave.open(io.BytesIO(part), "rb") as chunk:
+                if params is None:
+                    params = chunk.getparams()[:3]
+                    yield streaming_wav_header(*params)
+                elif chunk.getparams()[:3] != params:
+                    raise ValueError("Cannot join WAV chunks with different formats")
+                yield chunk.readframes(chunk.getnframes())
+
+    def duration(self, audio: bytes) -> float:
+        with wave.open(io.BytesIO(audio), "rb") as chunk:
+            return chunk.getnframes() / chunk.getframerate()
+
+
+class GTTSBackend(MP3Backend):
+    """Google Translate TTS (network round trip per ~100 characters)"""
+
+    name = "gtts"
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class EspeakBackend(WAVBackend):
+    """Offline synthesis with the espeak-ng (or espeak) command line tool"""
+
+    name = "espeak"
+
+    def __init__(self, command: str = None, speed: int = 160):
+        """
+        Args:
+            command: espeak executable (espeak-ng, then espeak, on PATH by default)
+            speed: Words per minute
+        """
+        self.command = command or shutil.which("espeak-ng") or shutil.which("espeak")
+        if self.command is None:
+            raise RuntimeError("espeak-ng is not installed")
+        self.speed = speed
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        result = subprocess.run(
+            [self.command, "-v", lang, "-s", str(self.speed), "--stdout"],
+            input=text.encode("utf-8"),
+            capture_output=True,
+            check=True,
+        )
+        return result.stdout
+
+
+class StubBackend(WAVBackend):
+    """
+    Offline tone generator for tests and benchmarks
+
+    Produces a short beep per word; latency and per_char simulate the
+    cost of a real engine.
+    """
+
+    name = "stub"
+    sample_rate = 8000
+
+    def __init__(self, latency: float = 0.0, per_char: float = 0.0):
+        """
+        Args:
+            latency: Seconds of fixed delay per call
+            per_char: Seconds of extra delay per character
+        """
+        self.latency = latency
+        self.per_char = per_char
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        time.sleep(self.latency + self.per_char * len(text))
+        samples = []
+        for word in text.split():
+            frequency = 300 + 40 * (len(word) % 10)
+            samples += [int(8000 * math.sin(2 * math.pi * frequency * t / self.sample_rate))
+                        for t in range(self.sample_rate // 10)]
+            samples += [0] * (self.sample_rate // 20)
+        return write_wav(samples, self.sample_rate)
+
+
+def write_wav(samples: List[int], sample_rate: int) -> bytes:
+    """Encode 16-bit mono samples as WAV"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return buffer.getvalue()
+
+
+def streaming_wav_header(channels: int, sample_width: int, frame_rate: int) -> bytes:
+    """WAV header with unknown length, as used for live streams"""
+    unknown = 0xFFFFFFFF
+    block_align = channels * sample_width
+    return b"".join((
+        b"RIFF", struct.pack("<I", unknown), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, channels, frame_rate,
+                             frame_rate * block_align, block_align, sample_width * 8),
+        b"data", struct.pack("<I", unknown),
+    ))
+
+
+def concat_wav(parts: List[bytes]) -> bytes:
+    """
+    Join WAV files with identical formats
+
+    Args:
+        parts: Encoded WAV files
+
+    Returns:
+        One WAV file containing all frames in order
+    """
+    buffer = io.BytesIO()
+    params = None
+    with wave.open(buffer, "wb") as out:
+        for part in parts:
+            with wave.open(io.BytesIO(part), "rb") as chunk:
+                if params is None:
+                    params = chunk.getparams()[:3]
+                    out.setnchannels(params[0])
+                    out.setsampwidth(params[1])
+                    out.setframerate(params[2])
+                elif chunk.getparams()[:3] != params:
+                    raise ValueError("Cannot join WAV chunks with different formats")
+                out.writeframes(chunk.readframes(chunk.getnframes()))
+    return buffer.getvalue()
+
+
+# MPEG audio Layer III tables, indexed by the version bits of the frame header
+MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),  # MPEG-2
+    0: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),  # MPEG-2.5
+}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def id3v2_size(audio: bytes, position: int = 0) -> int:
+    """
+    Length of an ID3v2 tag starting at position (0 if there is none)
+
+    Args:
+        audio: MP3 bytes
+        position: Offset to look at
+
+    Returns:
+        Tag length in bytes, including its header and optional footer
+    """
+    header = audio[position:position + 10]
+    if len(header) < 10 or header[:3] != b"ID3" or any(byte & 0x80 for byte in header[6:10]):
+        return 0
+    # Tag size is a 28-bit "syncsafe" integer
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def strip_id3(audio: bytes, keep_header: bool = False) -> bytes:
+    """
+    Remove the ID3v2 tags in front of and the ID3v1 tag behind MP3 frames
+
+    Args:
+        audio: MP3 bytes
+        keep_header: Keep the leading ID3v2 tags (for the first part of a file)
+
+    Returns:
+        MP3 bytes without those tags
+    """
+    end = len(audio)
+    if end >= 128 and audio[end - 128:end - 125] == b"TAG":
+        end -= 128
+
+    start = 0
+    while size := id3v2_size(audio, start):
+        start += size
+    return audio[:end] if keep_header else audio[start:end]
+
+
+def mp3_duration(audio: bytes) -> float:
+    """
+    Playback length of Layer III MP3 data by walking its frame headers
+
+    Args:
+        audio: MP3 bytes; ID3v2 and ID3v1 tags between frames (e.g. of
+            naively joined files) are skipped
+
+    Returns:
+        Duration in seconds
+    """
+    position = 0
+    seconds = 0.0
+    while position + 4 <= len(audio):
+        tag = id3v2_size(audio, position)
+        if not tag and audio[position:position + 3] == b"TAG":
+            # ID3v1 tags are 128 bytes and followed by the end, a frame or another tag
+            after = audio[position + 128:position + 131]
+            if position + 128 <= len(audio) and (not after or after[0] == 0xFF or after == b"ID3"):
+                tag = 128
+        if tag:
+            position += tag
+            continue
+        b1, b2 = audio[position + 1], audio[position + 2]
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+        if (audio[position] != 0xFF or b1 & 0xE0 != 0xE0 or version == 1 or layer != 1
+                or bitrate_index in (0, 15) or rate_index == 3):
+            position += 1  # Not a frame header; resynchronize
+            continue
+
+        bitrate = MP3_BITRATES[version][bitrate_index] * 1000
+        sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+        samples = 1152 if version == 3 else 576
+        position += samples // 8 * bitrate // sample_rate + ((b2 >> 1) & 1)
+        seconds += samples / sample_rate
+    return seconds
+
+
+def create_backend(name: str = None) -> TTSBackend:
+    """
+    Build the backend selected by name or TTS_ENGINE
+
+    Args:
+        name: gtts, espeak or stub
+
+    Returns:
+        TTSBackend instance
+    """
+    name = (name or os.getenv("TTS_ENGINE", "gtts")).lower()
+    if name == "gtts":
+        return GTTSBackend()
+    if name == "espeak":
+        return EspeakBackend(speed=int(os.getenv("ESPEAK_SPEED", "160")))
+    if name == "stub":
+        return StubBackend(
+            latency=float(os.getenv("TTS_STUB_LATENCY_MS", "0")) / 1000,
+            per_char=float(os.getenv("TTS_STUB_PER_CHAR_MS", "0")) / 1000,
+        )
+    raise ValueError(f"Unknown TTS_ENGINE: {name}")
@@ -4,47 +4,456 @@ Text-to-speech audio generation
 Converted from your original text_to_speech.py
 """
 
-from gtts import gTTS
+import hashlib
+import io
+import json
 import os
+import re
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
+from app.services.tracing import trace_stage
+from app.services.tts_backends import TTSBackend, create_backend
+from app.utils.text_cleaner import normalize_text
 
 load_dotenv()
 
+# Per-key locks are striped so concurrent requests for one text synthesize once
+LOCK_STRIPES = 64
+
+SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+def split_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Split text at sentence boundaries into chunks of at most max_chars
+    
+    Sentences longer than max_chars are kept whole rather than cut mid-phrase.
+    
+    Args:
+        text: Normalized text
+        max_chars: Target chunk length
+        
+    Returns:
+        List of chunks in order
+    """
+    chunks = []
+    for sentence in SENTENCE_END.split(text):
+        if chunks and len(chunks[-1]) + 1 + len(sentence) <= max_chars:
+            chunks[-1] += " " + sentence
+        elif sentence:
+            chunks.append(sentence)
+    return chunks
+
 class TTSService:
     """
     Service for converting text to speech
+    
+    Audio is content-addressed: the file name is a hash of the text,
+    language and engine, so repeated requests reuse the existing file.
+    The audio directory is bounded by total size and file age.
+    
+    Long texts are split into sentence chunks that are synthesized
+    concurrently and joined, instead of one long sequential request.
     """
     
-    def __init__(self):
-        """Initialize TTS service with audio directory"""
-        self.audio_dir = os.getenv("AUDIO_DIR", "audio")
+    def __init__(self, audio_dir: str = None, backend: TTSBackend = None):
+        """
+        Initialize TTS service with audio directory
+        
+        Args:
+            audio_dir: Directory for audio files (AUDIO_DIR by default)
+            backend: Speech engine (selected by TTS_ENGINE by default)
+        """
+        self.audio_dir = audio_dir or os.getenv("AUDIO_DIR", "audio")
         os.makedirs(self.audio_dir, exist_ok=True)
+        self.backend = backend or create_backend()
+        self.default_lang = os.getenv("TTS_LANG", "en")
+        
+        # Sentence-chunked synthesis (0 disables chunking)
+        self.chunk_chars = int(os.getenv("TTS_CHUNK_CHARS", "200"))
+        self.chunk_workers = int(os.getenv("TTS_CHUNK_WORKERS", "4"))
+        self._chunk_executor = None
+        
+        # Eviction limits (0 disables a limit)
+        self.max_bytes = int(os.getenv("TTS_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+        self.max_age = float(os.getenv("TTS_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+        self.sweep_interval = float(os.getenv("TTS_CACHE_SWEEP_INTERVAL", "300"))
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size_bytes = None  # Approximate directory size, measured on first sweep
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+    
+    @property
+    def engine(self) -> str:
+        """Name of the speech engine"""
+        return self.backend.name
     
-    def text_to_speech(self, text: str, filename: str = None) -> str:
+    @property
+    def chunk_executor(self) -> ThreadPoolExecutor:
+        """Threads for chunk synthesis, created on first use"""
+        with self._lock:
+            if self._chunk_executor is None:
+                self._chunk_executor = ThreadPoolExecutor(
+                    self.chunk_workers, thread_name_prefix="tts-chunk"
+                )
+            return self._chunk_executor
+    
+    def synthesize(self, text: str, lang: str) -> bytes:
         """
-        Convert text to speech and save as MP3
+        Synthesize text, in concurrent sentence chunks when it is long
         
         Args:
             text: Text to convert
-            filename: Optional custom filename
+            lang: Language code
+            
+        Returns:
+            Encoded audio in the backend's format
+        """
+        chunks = split_chunks(text, self.chunk_chars) if self.chunk_chars > 0 else [text]
+        with trace_stage("tts_synthesize"):
+            if len(chunks) <= 1:
+                return self.backend.synthesize(text, lang)
             
+            parts = self.chunk_executor.map(lambda chunk: self.backend.synthesize(chunk, lang), chunks)
+            return self.backend.concat(list(parts))
+    
+    def cache_key(self, text: str, lang: str) -> str:
+        """
+        Content hash identifying the audio for text
+        
+        Args:
+            text: Text to convert
+            lang: Language code
+        
+        Returns:
+            Hex digest of engine, language and normalized text
+        """
+        content = f"{self.engine}\0{lang}\0{self.chunk_chars}\0{normalize_text(text)}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+    
+    def text_to_speech(self, text: str, filename: str = None, lang: str = None) -> str:
+        """
+        Convert text to speech and save in the backend's format
+        
+        Args:
+            text: Text to convert
+            filename: Optional custom filename (skips the cache)
+            lang: Language code (TTS_LANG by default)
+        
         Returns:
             Path to generated audio file
         """
+        if filename:
+            if not text.strip():
+                raise ValueError("No text provided for speech synthesis")
+            filepath = os.path.join(self.audio_dir, filename)
+            audio = self.synthesize(normalize_text(text), lang or self.default_lang)
+            with open(filepath, "wb") as f:
+                f.write(audio)
+            return filepath
+        
+        return self.text_to_speech_cached(text, lang)[0]
+    
+    def text_to_speech_cached(self, text: str, lang: str = None) -> Tuple[str, bool]:
+        """
+        Return the audio file for text, synthesizing it only on a cache miss
+        
+        Args:
+            text: Text to convert
+            lang: Language code (TTS_LANG by default)
+        
+        Returns:
+            Tuple of (path to audio file, cache hit)
+        """
+        filepath, _, cached = self._cached_speech(text, lang, read=False)
+        return filepath, cached
+    
+    def card_audio(self, text: str, lang: str = None) -> Tuple[str, bytes]:
+        """
+        Return the cached audio file for text together with its content
+        
+        The audio is read or synthesized under the key lock, so callers
+        keep it even if the file is evicted afterwards (e.g. by the next
+        card of the same deck).
+        
+        Args:
+            text: Text to convert
+            lang: Language code (TTS_LANG by default)
+        
+        Returns:
+            Tuple of (path to audio file, encoded audio)
+        """
+        filepath, audio, _ = self._cached_speech(text, lang, read=True)
+        return filepath, audio
+    
+    def _cached_speech(self, text: str, lang: Optional[str], read: bool) -> Tuple[str, Optional[bytes], bool]:
+        """Look up or synthesize audio; the bytes are returned on a hit only if read"""
         if not text.strip():
             raise ValueError("No text provided for speech synthesis")
         
-        # Generate filename
-        if not filename:
-            filename = "flashcard.mp3"
+        lang = lang or self.default_lang
+        filepath = self.audio_path(text, lang)
         
-        filepath = os.path.join(self.audio_dir, filename)
+        with self._key_locks[hash(filepath) % LOCK_STRIPES]:
+            if self._touch(filepath):
+                try:
+                    audio = None
+                    if read:
+                        with open(filepath, "rb") as f:
+                            audio = f.read()
+                    with self._lock:
+                        self.hits += 1
+                    return filepath, audio, True
+                except FileNotFoundError:
+                    pass  # Evicted since the touch; synthesize it again
+            
+            audio = self.synthesize(normalize_text(text), lang)
+            self._store(filepath, audio)
         
-        # Generate speech
-        tts = gTTS(text=text, lang="en")
-        tts.save(filepath)
+        with self._lock:
+            self.misses += 1
+        return filepath, audio, False
+    
+    def audio_path(self, text: str, lang: str = None) -> str:
+        """Cache file path for text (the file may not exist yet)"""
+        key = self.cache_key(text, lang or self.default_lang)
+        return os.path.join(self.audio_dir, f"{key}.{self.backend.extension}")
+    
+    def cached_path(self, text: str, lang: str = None) -> Optional[str]:
+        """
+        Return the cached audio file for text without synthesizing
+        
+        Args:
+            text: Text to convert
+            lang: Language code (TTS_LANG by default)
         
+        Returns:
+            Path to the audio file, or None on a cache miss
+        """
+        filepath = self.audio_path(text, lang)
+        if not self._touch(filepath):
+            return None
+        with self._lock:
+            self.hits += 1
         return filepath
+    
+    def stream_speech(self, text: str, lang: str = None) -> Iterator[bytes]:
+        """
+        Synthesize text and yield audio as soon as each chunk is ready
+        
+        The first sentence is synthesized on its own so playback can start
+        quickly; the remaining chunks are synthesized concurrently and
+        yielded in order. When the stream is fully consumed, the joined
+        audio is stored in the cache.
+        
+        Args:
+            text: Text to convert
+            lang: Language code (TTS_LANG by default)
+            
+        Yields:
+            Encoded audio bytes forming one progressive stream
+        """
+        if not text.strip():
+            raise ValueError("No text provided for speech synthesis")
+        
+        lang = lang or self.default_lang
+        filepath = self.audio_path(text, lang)
+        text = normalize_text(text)
+        chunks = [text]
+        if self.chunk_chars > 0:
+            first, *rest = SENTENCE_END.split(text, maxsplit=1)
+            chunks = [first] + (split_chunks(rest[0], self.chunk_chars) if rest else [])
+        
+        with self._lock:
+            self.misses += 1
+        
+        futures = [self.chunk_executor.submit(self.backend.synthesize, chunk, lang) for chunk in chunks]
+        parts = []
+        
+        def completed():
+            for future in futures:
+                parts.append(future.result())
+                yield parts[-1]
+        
+        try:
+            yield from self.backend.stream(completed())
+        finally:
+            # Client went away or synthesis failed: drop chunks not started yet
+            for future in futures:
+                future.cancel()
+        
+        self._store(filepath, self.backend.concat(parts))
+    
+    def build_deck(self, cards: List[Tuple[str, str]], audio: List[Tuple[str, bytes]],
+                   fmt: str = "track") -> dict:
+        """
+        Combine per-card audio into one deck file
+        
+        The deck file is content-addressed by its card files, so asking for
+        the same deck again reuses it. Card audio is passed in rather than
+        read back, since storing one card may evict another from the cache.
+        
+        Args:
+            cards: (key, text) pairs in deck order
+            audio: (file path, encoded audio) for each card (from card_audio)
+            fmt: "track" for one concatenated track, "zip" for an archive
+            
+        Returns:
+            Dict with the deck file path, total duration and per-card
+            durations (plus offsets into the track)
+        """
+        if fmt not in ("track", "zip"):
+            raise ValueError(f"Unknown deck format: {fmt}")
+        
+        paths = [path for path, _ in audio]
+        parts = [part for _, part in audio]
+        
+        manifest = []
+        offset = 0.0
+        for number, ((key, text), path, audio) in enumerate(zip(cards, paths, parts), start=1):
+            duration = self.backend.duration(audio)
+            manifest.append({
+                "key": key,
+                "text": text,
+                # Cached card file, or the entry name inside the archive
+                "file": os.path.basename(path) if fmt == "track" else f"{number:02d}.{self.backend.extension}",
+                "offset": round(offset, 3) if fmt == "track" else None,
+                "duration": round(duration, 3),
+            })
+            offset += duration
+        
+        content = "\0".join([self.engine, fmt] + [f"{card['key']}:{os.path.basename(path)}"
+                                                   for card, path in zip(manifest, paths)])
+        key = hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+        extension = self.backend.extension if fmt == "track" else "zip"
+        filepath = os.path.join(self.audio_dir, f"{key}.{extension}")
+        
+        if not self._touch(filepath):
+            if fmt == "track":
+                audio = self.backend.concat(parts)
+            else:
+                buffer = io.BytesIO()
+                # Audio is already compressed; store entries as-is
+                with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+                    for card, audio in zip(manifest, parts):
+                        archive.writestr(card["file"], audio)
+                    archive.writestr("manifest.json", json.dumps({"cards": manifest}, indent=2))
+                audio = buffer.getvalue()
+            self._store(filepath, audio)
+        
+        return {
+            "audio_file": filepath,
+            "format": fmt,
+            "duration": round(offset, 3),
+            "cards": manifest,
+        }
+    
+    def _store(self, filepath: str, audio: bytes):
+        """Write audio atomically into the cache and enforce the size limit"""
+        # Write to a temp name so readers never see a partial file
+        tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        with self._lock:
+            if self._size_bytes is not None:
+                self._size_bytes += len(audio)
+        self.evict(keep=filepath)
+    
+    @staticmethod
+    def _touch(filepath: str) -> bool:
+        """Refresh a cached file's mtime (used as last access); False if missing"""
+        try:
+            os.utime(filepath)
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def evict(self, keep: str = None, force: bool = False) -> int:
+        """
+        Remove expired audio and the least recently used files over the size limit
+        
+        The directory is only scanned when the tracked size exceeds the
+        limit or the sweep interval has passed.
+        
+        Args:
+            keep: File never removed (the one just returned to a caller)
+            force: Scan now regardless of the sweep interval
+        
+        Returns:
+            Number of files removed
+        """
+        now = time.time()
+        with self._lock:
+            over_size = (self.max_bytes and self._size_bytes is not None
+                         and self._size_bytes > self.max_bytes)
+            due = now - self._last_sweep >= self.sweep_interval
+            if not (force or over_size or due or self._size_bytes is None):
+                return 0
+            self._last_sweep = now
+            
+            files = []
+            for entry in os.scandir(self.audio_dir):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            files.sort()
+            
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            for mtime, size, path in files:
+                expired = self.max_age and now - mtime > self.max_age
+                # Trim to 90% so the next few writes don't trigger another scan
+                oversized = self.max_bytes and total > self.max_bytes * 0.9
+                if not (expired or oversized) or path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            
+            self._size_bytes = total
+            self.evictions += removed
+            return removed
+    
+    def clear(self):
+        """Remove all audio files and reset counters"""
+        with self._lock:
+            for entry in os.scandir(self.audio_dir):
+                if entry.is_file():
+                    os.remove(entry.path)
+            self._size_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def stats(self) -> dict:
+        """Return hit/miss counters and directory size"""
+        total = self.hits + self.misses
+        return {
+            "engine": self.engine,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._size_bytes,
+            "max_bytes": self.max_bytes,
+        }
 
 # Singleton instance
-tts_service = TTSService()
\ No newline at end of file
+tts_service = TTSService()
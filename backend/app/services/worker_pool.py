@@ -0,0 +1,363 @@
+"""
+Worker Pool Service
+Runs blocking NLP, OCR and TTS work off the asyncio event loop
+Bounded thread/process pools with queue limits and per-job timeouts
+"""
+
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from dotenv import load_dotenv
+from app.services.tracing import absorb_traced, call_traced, current_trace, run_traced
+
+load_dotenv()
+
+
+class WorkerPoolError(RuntimeError):
+    """Base error for worker pool failures"""
+
+
+class PoolOverloadedError(WorkerPoolError):
+    """Raised when a pool's queue is full (mapped to HTTP 503)"""
+
+
+class JobTimeoutError(WorkerPoolError):
+    """Raised when a job exceeds its timeout (mapped to HTTP 504)"""
+
+
+# Marks the end of a generator stepped in a thread pool
+_END = object()
+
+
+def _drain_generator(fn, args: tuple, items, stop):
+    """
+    Process-pool entry point of WorkerPool.iterate
+
+    Runs the generator fn(*args) to the end, putting ("item", value)
+    tuples on the manager queue, then ("end", None) or ("error", exc).
+    Stops early once the parent sets stop.
+    """
+    events = fn(*args)
+    try:
+        for item in events:
+            items.put(("item", item))
+            if stop.is_set():
+                break
+        items.put(("end", None))
+    except Exception as e:
+        items.put(("error", e))
+    finally:
+        events.close()
+
+
+class WorkerPool:
+    """
+    Bounded executor for blocking calls made from async routes
+
+    Thread pools suit work that releases the GIL (torch, NumPy, OpenCV,
+    network I/O). Process pools isolate GIL-bound work such as spaCy and
+    Tesseract; each worker process keeps its own service singletons, so
+    functions and arguments must be picklable.
+    """
+
+    def __init__(self, name: str, max_workers: int = 2, max_queue: int = 16,
+                 timeout: float = 120.0, use_processes: bool = False):
+        """
+        Args:
+            name: Pool name used in error messages and stats
+            max_workers: Number of worker threads/processes
+            max_queue: Jobs allowed to wait beyond the running ones
+            timeout: Per-job timeout in seconds (0 disables)
+            use_processes: Use a process pool instead of a thread pool
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.use_processes = use_processes
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._pending = 0
+        self._executor = None
+        self._manager = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """Create the executor on first use"""
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    context = multiprocessing.get_context(
+                        os.getenv("WORKER_START_METHOD", "spawn")
+                    )
+                    self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix=f"{self.name}-worker"
+                    )
+            return self._executor
+
+    @property
+    def manager(self):
+        """Start the multiprocessing manager that carries iterate() items on first use"""
+        with self._lock:
+            if self._manager is None:
+                context = multiprocessing.get_context(os.getenv("WORKER_START_METHOD", "spawn"))
+                self._manager = context.Manager()
+            return self._manager
+
+    def _acquire_slot(self, count: int = 1):
+        """
+        Reserve queue slots for count jobs
+
+        A batch larger than the whole queue is admitted only into an idle
+        pool, so it runs alone instead of being rejected forever.
+        """
+        with self._lock:
+            limit = self.max_workers + self.max_queue
+            if self._pending + count > limit and (self._pending or count <= limit):
+                self.rejected += 1
+                raise PoolOverloadedError(f"{self.name} pool is overloaded, try again later")
+            self._pending += count
+
+    def _release_slot(self, _future=None, count: int = 1):
+        with self._lock:
+            self._pending -= count
+            self.completed += count
+
+    def _submit(self, job):
+        """
+        Submit a no-argument callable, carrying the request trace along
+
+        Threads run the job in a copy of the caller's context (so stage
+        timings land in the request's trace); processes trace the job
+        themselves and send the timings back with the result.
+        """
+        trace = current_trace()
+        if self.use_processes:
+            if trace is None:
+                return self.executor.submit(job)
+            return self.executor.submit(run_traced, job, self.name, time.monotonic(), trace.profiling)
+        if trace is not None:
+            job = partial(call_traced, job, self.name, time.monotonic())
+        return self.executor.submit(contextvars.copy_context().run, job)
+
+    def _unpack(self, result):
+        """Undo run_traced's packing of a process job's result"""
+        trace = current_trace()
+        if self.use_processes and trace is not None:
+            return absorb_traced(trace, result)
+        return result
+
+    async def run(self, fn, *args, timeout: float = None, **kwargs):
+        """
+        Run fn(*args, **kwargs) in the pool and await its result
+
+        Args:
+            fn: Blocking callable
+            timeout: Optional override of the pool timeout in seconds
+
+        Returns:
+            Result of fn
+        """
+        self._acquire_slot()
+        try:
+            future = self._submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release_slot()
+            raise
+        # Slot is released when the job really finishes, even after a timeout
+        future.add_done_callback(self._release_slot)
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or None)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            # Queued jobs are dropped; running threads cannot be interrupted
+            future.cancel()
+            raise JobTimeoutError(f"{self.name} job exceeded {timeout:g}s timeout")
+        return self._unpack(result)
+
+    async def map(self, fn, items, timeout: float = None) -> list:
+        """
+        Run fn over items in parallel, preserving order
+
+        Every item takes a queue slot, released when that item's job really
+        finishes (also after a timeout); the timeout covers the whole batch.
+
+        Args:
+            fn: Blocking callable taking one item
+            items: Iterable of arguments
+            timeout: Optional override of the pool timeout in seconds
+
+        Returns:
+            List of results in item order
+        """
+        items = list(items)
+        self._acquire_slot(len(items))
+        futures = []
+        try:
+            for item in items:
+                futures.append(self._submit(partial(fn, item)))
+        except BaseException:
+            self._release_slot(count=len(items) - len(futures))
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            for future in futures:
+                future.add_done_callback(self._release_slot)
+
+        done = asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            results = await asyncio.wait_for(done, timeout or None)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            for future in futures:
+                future.cancel()
+            raise JobTimeoutError(f"{self.name} batch exceeded {timeout:g}s timeout")
+        except BaseException:
+            # Don't start the rest of the batch once one item has failed
+            for future in futures:
+                future.cancel()
+            raise
+        return [self._unpack(result) for result in results]
+
+    async def iterate(self, fn, *args, timeout: float = None):
+        """
+        Run the generator fn(*args) in the pool and yield its items
+
+        Thread pools advance the generator one item per job. A process
+        pool cannot share a live generator between jobs, so one worker
+        runs it to the end and sends each item back through a manager
+        queue as soon as it is produced. In both modes closing the async
+        generator (e.g. when a client disconnects) stops the work at its
+        next item, and the timeout applies to each item.
+
+        Args:
+            fn: Generator function (module level for process pools)
+            timeout: Optional override of the pool timeout in seconds
+
+        Yields:
+            Items of the generator
+        """
+        if self.use_processes:
+            async for item in self._iterate_process(fn, args, timeout):
+                yield item
+            return
+
+        events = fn(*args)
+        lock = threading.Lock()
+
+        def step():
+            with lock:
+                return next(events, _END)
+
+        def close():
+            # Waits for a step still running in a worker, then stops the generator
+            with lock:
+                events.close()
+
+        try:
+            while (item := await self.run(step, timeout=timeout)) is not _END:
+                yield item
+        finally:
+            threading.Thread(target=close, daemon=True).start()
+
+    async def _iterate_process(self, fn, args: tuple, timeout: float):
+        """iterate() for process pools: one job drains the generator into a manager queue"""
+        items, stop = await asyncio.to_thread(lambda: (self.manager.Queue(), self.manager.Event()))
+        self._acquire_slot()
+        try:
+            future = self._submit(partial(_drain_generator, fn, args, items, stop))
+        except BaseException:
+            self._release_slot()
+            raise
+        future.add_done_callback(self._release_slot)
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            while True:
+                kind, value = await asyncio.to_thread(self._next_item, items, future, timeout)
+                if kind == "end":
+                    break
+                if kind == "error":
+                    raise value
+                yield value
+            # Brings the worker's stage timings into the request trace
+            self._unpack(await asyncio.wrap_future(future))
+        finally:
+            stop.set()
+
+    def _next_item(self, items, future, timeout: float) -> tuple:
+        """Block for the next ("item"/"end"/"error", value) of a draining job"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            try:
+                return items.get(timeout=0.05)
+            except queue.Empty:
+                pass
+            if future.done():
+                # Items are queued before the job returns; anything left is already there
+                try:
+                    return items.get_nowait()
+                except queue.Empty:
+                    future.result()
+                    raise WorkerPoolError(f"{self.name} job ended without finishing its items")
+            if deadline is not None and time.monotonic() > deadline:
+                self.timed_out += 1
+                raise JobTimeoutError(f"{self.name} job exceeded {timeout:g}s timeout")
+
+    def stats(self) -> dict:
+        """Return pool counters"""
+        return {
+            "mode": "process" if self.use_processes else "thread",
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def shutdown(self):
+        """Stop accepting jobs and release workers"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+
+def _create_pool(name: str, default_workers: int, default_mode: str) -> WorkerPool:
+    """Build a pool configured from <NAME>_POOL_* environment variables"""
+    prefix = name.upper()
+    return WorkerPool(
+        name,
+        max_workers=int(os.getenv(f"{prefix}_POOL_SIZE", str(default_workers))),
+        max_queue=int(os.getenv(f"{prefix}_POOL_QUEUE", "16")),
+        timeout=float(os.getenv(f"{prefix}_JOB_TIMEOUT", "120")),
+        use_processes=os.getenv(f"{prefix}_POOL_MODE", default_mode).lower() == "process",
+    )
+
+
+# Singleton pools
+# NLP defaults to threads: the embedding cache, batcher, result cache and
+# document sessions are per process, and every worker process loads its own
+# spaCy and embedding models. NLP_POOL_MODE=process runs all NLP routes in
+# worker processes instead, trading that memory for GIL-free spaCy parsing.
+nlp_pool = _create_pool("nlp", 2, "thread")
+ocr_pool = _create_pool("ocr", max(1, (os.cpu_count() or 2) // 2), "process")
+tts_pool = _create_pool("tts", 4, "thread")
@@ -0,0 +1,72 @@
+"""
+Shared test fixtures
+"""
+
+import os
+import shutil
+import tempfile
+import textwrap
+
+# The service singletons open their SQLite files on import; keep them out of
+# the working tree's cache/ directory (spawned workers inherit these too)
+STATE_DIR = tempfile.mkdtemp(prefix="flashcards-tests-")
+for _name, _file in (("METRICS_DB_PATH", "metrics.sqlite3"), ("EMBEDDING_CACHE_PATH", "embeddings.sqlite3"),
+                     ("OCR_CACHE_PATH", "ocr.sqlite3"), ("JOB_DB_PATH", "jobs.sqlite3")):
+    os.environ.setdefault(_name, os.path.join(STATE_DIR, _file))
+
+import pytest
+
+from app.services.ocr_service import ocr_service
+from benchmarks.suite import OFFLINE_DEFAULTS
+
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
+
+
+FAKE_TESSEROCR = '''
+class PSM:
+    SINGLE_BLOCK = 6
+
+
+class OEM:
+    DEFAULT = 3
+
+
+class PyTessBaseAPI:
+    def __init__(self, **kwargs):
+        self.size = (0, 0)
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        self.size = (width, height)
+
+    def GetUTF8Text(self):
+        return "Recognized page of %dx%d pixels" % self.size
+'''
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch, tmp_path):
+    """
+    Make worker processes recognize text with a fake tesserocr module
+
+    Spawned workers inherit sys.path, so they import the fake module from
+    tmp_path; the pickled ocr_service tells them to use the tesserocr backend.
+    """
+    (tmp_path / "tesserocr.py").write_text(textwrap.dedent(FAKE_TESSEROCR))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(ocr_service, "backend", "tesserocr")
+    return "Recognized page of"
+
+
+@pytest.fixture
+def offline_nlp(monkeypatch):
+    """
+    Point worker processes at the blank spaCy tokenizer and hashing embedder
+
+    Spawned workers import the services afresh, so they read these
+    settings; this process keeps its already configured singletons.
+    """
+    for name, value in OFFLINE_DEFAULTS.items():
+        monkeypatch.setenv(name, value)
@@ -0,0 +1,44 @@
+"""
+Tests for the benchmark corpus generator and regression comparison
+"""
+
+from benchmarks.corpus import make_corpus, render_pages
+from benchmarks.suite import compare_results
+
+
+def _results(**stages) -> dict:
+    return {"results": [
+        {"stage": stage, "words": 1000, "median_s": median, "peak_mb": peak}
+        for stage, (median, peak) in stages.items()
+    ]}
+
+
+def test_corpus_is_deterministic_and_sized():
+    text = make_corpus(1000, seed=3)
+
+    assert text == make_corpus(1000, seed=3)
+    assert text != make_corpus(1000, seed=4)
+    assert 1000 <= len(text.split()) < 1100
+    assert "\n\n" in text
+
+
+def test_rendered_pages_cover_the_text():
+    text = make_corpus(300)
+    pages = render_pages(text, lines_per_page=10)
+
+    assert len(pages) > 1
+    assert all(img.shape == pages[0][0].shape and img.min() == 0 for img, _ in pages)
+    assert " ".join(page_text for _, page_text in pages).split() == text.split()
+
+
+def test_compare_results_flags_growth_above_threshold():
+    baseline = _results(embedding=(0.100, 10.0), pagerank=(0.050, 5.0), selection=(0.0005, 0.1))
+    current = _results(embedding=(0.115, 10.0), pagerank=(0.070, 9.0), selection=(0.0010, 0.1))
+
+    regressions = compare_results(baseline, current, threshold=0.2)
+
+    # embedding is within 20%; selection doubled but stays under the noise floor
+    assert regressions == [
+        ("pagerank@1000", "median_s", 0.050, 0.070),
+        ("pagerank@1000", "peak_mb", 5.0, 9.0),
+    ]
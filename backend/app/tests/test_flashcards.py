@@ -0,0 +1,582 @@
+"""
+Tests for the flashcard NLP pipeline
+"""
+
+import json
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.services import document_sessions as document_sessions_module
+from app.services import flashcard_service as flashcard_service_module
+from app.services.document_sessions import DocumentSessionService
+from app.services.embedding_backends import create_embedder, pool_embeddings
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.flashcard_service import FlashcardService
+from app.services.nlp_pipeline import chunk_text, load_spacy, nlp_pipeline
+from app.services.ranking import PageRankConvergenceError, pagerank, topk_similarity_graph
+from app.services.result_cache import ResultCache
+
+
+def _similarity_matrix(n: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    """Cosine similarity matrix of random embeddings sharing a common topic"""
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(n, dim)) + 1.5
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings @ embeddings.T
+
+
+def _networkx_scores(matrix) -> np.ndarray:
+    scores = nx.pagerank(nx.from_numpy_array(matrix))
+    return np.array([scores[i] for i in range(len(scores))])
+
+
+@pytest.mark.parametrize("n", [1, 5, 60])
+def test_pagerank_matches_networkx_dense(n):
+    matrix = _similarity_matrix(n)
+    np.testing.assert_allclose(pagerank(matrix), _networkx_scores(matrix), atol=1e-8)
+
+
+def test_pagerank_matches_networkx_sparse_with_dangling_nodes():
+    matrix = _similarity_matrix(40)
+    matrix[matrix < 0.2] = 0.0
+    matrix[7, :] = matrix[:, 7] = 0.0
+
+    expected = _networkx_scores(matrix)
+    np.testing.assert_allclose(pagerank(sp.csr_array(matrix)), expected, atol=1e-8)
+    np.testing.assert_allclose(pagerank(matrix), expected, atol=1e-8)
+
+
+def test_pagerank_warm_start_converges_immediately():
+    matrix = _similarity_matrix(30)
+    scores = pagerank(matrix, tol=1e-10)
+
+    with pytest.raises(PageRankConvergenceError):
+        pagerank(matrix, tol=1e-10, max_iter=1)
+
+    warm = pagerank(matrix, tol=1e-10, max_iter=1, nstart=scores)
+    np.testing.assert_allclose(warm, scores, atol=1e-9)
+    dict_start = pagerank(matrix, tol=1e-10, max_iter=1, nstart=dict(enumerate(scores)))
+    np.testing.assert_allclose(dict_start, scores, atol=1e-9)
+
+
+def _clustered_embeddings(n: int, dim: int = 64, topics: int = 20, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(topics, dim)) + 1.0
+    embeddings = centroids[rng.integers(0, topics, size=n)] + rng.normal(scale=1.5, size=(n, dim))
+    return embeddings.astype(np.float32)
+
+
+def test_topk_graph_is_symmetric_and_bounded():
+    embeddings = _clustered_embeddings(200)
+    graph = topk_similarity_graph(embeddings, top_k=10, block_size=64)
+
+    assert graph.shape == (200, 200)
+    assert abs(graph - graph.T).max() < 1e-6
+    # Each row keeps its own top 10, plus neighbours added by symmetrization
+    assert (np.diff(graph.indptr) >= 10).all()
+    assert graph.nnz <= 2 * 10 * 200
+
+
+def test_sparse_graph_memory_and_ranking_agreement():
+    n = 3000
+    embeddings = _clustered_embeddings(n)
+
+    tracemalloc.start()
+    dense_scores = pagerank(cosine_similarity(embeddings))
+    dense_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    sparse_scores = pagerank(topk_similarity_graph(embeddings, top_k=100, block_size=256))
+    sparse_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert sparse_peak < dense_peak / 2
+
+    top = 50
+    dense_top = set(np.argsort(-dense_scores)[:top])
+    sparse_top = set(np.argsort(-sparse_scores)[:top])
+    assert len(dense_top & sparse_top) / top >= 0.6
+    assert np.corrcoef(dense_scores, sparse_scores)[0, 1] > 0.7
+
+
+def test_embedding_cache_persists_and_invalidates_on_model_change(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+
+    cache = EmbeddingCache("model-a", path=path)
+    assert cache.get_many(["First sentence.", "Second one."]) == [None, None]
+    cache.put_many(["First sentence.", "Second one."], vectors)
+
+    # New instance only sees the disk store; whitespace is normalized in keys
+    reopened = EmbeddingCache("model-a", path=path)
+    hits = reopened.get_many(["First  sentence.", "Unknown."])
+    np.testing.assert_array_equal(hits[0], vectors[0])
+    assert hits[1] is None
+    assert reopened.stats()["hits"] == 1 and reopened.stats()["misses"] == 1
+
+    switched = EmbeddingCache("model-b", path=path)
+    assert switched.get_many(["First sentence."]) == [None]
+    assert switched.stats()["disk_size"] == 0
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache("model", path=str(tmp_path / "e.sqlite3"), memory_size=2, disk_size=10)
+    for i in range(12):
+        cache.put_many([f"sentence {i}"], np.ones((1, 4), dtype=np.float32))
+
+    assert len(cache.memory) == 2
+    assert len(cache.disk) <= 10
+    assert cache.get_many(["sentence 11"])[0] is not None
+
+
+def test_result_cache_single_flight_and_ttl():
+    cache = ResultCache(max_size=8, ttl=0.2)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"Point 1": "Cached."}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_compute("key", compute), range(8)))
+
+    assert len(calls) == 1
+    assert [hit for _, hit in results].count(False) == 1
+    assert cache.stats()["coalesced"] + cache.stats()["hits"] == 7
+    assert all(value == {"Point 1": "Cached."} for value, _ in results)
+
+    time.sleep(0.25)
+    assert cache.get_or_compute("key", compute) == ({"Point 1": "Cached."}, False)
+    assert len(calls) == 2
+
+
+def test_result_cache_key_uses_exact_text():
+    text = "Cells divide by mitosis.  Ｍitochondria make ATP."
+    key = FlashcardService.cache_key(text)
+
+    assert FlashcardService.cache_key(text) == key
+    # Same text after whitespace collapsing or NFKC folding is a different input
+    assert FlashcardService.cache_key(" ".join(text.split())) != key
+    assert FlashcardService.cache_key(text.replace("Ｍ", "M")) != key
+
+
+def test_result_cache_does_not_store_failures():
+    cache = ResultCache()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("key", fail)
+    assert cache.get_or_compute("key", lambda: "ok") == ("ok", False)
+
+
+def test_embedding_batcher_routes_results_to_each_caller():
+    calls = []
+
+    def encode(sentences):
+        calls.append(len(sentences))
+        time.sleep(0.01)
+        return np.array([[len(s), s.count("x")] for s in sentences], dtype=np.float32)
+
+    batcher = EmbeddingBatcher(encode, max_batch_size=1000, max_wait_ms=20)
+    requests = [["x" * i, "y" * (i + 1)] for i in range(16)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(batcher.encode, requests))
+
+    for sentences, embeddings in zip(requests, results):
+        np.testing.assert_array_equal(embeddings[:, 0], [len(s) for s in sentences])
+    assert sum(calls) == 32
+    assert len(calls) < 16
+
+
+def test_embedding_batcher_propagates_errors():
+    def encode(sentences):
+        raise RuntimeError("model failed")
+
+    batcher = EmbeddingBatcher(encode, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.encode(["A sentence."])
+
+
+SAMPLE_CORPUS = [
+    "Photosynthesis converts light energy into chemical energy. Plants store this energy "
+    "as glucose. Oxygen is released as a by-product of the reaction.",
+    "The French Revolution began in 1789. It ended the absolute monarchy in France. "
+    "Its ideas spread across Europe during the following decades.",
+    "Machine learning models learn patterns from data. A model is trained on examples "
+    "and evaluated on unseen data. Overfitting happens when a model memorizes noise.",
+    "Plate tectonics explains the movement of the lithosphere. Earthquakes occur along "
+    "plate boundaries. Mountains form where plates collide over millions of years.",
+]
+
+
+def test_chunk_text_respects_limit_and_sentence_boundaries():
+    text = " ".join(SAMPLE_CORPUS * 5)
+    chunks = chunk_text(text, 300)
+
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert all(chunk.rstrip().endswith(".") for chunk in chunks[:-1])
+
+
+@pytest.mark.parametrize("mode", ["parser", "senter", "sentencizer"])
+def test_segmentation_modes_match_full_pipeline(mode):
+    pytest.importorskip("en_core_web_sm")
+
+    full = load_spacy("en_core_web_sm", "full")
+    light = load_spacy("en_core_web_sm", mode)
+
+    for text in SAMPLE_CORPUS:
+        expected = [sent.text for sent in full(text).sents]
+        assert [sent.text for sent in light(text).sents] == expected
+
+
+def test_pool_embeddings_ignores_padding():
+    tokens = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]])
+    mask = np.array([[1, 1, 0]])
+
+    np.testing.assert_allclose(pool_embeddings(tokens, mask, "mean"), [[2.0, 3.0]])
+    np.testing.assert_allclose(pool_embeddings(tokens, mask, "cls"), [[1.0, 2.0]])
+    np.testing.assert_allclose(pool_embeddings(tokens, mask, "max"), [[3.0, 4.0]])
+
+
+def test_hashing_embedder_is_deterministic_and_topical(monkeypatch):
+    monkeypatch.setenv("HASHING_EMBEDDING_DIM", "64")
+    embedder = create_embedder("unused", "hashing")
+    sentences = [
+        "Photosynthesis converts light energy into chemical energy.",
+        "Photosynthesis stores chemical energy in glucose.",
+        "The French Revolution began in 1789.",
+    ]
+
+    embeddings = embedder.encode(sentences)
+
+    assert embeddings.shape == (3, 64)
+    np.testing.assert_array_equal(embeddings, create_embedder("unused", "hashing").encode(sentences))
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+    similarity = embeddings @ embeddings.T
+    assert similarity.min() >= 0
+    assert similarity[0, 1] > similarity[0, 2]
+
+
+# Reference corpus for backend agreement: one document per paragraph
+REFERENCE_DOCUMENTS = [
+    [
+        "Photosynthesis converts light energy into chemical energy stored in glucose.",
+        "Chlorophyll in the chloroplasts absorbs mostly red and blue light.",
+        "The light-dependent reactions split water and release oxygen.",
+        "The Calvin cycle fixes carbon dioxide into three-carbon sugars.",
+        "ATP and NADPH carry energy from the light reactions to the Calvin cycle.",
+        "Stomata on the leaf surface regulate the exchange of gases.",
+        "Plants lose water through transpiration when stomata are open.",
+        "Photosynthetic rate depends on light intensity, temperature and carbon dioxide.",
+    ],
+    [
+        "The French Revolution began in 1789 with a financial crisis in France.",
+        "The Estates-General was summoned for the first time since 1614.",
+        "Crowds stormed the Bastille on the fourteenth of July.",
+        "The Declaration of the Rights of Man proclaimed equality before the law.",
+        "The monarchy was abolished and a republic declared in 1792.",
+        "The Reign of Terror executed thousands of suspected enemies of the revolution.",
+        "Napoleon Bonaparte seized power in the coup of 1799.",
+        "Revolutionary ideas spread across Europe in the following decades.",
+    ],
+    [
+        "Machine learning models learn patterns from labelled examples.",
+        "A model is trained on one dataset and evaluated on unseen data.",
+        "Overfitting happens when a model memorizes noise in the training set.",
+        "Regularization penalizes complex models to improve generalization.",
+        "Cross-validation estimates performance by rotating the held-out fold.",
+        "Gradient descent updates parameters in the direction that lowers the loss.",
+        "Feature scaling helps many optimizers converge faster.",
+        "Ensembles combine several models to reduce variance.",
+    ],
+]
+
+
+def _selected_cards(sentences: list, embeddings: np.ndarray) -> set:
+    """Sentences the service's ranking and selection turn into flashcards"""
+    scores = FlashcardService.rank_sentences(sentences, embeddings)
+    flashcards, _, _ = FlashcardService.select_flashcards(" ".join(sentences), sentences, scores)
+    return set(flashcards.values())
+
+
+@pytest.fixture(scope="module")
+def torch_embedder():
+    pytest.importorskip("torch")
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("onnxruntime")
+    try:
+        return create_embedder("sentence-transformers/all-MiniLM-L6-v2", "torch")
+    except OSError:
+        pytest.skip("embedding model is not available")
+
+
+@pytest.mark.parametrize("backend, min_cosine, min_overlap", [("onnx", 0.999, 1.0), ("onnx-int8", 0.95, 0.6)])
+def test_onnx_backend_agrees_with_torch(backend, min_cosine, min_overlap, torch_embedder, tmp_path_factory, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_ONNX_DIR", str(tmp_path_factory.getbasetemp() / "onnx"))
+    embedder = create_embedder("sentence-transformers/all-MiniLM-L6-v2", backend)
+
+    for sentences in REFERENCE_DOCUMENTS:
+        expected = torch_embedder.encode(sentences)
+        actual = embedder.encode(sentences)
+        cosines = (expected * actual).sum(axis=1) / (
+            np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+        )
+        assert cosines.min() >= min_cosine
+
+        # Flashcard selection: same sentences as fp32 PyTorch
+        reference = _selected_cards(sentences, expected)
+        overlap = len(reference & _selected_cards(sentences, actual)) / len(reference)
+        assert overlap >= min_overlap
+
+
+def _document(n: int, edits: dict = None) -> str:
+    """Paragraphs of five numbered sentences about a few recurring topics"""
+    topics = ["cells", "markets", "volcanoes", "algorithms", "empires"]
+    sentences = [f"Fact {i} explains how {topics[i % 5]} relate to topic {i % 7}." for i in range(n)]
+    for index, replacement in (edits or {}).items():
+        sentences[index] = replacement
+    sentences = [s for s in sentences if s]
+    return "\n\n".join(" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5))
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    """Sentence splitting on '. ' and deterministic topic embeddings"""
+    embedded = []
+
+    def split(texts):
+        return [[s if s.endswith(".") else s + "." for s in text.split(". ")] for text in texts]
+
+    def embed(sentences):
+        embedded.extend(sentences)
+        vectors = []
+        for sentence in sentences:
+            # Seeded per sentence (hash() differs between runs); non-negative like real embeddings
+            rng = np.random.default_rng(zlib.crc32(sentence.encode()))
+            topic = np.zeros(16)
+            topic[len(sentence.split()[3]) % 16] = 3.0
+            vectors.append(topic + rng.random(16))
+        return np.array(vectors, dtype=np.float32)
+
+    monkeypatch.setattr(nlp_pipeline, "preprocess_texts", split)
+    monkeypatch.setattr(nlp_pipeline, "generate_embeddings", embed)
+    return embedded
+
+
+@pytest.fixture
+def offline_models(monkeypatch):
+    """Real sentence splitting (blank spaCy + sentencizer) and the hashing embedder"""
+    monkeypatch.setattr(nlp_pipeline, "_nlp", load_spacy("blank:en", "sentencizer"))
+    monkeypatch.setattr(nlp_pipeline, "_embedder", create_embedder("unused", "hashing"))
+    monkeypatch.setattr(nlp_pipeline, "embedding_cache", None)
+    monkeypatch.setattr(nlp_pipeline, "embedding_batcher", None)
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_document_session_edit_matches_full_run(sparse, fake_pipeline, monkeypatch):
+    monkeypatch.setattr(document_sessions_module, "SPARSE_GRAPH_MIN_SENTENCES", 50 if sparse else 10_000)
+    monkeypatch.setattr(flashcard_service_module, "SPARSE_GRAPH_MIN_SENTENCES", 50 if sparse else 10_000)
+    monkeypatch.setattr(nlp_pipeline, "similarity_top_k", 20)
+    monkeypatch.setattr(nlp_pipeline, "pagerank_tol", 1e-10)
+    monkeypatch.setattr(nlp_pipeline, "pagerank_max_iter", 1000)
+    sessions = DocumentSessionService()
+    sessions.generate("doc", _document(120))
+
+    # Edit one sentence, delete one and rewrite another paragraph's sentence
+    edited = _document(120, {7: "Fact 7 now explains why volcanoes erupt.", 33: "", 90: "Fact 90 is new."})
+    fake_pipeline.clear()
+    result, reuse = sessions.generate("doc", edited)
+
+    assert fake_pipeline == ["Fact 7 now explains why volcanoes erupt.", "Fact 90 is new."]
+    assert (reuse["sentences"], reuse["embedded"], reuse["reused"]) == (119, 2, 117)
+
+    session = sessions.sessions.get("doc")
+    full_embeddings = nlp_pipeline.generate_embeddings(session.sentences)
+    np.testing.assert_allclose(session.embeddings, full_embeddings)
+    expected_scores = FlashcardService.rank_sentences(session.sentences, full_embeddings)
+    np.testing.assert_allclose(session.scores, list(expected_scores.values()), atol=1e-8)
+    assert result == FlashcardService.select_flashcards(edited, session.sentences, expected_scores)
+
+
+def test_document_session_splits_like_full_run_with_real_splitter(offline_models):
+    # Headings without a full stop would merge into the next sentence if split as one text
+    text = "Photosynthesis\n\n" + _document(15) + "\n\nKey terms\n\n" + _document(10)
+    sessions = DocumentSessionService()
+
+    result, _ = sessions.generate("doc", text)
+    sentences = nlp_pipeline.preprocess_text(text)
+
+    assert sentences[0] == "Photosynthesis" and "Key terms" in sentences
+    assert sessions.sessions.get("doc").sentences == sentences
+    assert result == FlashcardService.generate_flashcards(text)
+
+    edited = text.replace("Fact 13 explains", "Fact 13 no longer explains")
+    result, reuse = sessions.generate("doc", edited)
+    assert reuse["embedded"] == 1
+    assert sessions.sessions.get("doc").sentences == nlp_pipeline.preprocess_text(edited)
+    assert result == FlashcardService.generate_flashcards(edited)
+
+
+def test_document_sessions_stay_within_memory_budget(fake_pipeline):
+    one = DocumentSessionService()
+    one.generate("doc", _document(100))
+    size = one.stats()["bytes"]
+
+    sessions = DocumentSessionService(max_documents=32, max_bytes=int(size * 2.5))
+    for name in ("a", "b", "c"):
+        sessions.generate(name, _document(100))
+
+    assert "a" not in sessions.sessions and "b" in sessions.sessions and "c" in sessions.sessions
+    assert sessions.stats()["bytes"] == 2 * size
+    # A document bigger than the whole budget is not kept
+    sessions.generate("huge", _document(400))
+    assert "huge" not in sessions.sessions and sessions.stats()["bytes"] <= sessions.stats()["max_bytes"]
+
+
+def test_document_session_warm_start_and_discard(fake_pipeline):
+    sessions = DocumentSessionService()
+    text = _document(40)
+    sessions.generate("doc", text)
+    fake_pipeline.clear()
+
+    _, reuse = sessions.generate("doc", text)
+
+    assert fake_pipeline == [] and reuse["reused"] == 40
+    assert sessions.discard("doc") and not sessions.discard("doc")
+
+
+def test_flashcard_routes_run_in_process_pool(offline_nlp, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.api.v1 import flashcards as flashcards_router
+    from app.main import app
+    from app.services.worker_pool import WorkerPool
+
+    pool = WorkerPool("nlp", max_workers=1, use_processes=True)
+    monkeypatch.setattr(flashcards_router, "nlp_pool", pool)
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+    text = _document(20)
+
+    try:
+        with TestClient(app) as client:
+            cached = client.post("/api/v1/flashcards/text", json={"text": text})
+            first = client.post("/api/v1/flashcards/text", json={"text": text, "document_id": "doc"})
+            again = client.post("/api/v1/flashcards/text", json={"text": text, "document_id": "doc"})
+            batch = client.post("/api/v1/flashcards/batch", json={"texts": [text]})
+            discarded = client.delete("/api/v1/flashcards/sessions/doc")
+    finally:
+        pool.shutdown()
+
+    assert cached.status_code == 200 and cached.json()["count"] > 0
+    assert all(card in text for card in cached.json()["flashcards"].values())
+    # The session lives in the worker process and is reused there
+    assert first.headers["X-Reused-Sentences"] == "0/20"
+    assert again.headers["X-Reused-Sentences"] == "20/20"
+    assert again.json()["flashcards"] == cached.json()["flashcards"]
+    assert batch.json()["results"][0]["flashcards"] == cached.json()["flashcards"]
+    assert discarded.status_code == 200
+
+
+def _parse_stream(body: str, fmt: str) -> list:
+    """Decode NDJSON lines or SSE messages into events"""
+    if fmt == "ndjson":
+        return [json.loads(line) for line in body.splitlines()]
+    events = []
+    for message in body.strip().split("\n\n"):
+        name, data = message.split("\n")
+        assert name.startswith("event: ") and data.startswith("data: ")
+        event = json.loads(data[len("data: "):])
+        assert event["event"] == name[len("event: "):]
+        events.append(event)
+    return events
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_stream_endpoint_events_in_both_formats(use_processes, offline_nlp, offline_models, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.api.v1 import flashcards as flashcards_router
+    from app.main import app
+    from app.services.worker_pool import WorkerPool
+
+    pool = WorkerPool("nlp", max_workers=1, use_processes=use_processes)
+    monkeypatch.setattr(flashcards_router, "nlp_pool", pool)
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+    text = _document(20)
+
+    try:
+        with TestClient(app) as client:
+            responses = {
+                fmt: client.post(f"/api/v1/flashcards/text/stream?format={fmt}", json={"text": text})
+                for fmt in ("ndjson", "sse")
+            }
+    finally:
+        pool.shutdown()
+
+    assert responses["ndjson"].headers["content-type"].startswith("application/x-ndjson")
+    assert responses["sse"].headers["content-type"].startswith("text/event-stream")
+    ndjson = _parse_stream(responses["ndjson"].text, "ndjson")
+    sse = _parse_stream(responses["sse"].text, "sse")
+    for event in ndjson + sse:
+        event.pop("elapsed_ms", None)
+    assert ndjson == sse
+
+    assert [event["stage"] for event in ndjson if event["event"] == "stage"] == [
+        "sentence_split", "embedding", "ranking"
+    ]
+    assert ndjson[0]["sentences"] == 20
+    cards = {event["key"]: event["text"] for event in ndjson if event["event"] == "card"}
+    assert ndjson[-1]["event"] == "done" and ndjson[-1]["count"] == len(cards) > 0
+    assert cards == FlashcardService.generate_flashcards(text)[0]
+
+
+BATCH_TEXTS = [
+    _document(20),
+    "",
+    "Too short.",
+    " \n\n \n\n \n\n ",
+    "Introduction\n\n" + _document(7),
+    " ".join(SAMPLE_CORPUS),
+]
+
+
+def test_batch_matches_generate_flashcards_per_text(offline_models):
+    batch = FlashcardService.generate_flashcards_batch(BATCH_TEXTS)
+
+    assert batch == [FlashcardService.generate_flashcards(text) for text in BATCH_TEXTS]
+    assert batch[1] == ({}, 0, 0) and batch[3] == ({}, 0, 0)
+
+
+def test_batch_endpoint_matches_generate_flashcards_per_text(offline_models, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+    # The endpoint requires at least 10 characters per text
+    texts = [text for text in BATCH_TEXTS if len(text) >= 10]
+
+    with TestClient(app) as client:
+        response = client.post("/api/v1/flashcards/batch", json={"texts": texts})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    expected = [FlashcardService.generate_flashcards(text) for text in texts]
+    assert [(r["flashcards"], r["text_word_count"], r["flashcard_word_count"]) for r in results] == expected
+    assert [r["count"] for r in results] == [len(flashcards) for flashcards, _, _ in expected]
+    assert response.json()["count"] == sum(r["count"] for r in results)
@@ -0,0 +1,178 @@
+"""
+Tests for the persistent job queue, runner and jobs API
+"""
+
+import asyncio
+import time
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1 import jobs as jobs_router
+from app.api.v1 import ocr as ocr_router
+from app.main import app
+from app.services.job_queue import JobQueue, JobQueueFullError, JobRunner, job_runner
+from app.services.ocr_cache import OCRResultCache
+from app.services.worker_pool import ocr_pool
+
+
+def fake_stream(text: str):
+    yield {"event": "stage", "stage": "sentence_split", "elapsed_ms": 1.0, "sentences": 2}
+    yield {"event": "stage", "stage": "embedding", "elapsed_ms": 2.0}
+    yield {"event": "stage", "stage": "ranking", "elapsed_ms": 3.0}
+    yield {"event": "card", "key": "Point 1", "text": text.split(".")[0] + "."}
+    yield {"event": "done", "count": 1, "text_word_count": len(text.split()), "flashcard_word_count": 2}
+
+
+def test_queue_claims_in_order_and_recovers_lost_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    first = queue.submit("flashcards", {"text": "one"})
+    second = queue.submit("ocr", {"generate": False}, [b"page-1", b"page-2"])
+
+    assert queue.claim("w1")["id"] == first
+    claimed = queue.claim("w1")
+    assert claimed["id"] == second and claimed["status"] == "running"
+    assert queue.inputs(second) == [b"page-1", b"page-2"]
+    assert queue.claim("w1") is None
+
+    # Worker died: both jobs are requeued, then failed once out of attempts
+    assert queue.requeue_stale(stale_after=-1) == 2
+    assert queue.get(first)["status"] == "queued"
+    queue.claim("w2")
+    queue.claim("w2")
+    queue.requeue_stale(stale_after=-1)
+    lost = queue.get(second)
+    assert (lost["status"], lost["attempts"]) == ("failed", 2)
+    assert queue.inputs(second) == []
+
+
+def test_queue_limits_and_ttl_cleanup(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), max_queued=1)
+    job_id = queue.submit("flashcards", {"text": "one"})
+    with pytest.raises(JobQueueFullError):
+        queue.submit("flashcards", {"text": "two"})
+
+    queue.claim("w1")
+    queue.add_progress(job_id, {"stage": "embedding"})
+    queue.complete(job_id, {"count": 1})
+    job = queue.get(job_id)
+    assert job["progress"] == [{"stage": "embedding"}] and job["result"] == {"count": 1}
+
+    assert queue.cleanup(ttl=3600) == 0
+    assert queue.cleanup(ttl=-1) == 1
+    assert queue.get(job_id) is None
+
+
+def test_runner_limits_concurrency_and_resumes_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path)
+    for i in range(5):
+        queue.submit("sleep", {"index": i})
+
+    running = 0
+    peak = 0
+    release = asyncio.Event()
+
+    async def handler(params, inputs, progress):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            await progress("sleeping")
+            await release.wait()
+            return {"index": params["index"]}
+        finally:
+            running -= 1
+
+    async def scenario():
+        runner = JobRunner(queue, concurrency=2, poll_interval=0.01)
+        runner.register("sleep", handler)
+        await runner.start()
+        await asyncio.sleep(0.2)
+        await runner.stop()
+
+        # A fresh process picks up the jobs that were running at shutdown
+        restarted = JobRunner(JobQueue(path), concurrency=2, poll_interval=0.01)
+        restarted.register("sleep", handler)
+        release.set()
+        await restarted.start()
+        for _ in range(200):
+            if restarted.queue.stats()["completed"] == 5:
+                break
+            await asyncio.sleep(0.01)
+        await restarted.stop()
+
+    asyncio.run(scenario())
+
+    assert peak == 2
+    assert queue.stats() == {"queued": 0, "running": 0, "completed": 5, "failed": 0}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs_router, "job_queue", queue)
+    monkeypatch.setattr(job_runner, "queue", queue)
+    monkeypatch.setattr(job_runner, "poll_interval", 0.01)
+    monkeypatch.setattr(jobs_router.flashcard_service, "generate_flashcards_stream", fake_stream)
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def wait_for_job(client, status_url: str, attempts: int = 200) -> dict:
+    for _ in range(attempts):
+        job = client.get(status_url).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_submit_and_poll_flashcard_job(client):
+    response = client.post("/api/v1/jobs/flashcards", json={"text": "Jobs run later. Clients poll for results."})
+    assert response.status_code == 202
+    submitted = response.json()
+    assert submitted["status_url"] == f"/api/v1/jobs/{submitted['job_id']}"
+
+    job = wait_for_job(client, submitted["status_url"])
+
+    assert job["status"] == "completed"
+    assert [event["stage"] for event in job["progress"]] == ["sentence_split", "embedding", "ranking", "selection"]
+    assert job["result"]["flashcards"] == {"Point 1": "Jobs run later."}
+    assert client.get("/api/v1/jobs/unknown").status_code == 404
+
+
+def test_failed_ocr_job_reports_error(client):
+    response = client.post(
+        "/api/v1/jobs/ocr", files={"files": ("page.png", b"not an image", "image/png")}
+    )
+    job = wait_for_job(client, response.json()["status_url"])
+
+    assert job["status"] == "failed"
+    assert job["error"]
+
+
+def test_ocr_job_runs_in_default_process_pool(client, fake_tesserocr, monkeypatch):
+    monkeypatch.setattr(ocr_router, "ocr_cache", OCRResultCache())
+    page = np.full((120, 400, 3), 255, dtype=np.uint8)
+    cv2.putText(page, "Page one", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    files = [("files", (f"page{i}.png", cv2.imencode(".png", page)[1].tobytes(), "image/png")) for i in range(2)]
+    assert ocr_pool.use_processes
+
+    try:
+        response = client.post("/api/v1/jobs/ocr", files=files, data={"generate": "true"})
+        job = wait_for_job(client, response.json()["status_url"], attempts=3000)
+    finally:
+        # Drop workers that imported the fake tesserocr
+        ocr_pool.shutdown()
+
+    assert job["status"] == "completed", job["error"]
+    assert [text.startswith(fake_tesserocr) for text in job["result"]["pages"]] == [True, True]
+    assert job["result"]["page_count"] == 2
+    assert [(event["stage"], event.get("pages_done")) for event in job["progress"]] == [
+        ("ocr", 1), ("ocr", 2), ("sentence_split", None), ("embedding", None), ("ranking", None), ("selection", None)
+    ]
+    assert job["result"]["flashcards"]["count"] == 1
@@ -0,0 +1,73 @@
+"""
+Tests for application startup and readiness
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.nlp_pipeline import nlp_pipeline
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_import_is_fast_and_loads_no_models():
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "print(time.perf_counter() - start)\n"
+        "print(','.join(m for m in ('spacy', 'sentence_transformers', 'torch', 'sklearn') if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "MODEL_LOADING": "lazy", "EMBEDDING_CACHE_PATH": ""},
+    )
+    elapsed, heavy_modules = result.stdout.splitlines()
+
+    assert heavy_modules == ""
+    # Model imports are caught above; this only catches gross regressions
+    # (about 0.8 s locally) without failing on slow CI runners
+    assert float(elapsed) < 5.0
+
+
+def test_ready_waits_for_eager_warmup(monkeypatch):
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(5)
+        monkeypatch.setattr(nlp_pipeline, "_nlp", object())
+        monkeypatch.setattr(nlp_pipeline, "_embedder", object())
+
+    monkeypatch.setenv("MODEL_LOADING", "eager")
+    monkeypatch.setattr(nlp_pipeline, "load", slow_load)
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["models_loaded"] is False
+
+        release.set()
+        for _ in range(50):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.05)
+        assert response.json()["status"] == "ready"
+
+
+def test_ready_in_lazy_mode_does_not_load_models(monkeypatch):
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+
+    with TestClient(app) as client:
+        response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["models_loaded"] is False
+    assert not nlp_pipeline.is_loaded
@@ -0,0 +1,97 @@
+"""
+Tests for the metrics registry, /metrics and the stats API built on it
+"""
+
+import multiprocessing
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.metrics import MetricsRegistry
+from app.services.stats_service import StatsService
+
+
+def _increment_in_process(path: str, count: int):
+    registry = MetricsRegistry(path=path, flush_interval=60)
+    for _ in range(count):
+        registry.inc("events_total", kind="worker")
+    registry.flush()
+
+
+def test_concurrent_increments_are_exact(tmp_path):
+    registry = MetricsRegistry(path=str(tmp_path / "metrics.sqlite3"), flush_interval=0.01)
+
+    def work():
+        for _ in range(2000):
+            registry.inc("events_total")
+            registry.observe("stage_seconds", 0.002, stage="test")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.counter_value("events_total") == 16000
+    histogram = registry.snapshot()["histograms"][("stage_seconds", (("stage", "test"),))]
+    assert histogram[-1] == 16000
+
+
+def test_processes_share_totals(tmp_path):
+    path = str(tmp_path / "metrics.sqlite3")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_increment_in_process, args=(path, 500)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    registry = MetricsRegistry(path=path)
+    registry.inc("events_total", kind="api")
+    assert registry.counter_value("events_total", kind="worker") == 1500
+    assert registry.counter_value("events_total") == 1501
+
+
+def test_prometheus_histogram_is_cumulative():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("requests_total", route="/a")
+    for seconds in (0.05, 0.5, 5.0):
+        registry.observe("latency_seconds", seconds, route="/a")
+
+    text = registry.render_prometheus()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 1' in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+
+def test_stats_service_counts_and_resets():
+    stats = StatsService(MetricsRegistry())
+    stats.increment_flashcards(5)
+    stats.increment_texts()
+    stats.increment_images(2)
+
+    result = stats.get_stats()
+    assert (result["total_flashcards_generated"], result["total_texts_processed"],
+            result["total_images_processed"]) == (5, 1, 2)
+
+    stats.reset_stats()
+    assert stats.get_stats()["total_flashcards_generated"] == 0
+
+
+def test_metrics_endpoint_reports_requests():
+    client = TestClient(app)
+    assert client.get("/health").status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in response.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}' in response.text
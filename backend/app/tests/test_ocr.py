@@ -0,0 +1,374 @@
+"""
+Tests for the OCR service and router
+"""
+
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1 import ocr as ocr_router
+from app.main import app
+from app.services.metrics import MetricsRegistry
+from app.services.ocr_cache import OCRResultCache
+from app.services import ocr_service as ocr_service_module
+from app.services.ocr_service import OCRService, ocr_service
+from app.services.stats_service import stats_service
+from app.services.worker_pool import WorkerPool
+
+
+def render_text_image(text: str = "Flashcards from images", width: int = 640, height: int = 120) -> np.ndarray:
+    """Render black text on a white BGR canvas"""
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    cv2.putText(img, text, (10, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    return img
+
+
+def encode_png(img: np.ndarray) -> bytes:
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+def encode_tiff(pages: list, tmp_path) -> bytes:
+    """Multi-page TIFF bytes (OpenCV can only write multi-page files to disk)"""
+    path = str(tmp_path / "pages.tiff")
+    assert cv2.imwritemulti(path, pages)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Run OCR jobs in a thread so monkeypatched services apply
+    pool = WorkerPool("ocr-test", max_workers=1)
+    monkeypatch.setattr(ocr_router, "ocr_pool", pool)
+    cache = OCRResultCache()
+    monkeypatch.setattr(ocr_router, "ocr_cache", cache)
+    monkeypatch.setitem(stats_service.caches, "ocr", cache)
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+    with TestClient(app) as test_client:
+        yield test_client
+    pool.shutdown()
+
+
+def test_preprocess_from_bytes_matches_file(tmp_path):
+    img = render_text_image()
+    path = str(tmp_path / "page.png")
+    cv2.imwrite(path, img)
+
+    service = OCRService()
+    from_bytes = service.preprocess_image(encode_png(img))
+    np.testing.assert_array_equal(from_bytes, service.preprocess_image(path))
+    np.testing.assert_array_equal(from_bytes, service.preprocess_image(img))
+
+
+def test_invalid_image_bytes_yield_no_text():
+    assert OCRService().preprocess_image(b"not an image") is None
+
+
+def test_extract_leaves_no_files_on_error(client, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+
+    def fail(image):
+        raise RuntimeError("tesseract crashed")
+
+    monkeypatch.setattr(ocr_service, "extract_text", fail)
+    response = client.post(
+        "/api/v1/ocr/extract",
+        files={"file": ("page.png", encode_png(render_text_image()), "image/png")},
+    )
+
+    assert response.status_code == 500
+    assert not os.path.exists("uploads") or os.listdir("uploads") == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_extract_rejects_oversized_upload(client, monkeypatch):
+    monkeypatch.setattr(ocr_router, "MAX_UPLOAD_BYTES", 100)
+    response = client.post(
+        "/api/v1/ocr/extract",
+        files={"file": ("page.png", encode_png(render_text_image()), "image/png")},
+    )
+    assert response.status_code == 413
+
+
+def test_split_pages_decodes_multipage_tiff(tmp_path):
+    pages = [render_text_image(f"Page {i}") for i in range(3)]
+
+    tiff = encode_tiff(pages, tmp_path)
+    assert OCRService.count_pages(tiff) == 3
+    assert OCRService.count_pages(tiff, limit=1) == 2
+
+    split = OCRService.split_pages(tiff)
+    assert len(split) == 3
+    for original, page in zip(pages, split):
+        assert isinstance(page, bytes)
+        np.testing.assert_array_equal(cv2.imdecode(np.frombuffer(page, np.uint8), cv2.IMREAD_COLOR), original)
+
+    png = encode_png(pages[0])
+    assert OCRService.split_pages(png) == [png]
+
+
+def test_extract_pages_counts_tiff_pages_before_decoding(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_router, "MAX_OCR_PAGES", 2)
+
+    def decode(*args, **kwargs):
+        raise AssertionError("pages decoded before the page limit was checked")
+
+    monkeypatch.setattr(cv2, "imdecodemulti", decode)
+    tiff = encode_tiff([render_text_image(f"Page {i}") for i in range(3)], tmp_path)
+
+    response = client.post("/api/v1/ocr/extract-pages", files=[("files", ("a.tiff", tiff, "image/tiff"))])
+    assert response.status_code == 413
+
+    broken = tiff[:4] + (len(tiff) + 10).to_bytes(4, "little")
+    response = client.post("/api/v1/ocr/extract-pages", files=[("files", ("b.tiff", broken, "image/tiff"))])
+    assert response.status_code == 400
+
+
+def test_extract_pages_preserves_order(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        ocr_service, "extract_text",
+        lambda image: f"page with {OCRService().load_image(image).shape[1]} columns",
+    )
+    pages = [render_text_image(width=300 + i) for i in range(4)]
+    tiff = encode_tiff(pages[2:], tmp_path)
+    files = [
+        ("files", ("a.png", encode_png(pages[0]), "image/png")),
+        ("files", ("b.png", encode_png(pages[1]), "image/png")),
+        ("files", ("c.tiff", tiff, "image/tiff")),
+    ]
+
+    response = client.post("/api/v1/ocr/extract-pages", files=files)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["page_count"] == 4
+    assert [page["text"] for page in body["pages"]] == [
+        f"page with {300 + i} columns" for i in range(4)
+    ]
+    assert body["flashcards"] is None
+
+
+def test_extract_page_runs_in_process_pool(fake_tesserocr):
+    pool = WorkerPool("ocr-process", max_workers=1, use_processes=True)
+    pages = [encode_png(render_text_image(width=300 + i)) for i in range(2)]
+
+    try:
+        results = asyncio.run(pool.map(ocr_service.extract_page, pages))
+    finally:
+        pool.shutdown()
+
+    assert [result["text"].startswith(fake_tesserocr) for result in results] == [True, True]
+
+
+def test_extract_endpoints_use_process_pool(fake_tesserocr, monkeypatch):
+    # The default OCR pool mode; the client fixture swaps in threads instead
+    pool = WorkerPool("ocr-process", max_workers=1, use_processes=True)
+    monkeypatch.setattr(ocr_router, "ocr_pool", pool)
+    monkeypatch.setattr(ocr_router, "ocr_cache", OCRResultCache())
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+    page = ("page.png", encode_png(render_text_image()), "image/png")
+
+    try:
+        with TestClient(app) as client:
+            single = client.post("/api/v1/ocr/extract", files={"file": page})
+            pages = client.post("/api/v1/ocr/extract-pages", files=[("files", page)])
+    finally:
+        pool.shutdown()
+
+    assert single.status_code == 200, single.text
+    assert single.json()["extracted_text"].startswith(fake_tesserocr)
+    assert pages.status_code == 200, pages.text
+    assert pages.json()["pages"][0]["cached"] is True
+
+
+def synthetic_photo(width: int = 4000, height: int = 3000, angle: float = 0.0) -> np.ndarray:
+    """Grayscale 12 MP 'photo' with a block of large text off-center"""
+    img = np.full((height, width), 235, dtype=np.uint8)
+    for i in range(10):
+        cv2.putText(img, "The quick brown fox jumps over the lazy dog", (1500, 1200 + i * 90),
+                    cv2.FONT_HERSHEY_SIMPLEX, 2.2, 20, 5)
+    if angle:
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        img = cv2.warpAffine(img, matrix, (width, height), borderValue=235)
+    return img
+
+
+def test_normalize_layout_crops_and_rescales_large_photo(monkeypatch):
+    monkeypatch.delenv("OCR_CROP_TO_TEXT", raising=False)
+    monkeypatch.delenv("OCR_TARGET_TEXT_HEIGHT", raising=False)
+    service = OCRService()
+    # Opt-in until their accuracy is benchmarked
+    assert (service.crop_to_text, service.target_text_height) == (False, 0)
+    service.crop_to_text, service.target_text_height = True, 30
+
+    gray = synthetic_photo()
+    normalized = service.normalize_layout(gray)
+
+    assert normalized.size < gray.size / 8
+    assert (normalized < 128).mean() > 0.02
+
+    # Disabled stages leave the image untouched
+    service.crop_to_text, service.target_text_height, service.max_dimension = False, 0, 0
+    assert service.normalize_layout(gray).shape == gray.shape
+
+
+@pytest.mark.parametrize("angle", [-4.0, 3.0])
+def test_estimate_skew_recovers_rotation(angle):
+    gray = synthetic_photo(angle=angle)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    assert OCRService.estimate_skew(binary) == pytest.approx(-angle, abs=0.5)
+
+
+def test_ocr_cache_exact_and_perceptual_hits(tmp_path):
+    path = str(tmp_path / "ocr.sqlite3")
+    slide = render_text_image("Mitochondria make ATP", width=800, height=200)
+    other = render_text_image("Photosynthesis in leaves", width=800, height=200)
+
+    cache = OCRResultCache(path, perceptual=True, max_distance=6, fingerprint="v1")
+    text, signature = cache.lookup(encode_png(slide))
+    assert text is None
+    cache.store_result(signature, "Mitochondria make ATP")
+
+    assert cache.lookup(encode_png(slide))[0] == "Mitochondria make ATP"
+    # Re-encoded, resized copy of the same slide matches perceptually
+    photo = cv2.imencode(".jpg", cv2.resize(slide, (1200, 300)), [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes()
+    assert cache.lookup(photo)[0] == "Mitochondria make ATP"
+    assert cache.lookup(encode_png(other))[0] is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["perceptual_hits"], stats["misses"]) == (1, 1, 2)
+    cache.store.close()
+
+    # Persisted across restarts, dropped when OCR settings change
+    assert OCRResultCache(path, fingerprint="v1").lookup(encode_png(slide))[0] == "Mitochondria make ATP"
+    assert OCRResultCache(path, fingerprint="v2").lookup(encode_png(slide))[0] is None
+
+
+def test_ocr_cache_counts_are_shared_across_workers(tmp_path):
+    path = str(tmp_path / "metrics.sqlite3")
+    # Two registries on one file stand in for two uvicorn workers
+    caches = [OCRResultCache(registry=MetricsRegistry(path, flush_interval=60)) for _ in range(2)]
+
+    def lookups(cache):
+        for i in range(200):
+            cache.lookup(f"image {i}".encode())
+
+    threads = [threading.Thread(target=lookups, args=(cache,)) for cache in caches for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # What each worker's background flush does every METRICS_FLUSH_INTERVAL
+    caches[1].metrics.flush()
+    assert caches[0].stats()["misses"] == caches[1].stats()["misses"] == 1600
+    caches[1].clear()
+    assert caches[0].stats()["misses"] == 0
+
+
+def test_ocr_cache_is_bounded():
+    cache = OCRResultCache(max_entries=10)
+    for i in range(25):
+        _, signature = cache.lookup(f"image {i}".encode())
+        cache.store_result(signature, f"text {i}")
+
+    assert len(cache.store) <= 10
+    assert cache.lookup(b"image 24")[0] == "text 24"
+    assert cache.lookup(b"image 0")[0] is None
+
+
+def test_extract_reuses_cached_text(client, monkeypatch):
+    calls = []
+
+    def fake_extract(image):
+        calls.append(image)
+        return "Cached slide text"
+
+    monkeypatch.setattr(ocr_service, "extract_text", fake_extract)
+    files = {"file": ("slide.png", encode_png(render_text_image()), "image/png")}
+
+    first = client.post("/api/v1/ocr/extract", files=files).json()
+    second = client.post("/api/v1/ocr/extract", files=files).json()
+
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["extracted_text"] == "Cached slide text"
+    assert len(calls) == 1
+    assert client.get("/api/v1/stats/").json()["caches"]["ocr"]["hit_rate"] == 0.5
+
+
+def test_extract_works_with_cache_disabled(client, monkeypatch):
+    # OCR_CACHE_ENABLED=false leaves the router without a cache
+    monkeypatch.setattr(ocr_router, "ocr_cache", None)
+    monkeypatch.setattr(ocr_service, "extract_text", lambda image: "Uncached slide text")
+    page = ("slide.png", encode_png(render_text_image()), "image/png")
+
+    single = client.post("/api/v1/ocr/extract", files={"file": page})
+    pages = client.post("/api/v1/ocr/extract-pages", files=[("files", page), ("files", page)])
+
+    assert single.status_code == 200
+    assert (single.json()["extracted_text"], single.json()["cached"]) == ("Uncached slide text", False)
+    assert [page["cached"] for page in pages.json()["pages"]] == [False, False]
+
+
+def test_backend_falls_back_to_pytesseract(monkeypatch):
+    monkeypatch.setattr(ocr_service_module, "tesserocr", None)
+    for requested in ("auto", "tesserocr", "pytesseract"):
+        monkeypatch.setenv("OCR_BACKEND", requested)
+        assert OCRService().backend == "pytesseract"
+
+    monkeypatch.setenv("OCR_BACKEND", "cuneiform")
+    with pytest.raises(ValueError):
+        OCRService()
+
+
+def test_tesserocr_backend_reuses_engine_per_thread(monkeypatch):
+    created = []
+
+    class FakeAPI:
+        def __init__(self, **kwargs):
+            created.append(threading.get_ident())
+
+        def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+            assert len(data) == height * bytes_per_line
+            self.size = (width, height)
+
+        def GetUTF8Text(self):
+            return "%dx%d\n" % self.size
+
+    fake = SimpleNamespace(
+        PyTessBaseAPI=FakeAPI, PSM=SimpleNamespace(SINGLE_BLOCK=6), OEM=SimpleNamespace(DEFAULT=3)
+    )
+    monkeypatch.setattr(ocr_service_module, "tesserocr", fake)
+    monkeypatch.setattr(ocr_service_module, "_engines", threading.local())
+    monkeypatch.setenv("OCR_BACKEND", "auto")
+    service = OCRService()
+    assert service.backend == "tesserocr"
+
+    image = render_text_image()
+    expected = "%dx%d" % service.preprocess_image(image).shape[::-1]
+    assert [service.extract_text(image) for _ in range(5)] == [expected] * 5
+
+    worker = threading.Thread(target=service.extract_text, args=(image,))
+    worker.start()
+    worker.join()
+    assert len(created) == 2
+
+
+def test_extract_pages_rejects_oversized_request(client, monkeypatch):
+    page = encode_png(render_text_image())
+    monkeypatch.setattr(ocr_router, "MAX_REQUEST_UPLOAD_BYTES", len(page) * 2)
+
+    response = client.post(
+        "/api/v1/ocr/extract-pages",
+        files=[("files", (f"page{i}.png", page, "image/png")) for i in range(3)],
+    )
+
+    assert response.status_code == 413
+    assert "per-request limit" in response.json()["detail"]
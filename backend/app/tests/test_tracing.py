@@ -0,0 +1,129 @@
+"""
+Tests for request tracing, Server-Timing and request profiling
+"""
+
+import asyncio
+import os
+import pstats
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as main_module
+from app.api.v1 import flashcards as flashcards_router
+from app.main import app
+from app.services.tracing import (
+    RequestProfiler, StageHistograms, current_trace, stage_histograms, start_trace, trace_stage
+)
+from app.services import tracing as tracing_module
+from app.services.worker_pool import WorkerPool
+
+
+def _staged_job(name: str) -> str:
+    """Pool job with one traced stage (module level so worker processes can import it)"""
+    with trace_stage(name):
+        time.sleep(0.01)
+    return name.upper()
+
+
+def _slow_generate(text: str):
+    with trace_stage("sentence_split"):
+        sentences = text.split(". ")
+    with trace_stage("embedding"):
+        deadline = time.perf_counter() + 0.02
+        while time.perf_counter() < deadline:
+            pass
+    return ({f"Card {i + 1}": s for i, s in enumerate(sentences)}, len(text.split()), len(text.split())), False
+
+
+def test_trace_stages_reach_trace_histograms_and_server_timing():
+    histograms = StageHistograms(window_seconds=60)
+
+    with start_trace() as trace:
+        for name in ("split", "embed", "split"):
+            with trace_stage(name):
+                pass
+            histograms.observe(name, 0.01)
+        assert current_trace() is trace
+    assert current_trace() is None
+
+    header = trace.server_timing(total=0.5)
+    assert header.startswith("split;dur=") and 'desc="2 calls", embed;dur=' in header
+    assert header.endswith("total;dur=500.0")
+    assert [name for name, _ in trace.stages] == ["split", "embed", "split"]
+
+    summary = histograms.summary()
+    assert summary["split"]["count"] == 2
+    assert summary["embed"]["p50_ms"] == pytest.approx(10.0)
+
+
+def test_rolling_histograms_drop_old_durations(monkeypatch):
+    histograms = StageHistograms(window_seconds=10)
+    now = [1000.0]
+    monkeypatch.setattr(tracing_module.time, "monotonic", lambda: now[0])
+
+    histograms.observe("ocr_recognize", 2.0)
+    now[0] += 11
+    histograms.observe("ocr_recognize", 0.1)
+
+    assert histograms.summary()["ocr_recognize"]["count"] == 1
+    assert histograms.summary()["ocr_recognize"]["max_ms"] == pytest.approx(100.0)
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_worker_pool_carries_trace_to_workers(use_processes, monkeypatch):
+    monkeypatch.setenv("METRICS_DB_PATH", "")
+    pool = WorkerPool("test", max_workers=2, use_processes=use_processes)
+
+    async def scenario():
+        with start_trace(profiling=True) as trace:
+            single = await pool.run(_staged_job, "solo")
+            batch = await pool.map(_staged_job, ["batch", "batch"])
+        return trace, single, batch
+
+    try:
+        trace, single, batch = asyncio.run(scenario())
+        # Untraced calls still return plain results
+        assert asyncio.run(pool.run(_staged_job, "plain")) == "PLAIN"
+    finally:
+        pool.shutdown()
+
+    assert (single, batch) == ("SOLO", ["BATCH", "BATCH"])
+    totals = trace.totals()
+    assert totals["solo"][1] == 1 and totals["batch"][1] == 2
+    assert totals["test_queue"][1] == 3
+    assert totals["batch"][0] >= 0.02
+    functions = {name for _, _, name in trace.merged_profile().stats}
+    assert "_staged_job" in functions
+
+
+def test_server_timing_header_and_slow_request_profile(monkeypatch, tmp_path):
+    pool = WorkerPool("nlp", max_workers=1)
+    monkeypatch.setattr(flashcards_router, "nlp_pool", pool)
+    monkeypatch.setattr(flashcards_router.flashcard_service, "generate_flashcards_cached", _slow_generate)
+    monkeypatch.setattr(main_module, "request_profiler", RequestProfiler("header", 0.0, str(tmp_path), keep=1))
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+    stage_histograms.reset()
+    text = "Photosynthesis converts light into energy. Plants store it as glucose."
+
+    try:
+        with TestClient(app) as client:
+            plain = client.post("/api/v1/flashcards/text", json={"text": text})
+            profiled = client.post("/api/v1/flashcards/text", json={"text": text}, headers={"X-Profile": "1"})
+            stages = client.get("/api/v1/stats/stages").json()
+    finally:
+        pool.shutdown()
+
+    timing = plain.headers["Server-Timing"]
+    for stage in ("nlp_queue", "sentence_split", "embedding", "total"):
+        assert f"{stage};dur=" in timing
+    assert "X-Profile" not in plain.headers
+
+    path = tmp_path / profiled.headers["X-Profile"]
+    assert os.listdir(tmp_path) == [path.name]
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "_slow_generate" in functions
+
+    assert stages["stages"]["embedding"]["count"] == 2
+    assert stages["stages"]["embedding"]["p50_ms"] >= 20
@@ -0,0 +1,322 @@
+"""
+Tests for the TTS service and router (offline: a stub replaces gTTS)
+"""
+
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1 import tts as tts_router
+from app.main import app
+from app.services.stats_service import stats_service
+from app.services.tts_backends import MP3Backend, StubBackend, concat_wav
+from app.services.tts_service import TTSService, split_chunks
+from app.services.worker_pool import WorkerPool
+
+
+class RecordingBackend(MP3Backend):
+    """Returns the text as 'audio' and records calls"""
+
+    name = "recording"
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        self.calls.append((text, lang))
+        time.sleep(self.delay)
+        return f"{lang}:{text}".encode("utf-8")
+
+
+@pytest.fixture
+def stub():
+    return RecordingBackend()
+
+
+@pytest.fixture
+def service(tmp_path, stub):
+    return TTSService(audio_dir=str(tmp_path / "audio"), backend=stub)
+
+
+def test_identical_text_reuses_audio(service, stub):
+    path, hit = service.text_to_speech_cached("Photosynthesis makes glucose")
+    again, hit_again = service.text_to_speech_cached("  Photosynthesis   makes glucose ")
+
+    assert (hit, hit_again) == (False, True)
+    assert path == again
+    assert len(stub.calls) == 1
+    assert service.stats()["hit_rate"] == 0.5
+
+    other, _ = service.text_to_speech_cached("Photosynthesis makes glucose", lang="fr")
+    assert other != path
+    assert len(os.listdir(service.audio_dir)) == 2
+
+
+def test_engine_is_part_of_the_key(tmp_path, stub):
+    a = TTSService(audio_dir=str(tmp_path), backend=stub)
+    b = TTSService(audio_dir=str(tmp_path), backend=StubBackend())
+    assert a.cache_key("same text", "en") != b.cache_key("same text", "en")
+
+
+def test_concurrent_requests_synthesize_once(tmp_path):
+    stub = RecordingBackend(delay=0.2)
+    service = TTSService(audio_dir=str(tmp_path), backend=stub)
+
+    threads = [threading.Thread(target=service.text_to_speech, args=("Same card",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stub.calls) == 1
+    assert (service.hits, service.misses) == (3, 1)
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_eviction_bounds_directory_size(service):
+    service.max_bytes = 100
+    paths = [service.text_to_speech(f"Card number {i:02d}") for i in range(20)]
+
+    service.evict(force=True)
+    sizes = [os.path.getsize(os.path.join(service.audio_dir, f)) for f in os.listdir(service.audio_dir)]
+    assert sum(sizes) <= 100
+    # Most recently written audio survives
+    assert os.path.exists(paths[-1])
+    assert not os.path.exists(paths[0])
+    assert service.stats()["evictions"] > 0
+
+
+def test_eviction_removes_expired_audio(service, stub):
+    old = service.text_to_speech("An old card")
+    fresh = service.text_to_speech("A fresh card")
+    os.utime(old, (time.time() - 3600, time.time() - 3600))
+
+    service.max_age = 60
+    assert service.evict(force=True) == 1
+    assert not os.path.exists(old) and os.path.exists(fresh)
+
+    # Expired audio is synthesized again on the next request
+    service.text_to_speech("An old card")
+    assert len(stub.calls) == 3
+
+
+def test_split_chunks_keeps_sentences_whole():
+    text = "First sentence here. Second one! A third, longer sentence that runs on? Fourth."
+    chunks = split_chunks(text, 40)
+
+    assert " ".join(chunks) == text
+    assert chunks[0] == "First sentence here. Second one!"
+    assert all(chunk[-1] in ".!?" for chunk in chunks)
+    assert split_chunks("One short sentence.", 40) == ["One short sentence."]
+
+
+def test_long_text_is_synthesized_in_concurrent_chunks(tmp_path):
+    stub = RecordingBackend(delay=0.2)
+    service = TTSService(audio_dir=str(tmp_path), backend=stub)
+    service.chunk_chars, service.chunk_workers = 40, 4
+    text = " ".join(f"Sentence number {i} is about cells." for i in range(4))
+
+    start = time.perf_counter()
+    path = service.text_to_speech(text)
+    elapsed = time.perf_counter() - start
+
+    assert len(stub.calls) == 4
+    assert elapsed < 0.6
+    with open(path, "rb") as f:
+        assert f.read() == b"".join(f"en:Sentence number {i} is about cells.".encode() for i in range(4))
+
+
+def test_wav_chunks_are_joined():
+    backend = StubBackend()
+    parts = [backend.synthesize("one two", "en"), backend.synthesize("three", "en")]
+    joined = concat_wav(parts)
+    # Header written once, frames appended
+    assert len(joined) == sum(len(part) - 44 for part in parts) + 44
+
+
+@pytest.fixture
+def client(service, monkeypatch):
+    pool = WorkerPool("tts-test", max_workers=2)
+    monkeypatch.setattr(tts_router, "tts_pool", pool)
+    monkeypatch.setattr(tts_router, "tts_service", service)
+    monkeypatch.setitem(stats_service.caches, "tts", service)
+    monkeypatch.setenv("MODEL_LOADING", "lazy")
+    with TestClient(app) as test_client:
+        yield test_client
+    pool.shutdown()
+
+
+def test_generate_endpoint_reports_cache_hits(client, stub):
+    first = client.post("/api/v1/tts/generate", json={"text": "Mitochondria make ATP"}).json()
+    download = client.post("/api/v1/tts/generate-and-download", json={"text": "Mitochondria make ATP"})
+    stats = client.get("/api/v1/stats/").json()
+
+    assert first["cached"] is False
+    assert download.headers["X-Cache"] == "hit"
+    assert download.content == b"en:Mitochondria make ATP"
+    assert stats["caches"]["tts"]["hits"] == 1
+    assert len(stub.calls) == 1
+
+
+def test_download_supports_range_requests(client):
+    url, body = "/api/v1/tts/generate-and-download", {"text": "Range requests let players seek"}
+    full = client.post(url, json=body)
+    assert full.headers["Accept-Ranges"] == "bytes"
+
+    partial = client.post(url, json=body, headers={"Range": "bytes=3-9"})
+    assert partial.status_code == 206
+    assert partial.content == full.content[3:10]
+    assert partial.headers["Content-Range"] == f"bytes 3-9/{len(full.content)}"
+
+    suffix = client.post(url, json=body, headers={"Range": "bytes=-5"})
+    assert suffix.content == full.content[-5:]
+
+    beyond = client.post(url, json=body, headers={"Range": f"bytes={len(full.content)}-"})
+    assert beyond.status_code == 416
+
+
+def test_streamed_download_is_cached_for_next_request(client, stub):
+    text = "First sentence streams early. Then the second one. And a third."
+    streamed = client.post("/api/v1/tts/generate-and-download?stream=true", json={"text": text})
+    assert streamed.headers["X-Cache"] == "miss"
+    assert streamed.content == b"".join(
+        f"en:{sentence}".encode() for sentence in
+        ("First sentence streams early.", "Then the second one. And a third.")
+    )
+
+    cached = client.get("/api/v1/tts/stream", params={"text": text}, headers={"Range": "bytes=0-3"})
+    assert cached.status_code == 206
+    assert cached.headers["X-Cache"] == "hit"
+    assert cached.content == b"en:F"
+    assert len(stub.calls) == 2
+
+
+def test_stream_rejects_blank_text_before_cache_lookup(client, stub, monkeypatch):
+    monkeypatch.setattr(tts_router.tts_service, "cached_path", None)
+
+    assert client.get("/api/v1/tts/stream", params={"text": "   "}).status_code == 400
+    response = client.post("/api/v1/tts/generate-and-download?stream=true", json={"text": " \n "})
+    assert response.status_code == 400
+    assert stub.calls == []
+
+
+def test_stream_aborts_instead_of_truncating_on_synthesis_error(client, stub, monkeypatch):
+    def synthesize(text, lang):
+        if text.startswith("Second"):
+            raise RuntimeError("engine unavailable")
+        return text.encode("utf-8")
+
+    monkeypatch.setattr(stub, "synthesize", synthesize)
+    with pytest.raises(RuntimeError, match="engine unavailable"):
+        client.get("/api/v1/tts/stream", params={"text": "First part. Second part."})
+
+
+def test_stream_yields_first_sentence_before_synthesis_finishes(tmp_path):
+    service = TTSService(audio_dir=str(tmp_path), backend=RecordingBackend(delay=0.2))
+    service.chunk_chars, service.chunk_workers = 30, 1
+
+    start = time.perf_counter()
+    chunks = service.stream_speech("One. Two is here. Three is here.")
+    next(chunks)
+    first_byte = time.perf_counter() - start
+    list(chunks)
+    total = time.perf_counter() - start
+
+    assert first_byte < 0.3 < total
+    assert service.cached_path("One. Two is here. Three is here.") is not None
+
+
+def test_audio_route_only_serves_cached_files(client, service):
+    path = service.text_to_speech("Served by name")
+    name = os.path.basename(path)
+
+    assert client.get(f"/api/v1/tts/audio/{name}").content == b"en:Served by name"
+    assert client.get("/api/v1/tts/audio/..%2F..%2Fapp%2Fmain.py").status_code == 404
+    assert client.get("/api/v1/tts/audio/" + "0" * 32 + ".mp3").status_code == 404
+
+
+def mp3_frames(count: int) -> bytes:
+    """MPEG-2 Layer III frames (24 kHz, 32 kbps) behind an ID3 tag, as gTTS produces"""
+    frame = bytes([0xFF, 0xF3, 0x44, 0xC4]) + bytes(92)
+    return b"ID3\x04\x00\x00\x00\x00\x00\x05" + b"title" + frame * count
+
+
+def test_mp3_duration_counts_frames():
+    assert MP3Backend().duration(mp3_frames(125)) == pytest.approx(3.0)
+
+
+# ID3v1 trailer whose title happens to look like a frame header
+ID3V1 = b"TAG" + bytes([0xFF, 0xF3, 0x44, 0xC4]) + bytes(121)
+
+
+def test_mp3_concat_keeps_only_the_first_id3v2_tag():
+    parts = [mp3_frames(50) + ID3V1, mp3_frames(25) + ID3V1, mp3_frames(25)]
+    backend = MP3Backend()
+
+    joined = backend.concat(parts)
+
+    assert joined.startswith(b"ID3") and joined.count(b"ID3") == 1
+    assert b"TAG" not in joined
+    assert b"".join(backend.stream(parts)) == joined
+    assert backend.duration(joined) == pytest.approx(2.4)
+    # Tags are skipped when measuring, wherever they are
+    assert backend.duration(b"".join(parts)) == pytest.approx(2.4)
+    assert backend.duration(parts[0]) == pytest.approx(1.2)
+
+
+def test_deck_track_has_per_card_offsets(client, service, monkeypatch):
+    service.backend = StubBackend()
+    deck = {"Point 1": "One two three", "Point 2": "Four five", "Point 3": "Six"}
+
+    response = client.post("/api/v1/tts/deck", json={"flashcards": deck, "count": 3})
+    assert response.status_code == 200
+    body = response.json()
+
+    assert [card["key"] for card in body["cards"]] == list(deck)
+    # Stub audio is 0.15s per word
+    assert [card["duration"] for card in body["cards"]] == [0.45, 0.3, 0.15]
+    assert [card["offset"] for card in body["cards"]] == [0.0, 0.45, 0.75]
+    assert body["duration"] == pytest.approx(0.9)
+
+    track = client.get(body["audio_url"])
+    assert track.headers["content-type"] == "audio/wav"
+    assert service.backend.duration(track.content) == pytest.approx(0.9)
+
+    # Cards are cached individually and shared with /generate
+    single = client.post("/api/v1/tts/generate", json={"text": "Four five"}).json()
+    assert single["cached"] is True
+
+
+def test_deck_zip_contains_cards_and_manifest(client, service):
+    deck = {"Point 1": "Alpha card", "Point 2": "Beta card"}
+    body = client.post("/api/v1/tts/deck", json={"flashcards": deck, "format": "zip"}).json()
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get(body["audio_url"]).content))
+    assert archive.namelist() == ["01.mp3", "02.mp3", "manifest.json"]
+    assert archive.read("02.mp3") == b"en:Beta card"
+    manifest = json.loads(archive.read("manifest.json"))
+    assert [card["key"] for card in manifest["cards"]] == ["Point 1", "Point 2"]
+
+
+def test_deck_survives_eviction_of_its_own_cards(client, service, stub):
+    # Room for about two cards: storing each card evicts the earlier ones
+    service.max_bytes = 40
+    deck = {f"Point {i}": f"Card number {i:02d}" for i in range(6)}
+
+    response = client.post("/api/v1/tts/deck", json={"flashcards": deck, "format": "zip"})
+    assert response.status_code == 200
+    assert service.stats()["evictions"] > 0
+
+    body = response.json()
+    archive = zipfile.ZipFile(io.BytesIO(client.get(body["audio_url"]).content))
+    assert [archive.read(f"{i + 1:02d}.mp3") for i in range(6)] == [
+        f"en:Card number {i:02d}".encode() for i in range(6)
+    ]
+    assert len(stub.calls) == 6
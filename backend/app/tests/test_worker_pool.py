@@ -0,0 +1,110 @@
+"""
+Tests for the worker pool execution layer
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.worker_pool import JobTimeoutError, PoolOverloadedError, WorkerPool
+
+
+def test_event_loop_stays_responsive_while_jobs_run():
+    pool = WorkerPool("test", max_workers=2, max_queue=4)
+
+    async def scenario():
+        jobs = [asyncio.create_task(pool.run(time.sleep, 0.3)) for _ in range(2)]
+        worst = 0.0
+        while not all(job.done() for job in jobs):
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - start)
+        await asyncio.gather(*jobs)
+        return worst
+
+    try:
+        assert asyncio.run(scenario()) < 0.1
+    finally:
+        pool.shutdown()
+
+
+def test_queue_limit_rejects_overload():
+    pool = WorkerPool("test", max_workers=1, max_queue=1)
+
+    async def scenario():
+        jobs = [asyncio.create_task(pool.run(time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PoolOverloadedError):
+            await pool.run(time.sleep, 0.2)
+        await asyncio.gather(*jobs)
+        # Slots are released once jobs finish
+        await pool.run(time.sleep, 0)
+
+    try:
+        asyncio.run(scenario())
+        assert pool.stats()["rejected"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_job_timeout():
+    pool = WorkerPool("test", max_workers=1, timeout=0.05)
+    try:
+        with pytest.raises(JobTimeoutError):
+            asyncio.run(pool.run(time.sleep, 0.3))
+        assert pool.stats()["timed_out"] == 1
+    finally:
+        pool.shutdown()
+
+
+def _count_then_fail(n: int):
+    """Generator job (module level so worker processes can import it)"""
+    yield from range(n)
+    raise ValueError("pipeline failed")
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_iterate_streams_items_and_errors(use_processes):
+    pool = WorkerPool("test", max_workers=1, use_processes=use_processes)
+
+    async def scenario():
+        items = []
+        with pytest.raises(ValueError, match="pipeline failed"):
+            async for item in pool.iterate(_count_then_fail, 3):
+                items.append(item)
+
+        # Closing early stops the generator and frees the slot
+        events = pool.iterate(_count_then_fail, 1000)
+        first = await events.__anext__()
+        await events.aclose()
+        return items, first
+
+    try:
+        assert asyncio.run(scenario()) == ([0, 1, 2], 0)
+        time.sleep(0.2)
+        assert pool.stats()["pending"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_map_takes_a_slot_per_item_until_each_finishes():
+    pool = WorkerPool("test", max_workers=1, max_queue=2, timeout=0.05)
+
+    async def scenario():
+        with pytest.raises(JobTimeoutError):
+            await pool.map(time.sleep, [0.3, 0.3])
+        # The running item still holds its slot after the batch timed out
+        assert pool.stats()["pending"] == 1
+        with pytest.raises(PoolOverloadedError):
+            await pool.map(time.sleep, [0, 0, 0])
+        await asyncio.sleep(0.4)
+        assert pool.stats()["pending"] == 0
+
+        # A batch larger than the whole queue still runs in an idle pool
+        return await pool.map(abs, [-1, -2, -3, -4], timeout=5)
+
+    try:
+        assert asyncio.run(scenario()) == [1, 2, 3, 4]
+    finally:
+        pool.shutdown()
@@ -0,0 +1,141 @@
+"""
+File Handling Utilities
+In-memory upload reading with a size cap and ranged file responses
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """
+    Read an uploaded file into memory, rejecting oversized uploads
+
+    Args:
+        file: Uploaded file
+        max_bytes: Maximum accepted size in bytes
+
+    Returns:
+        File content as bytes
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File exceeds maximum upload size of {max_bytes} bytes")
+
+    chunks = []
+    total = 0
+    while chunk := await file.read(READ_CHUNK_SIZE):
+        total += len(chunk)
+        if total > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File exceeds maximum upload size of {max_bytes} bytes")
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+async def read_uploads(files: List[UploadFile], max_bytes: int, max_total_bytes: int) -> List[bytes]:
+    """
+    Read all uploads of one request, capping each file and their total size
+
+    Args:
+        files: Uploaded files
+        max_bytes: Maximum accepted size of one file in bytes
+        max_total_bytes: Maximum accepted size of all files together in bytes
+
+    Returns:
+        File contents in upload order
+    """
+    detail = f"Uploads exceed the per-request limit of {max_total_bytes} bytes"
+    if sum(file.size or 0 for file in files) > max_total_bytes:
+        raise HTTPException(status_code=413, detail=detail)
+
+    contents = []
+    total = 0
+    for file in files:
+        content = await read_upload(file, max_bytes)
+        total += len(content)
+        if total > max_total_bytes:
+            raise HTTPException(status_code=413, detail=detail)
+        contents.append(content)
+    return contents
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header
+
+    Args:
+        header: Range header value, e.g. "bytes=0-1023", "bytes=500-" or "bytes=-500"
+        size: File size in bytes
+
+    Returns:
+        Inclusive (start, end) byte positions, or None to send the whole file
+        (no header, other units or multiple ranges)
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416, detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def file_range_response(path: str, range_header: Optional[str], media_type: str,
+                        filename: Optional[str] = None, headers: Optional[dict] = None) -> Response:
+    """
+    Serve a file, honoring a Range header so players can seek and resume
+
+    Args:
+        path: File to serve
+        range_header: Request's Range header, if any
+        media_type: Content type
+        filename: Download filename (sent as an attachment)
+        headers: Extra response headers
+
+    Returns:
+        200 FileResponse or 206 partial response
+    """
+    size = os.path.getsize(path)
+    headers = {"Accept-Ranges": "bytes", **(headers or {})}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    byte_range = parse_range(range_header, size)
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+
+    def read_range():
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    headers.update({
+        "Content-Range": f"bytes {start}-{end}/{size}",
+        "Content-Length": str(end - start + 1),
+    })
+    return StreamingResponse(read_range(), status_code=206, media_type=media_type, headers=headers)
@@ -0,0 +1,33 @@
+"""
+Text Cleaning Utilities
+Normalization and hashing helpers shared by the caches
+"""
+
+import hashlib
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize unicode forms and collapse whitespace
+
+    Args:
+        text: Raw input text
+
+    Returns:
+        Normalized text
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def text_hash(text: str) -> str:
+    """
+    Content hash of normalized text
+
+    Args:
+        text: Raw input text
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
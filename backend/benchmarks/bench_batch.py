@@ -0,0 +1,57 @@
+"""
+Benchmark: batch flashcard generation vs one call per document
+Requires the configured spaCy and SentenceTransformer models.
+Usage: python -m benchmarks.bench_batch [--docs 100] [--sentences 15]
+"""
+
+import argparse
+import os
+
+# Measure the pipeline itself, not the caches
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBEDDING_BATCH_ENABLED", "false")
+
+from app.services.flashcard_service import flashcard_service  # noqa: E402
+from benchmarks.common import best_of  # noqa: E402
+
+TOPICS = ["photosynthesis", "the French revolution", "linear algebra", "plate tectonics",
+          "supply and demand", "cell division", "the water cycle", "machine learning"]
+
+
+def make_documents(docs: int, sentences: int) -> list:
+    """Deterministic course sections made of simple topical sentences"""
+    return [
+        " ".join(
+            f"Section {d} point {s} explains how {TOPICS[(d + s) % len(TOPICS)]} "
+            f"relates to {TOPICS[(d * s) % len(TOPICS)]} in lesson {s}."
+            for s in range(sentences)
+        )
+        for d in range(docs)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--sentences", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = make_documents(args.docs, args.sentences)
+
+    # Warm up models
+    flashcard_service.generate_flashcards(texts[0])
+
+    single = best_of(lambda: [flashcard_service.generate_flashcards(t) for t in texts], args.repeat)
+    batch = best_of(lambda: flashcard_service.generate_flashcards_batch(texts), args.repeat)
+
+    same = [flashcard_service.generate_flashcards(t) for t in texts] == \
+        flashcard_service.generate_flashcards_batch(texts)
+    print(f"{args.docs} documents x {args.sentences} sentences")
+    print(f"  single calls: {single:.3f}s ({args.docs / single:.1f} docs/s)")
+    print(f"  batch call:   {batch:.3f}s ({args.docs / batch:.1f} docs/s)")
+    print(f"  speedup:      {single / batch:.2f}x  identical results: {same}")
+
+
+if __name__ == "__main__":
+    main()
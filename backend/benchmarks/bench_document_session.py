@@ -0,0 +1,116 @@
+"""
+Benchmark: regenerating flashcards after a one-sentence edit
+Usage: python -m benchmarks.bench_document_session [--sentences 2000] [--encode-ms 0]
+
+Compares a full generate_flashcards run (with a cold and a warm embedding
+cache) against an incremental document-session update. Uses the
+configured spaCy model and embedder; --encode-ms N swaps the embedder for
+synthetic vectors costing N ms per sentence, for machines without the
+model.
+"""
+
+import argparse
+import statistics
+import time
+import zlib
+
+import numpy as np
+
+from app.services.document_sessions import DocumentSessionService
+from app.services.embedding_cache import EmbeddingCache
+from app.services.flashcard_service import FlashcardService
+from app.services.nlp_pipeline import nlp_pipeline
+
+TOPICS = ["photosynthesis", "the French Revolution", "machine learning", "plate tectonics",
+          "supply and demand", "cell division", "the water cycle", "electric circuits"]
+
+
+class SyntheticEmbedder:
+    """Deterministic 384-d vectors with a fixed per-sentence encode cost"""
+
+    def __init__(self, ms_per_sentence: float):
+        self.seconds_per_sentence = ms_per_sentence / 1000
+
+    def encode(self, sentences: list) -> np.ndarray:
+        time.sleep(self.seconds_per_sentence * len(sentences))
+        vectors = []
+        for sentence in sentences:
+            topic = next((i for i, t in enumerate(TOPICS) if t in sentence), 0)
+            rng = np.random.default_rng(zlib.crc32(sentence.encode()))
+            # Non-negative components keep cosine weights positive, like real embeddings
+            vector = rng.random(384)
+            vector[topic * 48:(topic + 1) * 48] += 1.0
+            vectors.append(vector)
+        return np.array(vectors, dtype=np.float32)
+
+
+def make_document(sentences: int, edit: int = None) -> str:
+    """Paragraphs of eight sentences; edit rewrites one sentence"""
+    lines = [f"Note {i} covers how {TOPICS[i % len(TOPICS)]} connects to example {i % 13}."
+             for i in range(sentences)]
+    if edit is not None:
+        lines[edit] = f"Note {edit} was revised to stress {TOPICS[(edit + 3) % len(TOPICS)]} instead."
+    return "\n\n".join(" ".join(lines[i:i + 8]) for i in range(0, sentences, 8))
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--edits", type=int, default=5)
+    parser.add_argument("--encode-ms", type=float, default=0, help="Synthetic encode cost per sentence (0 = real model)")
+    args = parser.parse_args()
+
+    if args.encode_ms:
+        nlp_pipeline._embedder = SyntheticEmbedder(args.encode_ms)
+    nlp_pipeline.embedding_batcher = None
+    nlp_pipeline.load()
+
+    original = make_document(args.sentences)
+    edits = [make_document(args.sentences, edit=(i + 1) * args.sentences // (args.edits + 2))
+             for i in range(args.edits)]
+
+    # Full run, every sentence embedded again
+    nlp_pipeline.embedding_cache = None
+    cold = [timed(lambda: FlashcardService.generate_flashcards(text)) for text in edits[:2]]
+
+    # Full run, unchanged sentences served from the embedding cache
+    nlp_pipeline.embedding_cache = EmbeddingCache(nlp_pipeline.embedding_identity, memory_size=args.sentences * 2)
+    FlashcardService.generate_flashcards(original)
+    warm = [timed(lambda: FlashcardService.generate_flashcards(text)) for text in edits]
+
+    # Incremental session, each edit applied to the previous version
+    nlp_pipeline.embedding_cache = None
+    sessions = DocumentSessionService()
+    initial = timed(lambda: sessions.generate("doc", original))
+    incremental = []
+    for text in edits:
+        incremental.append(timed(lambda: sessions.generate("doc", text)))
+        sessions.generate("doc", original)
+
+    full_result = FlashcardService.generate_flashcards(edits[-1])
+    session_result, _ = sessions.generate("doc", edits[-1])
+
+    print(f"sentences={args.sentences} edits={args.edits} "
+          f"embedder={'synthetic %gms' % args.encode_ms if args.encode_ms else nlp_pipeline.embedding_model_name}")
+    print(f"{'mode':>32} {'median (ms)':>12}")
+    rows = [
+        ("full run, cold embedding cache", cold),
+        ("full run, warm embedding cache", warm),
+        ("session, first version", [initial]),
+        ("session, one-sentence edit", incremental),
+    ]
+    baseline = statistics.median(warm)
+    for label, timings in rows:
+        median = statistics.median(timings)
+        print(f"{label:>32} {median * 1000:>12.1f}  ({baseline / median:.1f}x vs warm full run)")
+    print(f"same flashcards as full run: {session_result == full_result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: sentence embedding throughput and memory per backend
+Requires torch, sentence-transformers and onnxruntime (the first ONNX run
+also exports the model into EMBEDDING_ONNX_DIR).
+Usage: python -m benchmarks.bench_embedding_backends [--sentences 2000] [--threads 0]
+
+Each backend runs in its own process so peak RSS includes only that
+backend's runtime and weights.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+SENTENCES = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "The French Revolution began in 1789 and reshaped European politics.",
+    "Machine learning models learn patterns from labelled examples.",
+    "Earthquakes occur along the boundaries of tectonic plates.",
+    "Supply and demand determine the market price of most goods.",
+    "Cell division allows organisms to grow and repair damaged tissue.",
+]
+
+
+def make_sentences(count: int) -> list:
+    """Distinct sentences so neither the model nor a cache sees repeats"""
+    return [f"{SENTENCES[i % len(SENTENCES)]} (note {i})" for i in range(count)]
+
+
+def run_backend(backend: str, model: str, count: int) -> dict:
+    """Load one backend in this process and time encoding"""
+    from app.services.embedding_backends import create_embedder
+
+    start = time.perf_counter()
+    embedder = create_embedder(model, backend)
+    load_seconds = time.perf_counter() - start
+
+    sentences = make_sentences(count)
+    embedder.encode(sentences[:32])
+    start = time.perf_counter()
+    embedder.encode(sentences)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "load_s": round(load_seconds, 2),
+        "sentences_per_s": round(count / elapsed, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX_INTRA_OP_THREADS (0 = physical cores)")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, args.model, args.sentences)))
+        return
+
+    env = {**os.environ, "ONNX_INTRA_OP_THREADS": str(args.threads)}
+    print(f"model={args.model} sentences={args.sentences} cpus={os.cpu_count()} onnx_threads={args.threads}")
+    print(f"{'backend':>10} {'load (s)':>9} {'sent/s':>9} {'peak RSS (MB)':>14}")
+    baseline = None
+    for backend in args.backends.split(","):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_embedding_backends", "--child", backend,
+             "--model", args.model, "--sentences", str(args.sentences)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        baseline = baseline or result["sentences_per_s"]
+        print(f"{backend:>10} {result['load_s']:>9.2f} {result['sentences_per_s']:>9.1f} "
+              f"{result['peak_rss_mb']:>14.1f}  ({result['sentences_per_s'] / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
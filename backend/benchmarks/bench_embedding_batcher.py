@@ -0,0 +1,76 @@
+"""
+Benchmark: embedding throughput with and without cross-request micro-batching
+Usage: python -m benchmarks.bench_embedding_batcher [--model all-MiniLM-L6-v2]
+
+Without --model a stub encoder models a fixed per-call overhead plus a
+per-sentence cost, so the script runs offline.
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+def stub_encoder(call_overhead: float = 0.01, per_sentence: float = 0.0002):
+    """
+    Encoder whose cost is dominated by per-call overhead, like small model batches
+
+    A lock serializes calls because a real forward pass already uses every core.
+    """
+    lock = threading.Lock()
+
+    def encode(sentences):
+        with lock:
+            time.sleep(call_overhead + per_sentence * len(sentences))
+        return np.zeros((len(sentences), 384), dtype=np.float32)
+    return encode
+
+
+def throughput(encode, clients: int, requests_per_client: int, sentences_per_request: int) -> float:
+    """Run concurrent clients and return sentences encoded per second"""
+    batch = [f"Sentence number {i} about a topic." for i in range(sentences_per_request)]
+
+    def client(_):
+        for _ in range(requests_per_client):
+            encode(batch)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+    return clients * requests_per_client * sentences_per_request / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", help="SentenceTransformer model name (default: stub encoder)")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--sentences", type=int, default=12, help="Sentences per request")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if args.model:
+        from sentence_transformers import SentenceTransformer
+        encode = SentenceTransformer(args.model).encode
+    else:
+        encode = stub_encoder()
+
+    batcher = EmbeddingBatcher(encode, args.max_batch_size, args.max_wait_ms)
+
+    print(f"{'clients':>8} {'direct (sent/s)':>16} {'batched (sent/s)':>17} {'gain':>7}")
+    for clients in args.clients:
+        direct = throughput(encode, clients, args.requests, args.sentences)
+        batched = throughput(batcher.encode, clients, args.requests, args.sentences)
+        print(f"{clients:>8} {direct:>16.0f} {batched:>17.0f} {batched / direct:>6.2f}x")
+    print(f"batcher stats: {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
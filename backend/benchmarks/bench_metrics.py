@@ -0,0 +1,65 @@
+"""
+Benchmark: per-call cost of metrics recording
+Usage: python -m benchmarks.bench_metrics [--calls 200000] [--threads 4]
+
+Compares a bare locked counter (what StatsService used to do) with the
+buffered registry, in memory and backed by SQLite with a background flush.
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from app.services.metrics import MetricsRegistry
+
+
+def per_call_ns(fn, calls: int, threads: int) -> float:
+    def work():
+        for _ in range(calls // threads):
+            fn()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    lock = threading.Lock()
+    totals = {"count": 0}
+
+    def locked_counter():
+        with lock:
+            totals["count"] += 1
+
+    memory = MetricsRegistry()
+    shared = MetricsRegistry(path=os.path.join(tempfile.mkdtemp(), "metrics.sqlite3"), flush_interval=0.1)
+
+    print(f"calls={args.calls} threads={args.threads}")
+    print(f"{'operation':>32} {'ns/call':>10}")
+    rows = [
+        ("locked dict counter", locked_counter),
+        ("registry inc (memory)", lambda: memory.inc("events_total")),
+        ("registry inc (sqlite)", lambda: shared.inc("events_total", route="/api")),
+        ("registry observe (sqlite)", lambda: shared.observe("stage_seconds", 0.003, stage="x")),
+    ]
+    for name, fn in rows:
+        print(f"{name:>32} {per_call_ns(fn, args.calls, args.threads):>10.0f}")
+
+    start = time.perf_counter()
+    assert shared.counter_value("events_total") == args.calls // args.threads * args.threads
+    print(f"{'snapshot after flush (ms)':>32} {(time.perf_counter() - start) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
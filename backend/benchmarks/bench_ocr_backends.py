@@ -0,0 +1,73 @@
+"""
+Benchmark: OCR throughput per Tesseract backend
+Usage: python -m benchmarks.bench_ocr_backends [--images 100] [--threads 1]
+
+Compares pytesseract (temp file + tesseract process per image) with
+tesserocr (libtesseract handle reused per thread) on small rendered
+text images. Backends that are not installed are skipped.
+"""
+
+import argparse
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from app.services import ocr_service as ocr_service_module
+from app.services.ocr_service import OCRService
+from benchmarks.bench_ocr_pages import WORDS
+
+
+def render_snippet(seed: int) -> bytes:
+    """PNG of a short line of text, like a cropped flashcard or slide title"""
+    rng = np.random.default_rng(seed)
+    img = np.full((80, 560, 3), 255, dtype=np.uint8)
+    cv2.putText(img, " ".join(rng.choice(WORDS, size=3)), (10, 50),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+def available_backends() -> list:
+    backends = []
+    if shutil.which("tesseract"):
+        backends.append("pytesseract")
+    if ocr_service_module.tesserocr is not None:
+        backends.append("tesserocr")
+    return backends
+
+
+def run(service: OCRService, images: list, threads: int) -> float:
+    # Warm up: first tesserocr call per thread loads language data
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(service.extract_text, images[:threads]))
+        start = time.perf_counter()
+        list(executor.map(service.extract_text, images))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    if not backends:
+        print("Neither the tesseract binary nor tesserocr is installed")
+        return
+
+    images = [render_snippet(seed) for seed in range(args.images)]
+    print(f"{args.images} images, {args.threads} thread(s)")
+    print(f"{'backend':>12} {'total (s)':>10} {'images/s':>9} {'ms/image':>9}")
+    for backend in backends:
+        service = OCRService()
+        service.backend = backend
+        elapsed = run(service, images, args.threads)
+        print(f"{backend:>12} {elapsed:>10.2f} {args.images / elapsed:>9.1f} "
+              f"{elapsed / args.images * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
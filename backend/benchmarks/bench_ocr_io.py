@@ -0,0 +1,67 @@
+"""
+Benchmark: per-image OCR latency with a temp file vs in-memory decoding
+Usage: python -m benchmarks.bench_ocr_io [--images 50] [--with-tesseract]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+from app.services.ocr_service import ocr_service
+
+
+def synthetic_photo(width: int, height: int, seed: int) -> bytes:
+    """JPEG of text lines on a noisy background, similar to a phone photo"""
+    rng = np.random.default_rng(seed)
+    img = rng.integers(200, 256, size=(height, width, 3), dtype=np.uint8)
+    for line, y in enumerate(range(80, height - 40, 70)):
+        cv2.putText(img, f"Line {line}: flashcards from scanned notes", (40, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.4, (20, 20, 20), 3)
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def temp_file_path(content: bytes, upload_dir: str, run_ocr) -> None:
+    """Previous router flow: write upload, re-read with cv2.imread, delete"""
+    path = os.path.join(upload_dir, f"{uuid.uuid4()}.jpg")
+    with open(path, "wb") as f:
+        f.write(content)
+    run_ocr(path)
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--width", type=int, default=2000)
+    parser.add_argument("--height", type=int, default=1500)
+    parser.add_argument("--with-tesseract", action="store_true", help="Include Tesseract in the timing")
+    args = parser.parse_args()
+
+    run_ocr = ocr_service.extract_text if args.with_tesseract else ocr_service.preprocess_image
+    images = [synthetic_photo(args.width, args.height, seed) for seed in range(args.images)]
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        start = time.perf_counter()
+        for content in images:
+            temp_file_path(content, upload_dir, run_ocr)
+        disk = (time.perf_counter() - start) / len(images)
+
+    start = time.perf_counter()
+    for content in images:
+        run_ocr(content)
+    memory = (time.perf_counter() - start) / len(images)
+
+    stage = "preprocess + tesseract" if args.with_tesseract else "preprocess only"
+    print(f"{args.images} images {args.width}x{args.height} ({stage})")
+    print(f"  temp file:  {disk * 1000:.2f} ms/image")
+    print(f"  in memory:  {memory * 1000:.2f} ms/image")
+    print(f"  saved:      {(disk - memory) * 1000:.2f} ms/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: multi-page OCR scaling across worker processes
+Usage: python -m benchmarks.bench_ocr_pages [--pages 32] [--workers 1 2 4 8]
+
+Pages are synthetic rendered text images. Tesseract must be installed
+unless --preprocess-only is given.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import cv2
+import numpy as np
+
+from app.services.ocr_service import ocr_service
+from app.services.worker_pool import WorkerPool
+
+WORDS = ("flashcard memory learning review concept summary lecture notes "
+         "chapter science history method result example question answer").split()
+
+
+def render_page(seed: int, width: int = 1700, height: int = 2200, lines: int = 30) -> bytes:
+    """PNG of a page of deterministic pseudo-random text lines"""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    for line in range(lines):
+        text = " ".join(rng.choice(WORDS, size=6))
+        cv2.putText(img, text, (80, 120 + line * 68), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+def preprocess_page(image) -> dict:
+    """Per-page work without Tesseract"""
+    start = time.perf_counter()
+    ocr_service.preprocess_image(image)
+    return {"text": "", "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+async def run(pool: WorkerPool, fn, pages: list) -> float:
+    # Warm the workers so process start-up is not measured
+    await pool.map(fn, pages[:pool.max_workers])
+    start = time.perf_counter()
+    results = await pool.map(fn, pages)
+    assert len(results) == len(pages)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--preprocess-only", action="store_true")
+    args = parser.parse_args()
+
+    pages = [render_page(seed) for seed in range(args.pages)]
+    fn = preprocess_page if args.preprocess_only else ocr_service.extract_page
+
+    baseline = None  # (workers, seconds) of the first run
+    print(f"{args.pages} pages, {'preprocess only' if args.preprocess_only else 'preprocess + tesseract'}")
+    print(f"{'workers':>8} {'total (s)':>10} {'pages/s':>8} {'speedup':>8} {'efficiency':>11}")
+    for workers in args.workers:
+        pool = WorkerPool("bench", max_workers=workers, timeout=0, use_processes=True)
+        try:
+            elapsed = asyncio.run(run(pool, fn, pages))
+        finally:
+            pool.shutdown()
+        baseline = baseline or (workers, elapsed)
+        speedup = baseline[1] / elapsed
+        efficiency = speedup / (workers / baseline[0])
+        print(f"{workers:>8} {elapsed:>10.2f} {args.pages / elapsed:>8.1f} {speedup:>7.2f}x {efficiency:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: adaptive OCR preprocessing, accuracy vs latency
+Usage: python -m benchmarks.bench_ocr_preprocess [--images 12] [--preprocess-only]
+
+Renders a corpus of high-resolution "photos" (small text block on a large
+background, random skew and noise) and compares the fixed pipeline with
+the adaptive crop/rescale/deskew pipeline. Character accuracy needs the
+Tesseract binary; --preprocess-only reports latency and pixel counts only.
+"""
+
+import argparse
+import difflib
+import time
+
+import cv2
+import numpy as np
+import pytesseract
+
+from app.services.ocr_service import OCRService
+from benchmarks.bench_ocr_pages import WORDS
+
+SETTINGS = {
+    "baseline": dict(crop_to_text=False, target_text_height=0, max_dimension=0, deskew=False),
+    "adaptive": dict(crop_to_text=True, target_text_height=30, max_dimension=3000, deskew=True),
+}
+
+
+def render_photo(seed: int, width: int = 4000, height: int = 3000) -> tuple:
+    """BGR photo of a text block and the text it contains"""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width), 225, dtype=np.uint8)
+    scale = rng.uniform(1.5, 3.0)
+    x, y = int(rng.integers(200, 1200)), int(rng.integers(300, 1200))
+    lines = []
+    for line in range(8):
+        text = " ".join(rng.choice(WORDS, size=4))
+        cv2.putText(img, text, (x, y + int(line * 50 * scale)), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, 30, max(2, int(scale * 2)))
+        lines.append(text)
+
+    angle = rng.uniform(-4, 4)
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    img = cv2.warpAffine(img, matrix, (width, height), borderValue=225)
+    noise = rng.normal(0, 8, size=img.shape)
+    img = np.clip(img + noise, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR), "\n".join(lines)
+
+
+def char_accuracy(expected: str, actual: str) -> float:
+    """Similarity of the two texts ignoring whitespace layout"""
+    return difflib.SequenceMatcher(None, " ".join(expected.split()), " ".join(actual.split())).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--preprocess-only", action="store_true")
+    args = parser.parse_args()
+
+    corpus = [render_photo(seed) for seed in range(args.images)]
+    print(f"{args.images} images, {corpus[0][0].shape[1]}x{corpus[0][0].shape[0]}")
+    print(f"{'pipeline':>10} {'preprocess (ms)':>16} {'ocr (ms)':>9} {'pixels (M)':>11} {'accuracy':>9}")
+
+    for name, settings in SETTINGS.items():
+        service = OCRService()
+        for attr, value in settings.items():
+            setattr(service, attr, value)
+
+        prep_ms, ocr_ms, pixels, accuracy = [], [], [], []
+        for image, expected in corpus:
+            start = time.perf_counter()
+            processed = service.preprocess_image(image)
+            prep_ms.append((time.perf_counter() - start) * 1000)
+            pixels.append(processed.size / 1e6)
+            if args.preprocess_only:
+                continue
+            start = time.perf_counter()
+            text = pytesseract.image_to_string(processed, config="--psm 6 --oem 3")
+            ocr_ms.append((time.perf_counter() - start) * 1000)
+            accuracy.append(char_accuracy(expected, text))
+
+        ocr = f"{np.mean(ocr_ms):>9.0f}" if ocr_ms else f"{'-':>9}"
+        acc = f"{np.mean(accuracy):>9.1%}" if accuracy else f"{'-':>9}"
+        print(f"{name:>10} {np.mean(prep_ms):>16.1f} {ocr} {np.mean(pixels):>11.2f} {acc}")
+
+
+if __name__ == "__main__":
+    main()
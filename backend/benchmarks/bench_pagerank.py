@@ -0,0 +1,43 @@
+"""
+Benchmark: NetworkX PageRank vs native power iteration
+Usage: python -m benchmarks.bench_pagerank [--sizes 100 1000 5000]
+"""
+
+import argparse
+
+import networkx as nx
+import numpy as np
+
+from app.services.ranking import pagerank
+from benchmarks.common import best_of, synthetic_embeddings
+
+
+def networkx_pagerank(similarity_matrix: np.ndarray) -> dict:
+    """Previous implementation of NLPPipeline.rank_sentences_pagerank"""
+    return nx.pagerank(nx.from_numpy_array(similarity_matrix))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'sentences':>10} {'networkx (s)':>14} {'native (s)':>12} {'speedup':>9} {'max |diff|':>12}")
+    for n in args.sizes:
+        embeddings = synthetic_embeddings(n)
+        similarity = (embeddings @ embeddings.T).astype(np.float64)
+
+        # NetworkX builds O(n^2) edge objects, so only time it once at large n
+        nx_repeat = 1 if n >= 2000 else args.repeat
+        nx_time = best_of(lambda: networkx_pagerank(similarity), nx_repeat)
+        native_time = best_of(lambda: pagerank(similarity), args.repeat)
+
+        expected = networkx_pagerank(similarity)
+        diff = np.abs(pagerank(similarity) - np.array([expected[i] for i in range(n)])).max()
+
+        print(f"{n:>10} {nx_time:>14.4f} {native_time:>12.4f} {nx_time / native_time:>8.1f}x {diff:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: spaCy sentence segmentation modes
+Requires the configured spaCy model (default en_core_web_sm).
+Usage: python -m benchmarks.bench_segmentation [--words 20000]
+"""
+
+import argparse
+import tracemalloc
+
+from app.services.nlp_pipeline import SEGMENTATION_EXCLUDES, load_spacy
+from benchmarks.common import best_of
+
+SENTENCES = [
+    "Photosynthesis converts light energy into chemical energy.",
+    "The French Revolution began in 1789 and reshaped European politics.",
+    "Machine learning models learn patterns from labelled examples.",
+    "Earthquakes occur along the boundaries of tectonic plates.",
+    "Supply and demand determine the market price of most goods.",
+    "Cell division allows organisms to grow and repair damaged tissue.",
+]
+
+
+def make_text(words: int) -> str:
+    """Deterministic prose of roughly the requested word count"""
+    out, count, i = [], 0, 0
+    while count < words:
+        sentence = SENTENCES[i % len(SENTENCES)]
+        out.append(sentence)
+        count += len(sentence.split())
+        i += 1
+    return " ".join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="en_core_web_sm")
+    parser.add_argument("--words", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_text(args.words)
+    reference = None
+
+    print(f"{'mode':>12} {'load (s)':>9} {'split (s)':>10} {'peak MB':>8} {'sentences':>10} {'same as full':>13}")
+    for mode in SEGMENTATION_EXCLUDES:
+        load_time = best_of(lambda: load_spacy(args.model, mode), 1)
+        nlp = load_spacy(args.model, mode)
+
+        split = lambda: [s.text for s in nlp(text).sents]
+        elapsed = best_of(split, args.repeat)
+
+        tracemalloc.start()
+        sentences = split()
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+        reference = sentences if reference is None else reference
+        print(f"{mode:>12} {load_time:>9.2f} {elapsed:>10.3f} {peak:>8.1f} {len(sentences):>10} "
+              f"{str(sentences == reference):>13}")
+
+
+if __name__ == "__main__":
+    main()
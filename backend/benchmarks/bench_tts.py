@@ -0,0 +1,67 @@
+"""
+Benchmark: single-shot vs sentence-chunked TTS for a 10-card deck
+Usage: python -m benchmarks.bench_tts [--engine stub|gtts|espeak] [--workers 4]
+
+The stub engine simulates a network engine with a fixed per-request
+latency plus a per-character cost (gTTS sends one request per ~100
+characters, one after another). Audio is synthesized directly, bypassing
+the audio cache.
+"""
+
+import argparse
+import tempfile
+import time
+
+from app.services.tts_backends import StubBackend, create_backend
+from app.services.tts_service import TTSService
+
+DECK = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "Mitochondria produce most of the cell's supply of adenosine triphosphate.",
+    "The Treaty of Westphalia ended the Thirty Years' War in 1648.",
+    "Newton's second law states that force equals mass times acceleration.",
+    "An enzyme lowers the activation energy of a chemical reaction.",
+    "The French Revolution began with the storming of the Bastille in 1789.",
+    "DNA replication is semi-conservative, keeping one original strand.",
+    "Supply and demand determine the equilibrium price in a market.",
+    "The mitochondrial membrane potential drives ATP synthase.",
+    "Plate tectonics explains earthquakes, volcanoes and mountain ranges.",
+]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--engine", default="stub")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-chars", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--per-char-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    backend = (StubBackend(args.latency_ms / 1000, args.per_char_ms / 1000)
+               if args.engine == "stub" else create_backend(args.engine))
+    service = TTSService(audio_dir=tempfile.mkdtemp(), backend=backend)
+    service.chunk_workers = args.workers
+    deck_text = " ".join(DECK)
+
+    service.chunk_chars = 0
+    per_card = timed(lambda: [service.synthesize(card, "en") for card in DECK])
+    single = timed(lambda: service.synthesize(deck_text, "en"))
+    service.chunk_chars = args.chunk_chars
+    chunked = timed(lambda: service.synthesize(deck_text, "en"))
+
+    print(f"engine={backend.name} cards={len(DECK)} chars={len(deck_text)} workers={args.workers}")
+    print(f"{'mode':>28} {'latency (s)':>12}")
+    print(f"{'one request per card':>28} {per_card:>12.2f}")
+    print(f"{'whole deck, single shot':>28} {single:>12.2f}")
+    print(f"{'whole deck, chunked':>28} {chunked:>12.2f}  ({single / chunked:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: time to first audio byte, buffered vs streamed TTS downloads
+Usage: python -m benchmarks.bench_tts_stream [--sentences 20] [--engine stub]
+
+Starts the API on a local port and downloads the speech for a long text
+with /tts/generate-and-download, with and without ?stream=true. The stub
+engine simulates per-request latency; every run uses a fresh text so the
+audio cache is not hit.
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import httpx
+
+
+def start_server(port: int):
+    """Run the app with uvicorn in a background thread"""
+    import uvicorn
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def download(client: httpx.Client, text: str, stream: bool) -> tuple:
+    """Return (time to first byte, total time, bytes)"""
+    start = time.perf_counter()
+    first_byte, size = None, 0
+    with client.stream("POST", "/api/v1/tts/generate-and-download",
+                       params={"stream": str(stream).lower()}, json={"text": text}) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(chunk)
+    return first_byte, time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sentences", type=int, default=20)
+    parser.add_argument("--engine", default="stub")
+    parser.add_argument("--latency-ms", default="150")
+    parser.add_argument("--per-char-ms", default="2")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Configure before the app (and its TTS singleton) is imported
+    os.environ.update({
+        "TTS_ENGINE": args.engine,
+        "TTS_STUB_LATENCY_MS": args.latency_ms,
+        "TTS_STUB_PER_CHAR_MS": args.per_char_ms,
+        "AUDIO_DIR": tempfile.mkdtemp(),
+        "MODEL_LOADING": "lazy",
+    })
+    server = start_server(args.port)
+
+    print(f"engine={args.engine} sentences={args.sentences}")
+    print(f"{'mode':>10} {'TTFB (s)':>9} {'total (s)':>10} {'bytes':>9}")
+    with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=300) as client:
+        for stream in (False, True):
+            runs = []
+            for _ in range(args.repeat):
+                nonce = uuid.uuid4().hex[:8]
+                text = " ".join(f"Card {i} explains concept {nonce} in one sentence."
+                                for i in range(args.sentences))
+                runs.append(download(client, text, stream))
+            ttfb, total, size = (sorted(values)[len(values) // 2] for values in zip(*runs))
+            print(f"{'stream' if stream else 'buffered':>10} {ttfb:>9.2f} {total:>10.2f} {size:>9}")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
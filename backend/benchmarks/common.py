@@ -0,0 +1,38 @@
+"""
+Shared helpers for benchmark scripts
+Run benchmarks from the backend directory, e.g. python -m benchmarks.bench_pagerank
+"""
+
+import time
+import numpy as np
+
+
+def synthetic_embeddings(n: int, dim: int = 384, topics: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Generate normalized float32 embeddings clustered around a few topics
+
+    Args:
+        n: Number of sentences
+        dim: Embedding dimension (384 matches all-MiniLM-L6-v2)
+        topics: Number of topic centroids
+        seed: Random seed
+
+    Returns:
+        Array of shape (n, dim)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(topics, dim)) + 1.0
+    labels = rng.integers(0, topics, size=n)
+    embeddings = centroids[labels] + rng.normal(scale=1.5, size=(n, dim))
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings.astype(np.float32)
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    """Return the best wall-clock time of fn() over repeat runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -0,0 +1,115 @@
+"""
+Deterministic synthetic corpora for benchmarks
+Generates study-note prose of a requested word count and renders it as
+page images, with no downloads and identical output on every machine.
+"""
+
+import random
+import textwrap
+
+import cv2
+import numpy as np
+
+TOPICS = {
+    "biology": {
+        "subjects": ["The cell membrane", "Mitochondria", "Photosynthesis", "DNA replication",
+                     "The immune system", "Natural selection", "An enzyme", "The nervous system"],
+        "verbs": ["regulates", "converts", "depends on", "produces", "protects", "transports"],
+        "objects": ["chemical energy", "glucose molecules", "genetic information", "foreign pathogens",
+                    "electrical signals", "the rate of reaction", "nutrients and waste"],
+    },
+    "history": {
+        "subjects": ["The French Revolution", "The Industrial Revolution", "The Roman Empire",
+                     "The printing press", "The Treaty of Versailles", "The Silk Road"],
+        "verbs": ["reshaped", "weakened", "expanded", "connected", "challenged", "financed"],
+        "objects": ["European politics", "trade between continents", "the power of the monarchy",
+                    "urban working conditions", "the spread of ideas", "national borders"],
+    },
+    "computing": {
+        "subjects": ["A hash table", "Machine learning", "The operating system", "A compiler",
+                     "Public key cryptography", "A binary search tree", "The network stack"],
+        "verbs": ["schedules", "optimizes", "encrypts", "indexes", "translates", "balances"],
+        "objects": ["memory access", "labelled examples", "source code into machine code",
+                    "messages between parties", "lookups in constant time", "packets across links"],
+    },
+    "economics": {
+        "subjects": ["Supply and demand", "Inflation", "The central bank", "Comparative advantage",
+                     "A monopoly", "Fiscal policy", "Consumer confidence"],
+        "verbs": ["determines", "erodes", "influences", "limits", "stimulates", "reflects"],
+        "objects": ["the market price", "purchasing power", "interest rates", "international trade",
+                    "competition", "aggregate demand", "household spending"],
+    },
+}
+
+CONNECTIVES = ["In particular,", "As a result,", "For example,", "However,", "In practice,", "Historically,"]
+CLAUSES = ["which explains why", "because", "so that", "even though", "while"]
+
+
+def _sentence(rng: random.Random, topic: dict) -> str:
+    """One sentence of 6 to roughly 30 words"""
+    parts = []
+    if rng.random() < 0.3:
+        parts.append(rng.choice(CONNECTIVES))
+    subject = rng.choice(topic["subjects"])
+    parts.append(subject[0].lower() + subject[1:] if parts else subject)
+    parts += [rng.choice(topic["verbs"]), rng.choice(topic["objects"])]
+    if rng.random() < 0.5:
+        other = rng.choice(topic["subjects"])
+        parts += [rng.choice(CLAUSES), other[0].lower() + other[1:],
+                  rng.choice(topic["verbs"]), rng.choice(topic["objects"])]
+    if rng.random() < 0.2:
+        parts.append(f"in {rng.randint(1500, 2020)}")
+    return " ".join(parts) + "."
+
+
+def make_corpus(words: int, seed: int = 0) -> str:
+    """
+    Generate deterministic prose of at least the requested word count
+
+    Paragraphs of three to seven sentences stay on one topic and are
+    separated by blank lines, like pasted study notes.
+
+    Args:
+        words: Minimum number of words
+        seed: Random seed; the same (words, seed) always gives the same text
+
+    Returns:
+        Corpus text
+    """
+    rng = random.Random(seed)
+    paragraphs, count = [], 0
+    while count < words:
+        topic = TOPICS[rng.choice(sorted(TOPICS))]
+        sentences = [_sentence(rng, topic) for _ in range(rng.randint(3, 7))]
+        paragraphs.append(" ".join(sentences))
+        count += sum(len(sentence.split()) for sentence in sentences)
+    return "\n\n".join(paragraphs)
+
+
+def render_pages(text: str, lines_per_page: int = 24, chars_per_line: int = 60) -> list:
+    """
+    Render text as black-on-white BGR page images
+
+    Args:
+        text: Text to render (paragraph breaks are kept as blank lines)
+        lines_per_page: Text lines per page
+        chars_per_line: Wrap width in characters
+
+    Returns:
+        List of (image, page text) tuples
+    """
+    lines = []
+    for paragraph in text.split("\n\n"):
+        lines += textwrap.wrap(paragraph, chars_per_line) + [""]
+
+    pages = []
+    line_height, margin = 40, 40
+    for start in range(0, len(lines), lines_per_page):
+        page_lines = lines[start:start + lines_per_page]
+        img = np.full((margin * 2 + line_height * lines_per_page, chars_per_line * 17 + margin * 2, 3),
+                      255, dtype=np.uint8)
+        for row, line in enumerate(page_lines):
+            cv2.putText(img, line, (margin, margin + line_height * (row + 1) - 12),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0, 0, 0), 2, cv2.LINE_AA)
+        pages.append((img, " ".join(line for line in page_lines if line)))
+    return pages
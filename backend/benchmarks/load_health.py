@@ -0,0 +1,71 @@
+"""
+Load test: /health latency while flashcard generation jobs run
+Start the API first (uvicorn app.main:app --port 8000), then run:
+    python -m benchmarks.load_health --url http://localhost:8000 --jobs 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+SAMPLE_TEXT = " ".join(
+    f"Sentence {i} explains how topic {i % 7} relates to machine learning and data analysis."
+    for i in range(300)
+)
+
+
+async def poll_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> list:
+    """Measure /health round-trip latency until stop is set"""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def generate(client: httpx.AsyncClient, index: int) -> int:
+    """Submit one generation job with a unique text so the result cache misses"""
+    response = await client.post(
+        "/api/v1/flashcards/text", json={"text": f"Run {index} {time.time()}. {SAMPLE_TEXT}"}
+    )
+    return response.status_code
+
+
+def summarize(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    print(f"{label:>14}: n={len(latencies):4d} median={statistics.median(latencies) * 1000:7.1f}ms "
+          f"p95={p95 * 1000:7.1f}ms max={latencies[-1] * 1000:7.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=300) as client:
+        # Baseline: idle server
+        stop = asyncio.Event()
+        idle = asyncio.create_task(poll_health(client, stop, args.interval))
+        await asyncio.sleep(2)
+        stop.set()
+        summarize("idle", await idle)
+
+        # Under load: generation jobs in flight
+        stop = asyncio.Event()
+        loaded = asyncio.create_task(poll_health(client, stop, args.interval))
+        codes = await asyncio.gather(*(generate(client, i) for i in range(args.jobs)))
+        stop.set()
+        summarize("during jobs", await loaded)
+        print(f"job status codes: {sorted(set(codes))}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
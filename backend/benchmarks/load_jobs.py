@@ -0,0 +1,79 @@
+"""
+Load test: /health latency while queued flashcard jobs drain
+Start the API first (uvicorn app.main:app --port 8000), then run:
+    python -m benchmarks.load_jobs --url http://localhost:8000 --jobs 100
+
+All jobs are submitted at once; the script then polls until every job
+has finished, measuring /health round trips the whole time.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.load_health import SAMPLE_TEXT, poll_health, summarize
+
+
+async def submit(client: httpx.AsyncClient, index: int) -> tuple:
+    """Queue one job with a unique text; return (submit latency, status URL)"""
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/v1/jobs/flashcards", json={"text": f"Run {index} {time.time()}. {SAMPLE_TEXT}"}
+    )
+    response.raise_for_status()
+    return time.perf_counter() - start, response.json()["status_url"]
+
+
+async def wait_all(client: httpx.AsyncClient, status_urls: list, interval: float) -> dict:
+    """Poll job status until all jobs are finished; return final statuses"""
+    pending = set(status_urls)
+    statuses = {}
+    while pending:
+        await asyncio.sleep(interval)
+        for url in list(pending):
+            job = (await client.get(url)).json()
+            if job["status"] in ("completed", "failed"):
+                statuses[url] = job
+                pending.discard(url)
+    return statuses
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        # Baseline: idle server
+        stop = asyncio.Event()
+        idle = asyncio.create_task(poll_health(client, stop, args.interval))
+        await asyncio.sleep(2)
+        stop.set()
+        summarize("idle", await idle)
+
+        # Under load: submit everything, then wait for the queue to drain
+        stop = asyncio.Event()
+        loaded = asyncio.create_task(poll_health(client, stop, args.interval))
+        start = time.perf_counter()
+        submissions = await asyncio.gather(*(submit(client, i) for i in range(args.jobs)))
+        submitted_in = time.perf_counter() - start
+        statuses = await wait_all(client, [url for _, url in submissions], args.poll_interval)
+        drained_in = time.perf_counter() - start
+        stop.set()
+
+        summarize("submit", [latency for latency, _ in submissions])
+        summarize("during drain", await loaded)
+        completed = sum(job["status"] == "completed" for job in statuses.values())
+        queue_wait = sorted(job["started_at"] - job["created_at"] for job in statuses.values())
+        print(f"{args.jobs} jobs submitted in {submitted_in:.2f}s, drained in {drained_in:.1f}s "
+              f"({completed} completed, {args.jobs - completed} failed)")
+        print(f"queue wait: median={queue_wait[len(queue_wait) // 2]:.1f}s max={queue_wait[-1]:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,280 @@
+"""
+Benchmark suite: per-stage latency, throughput and peak memory of the pipeline
+Usage:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output new.json --baseline results.json [--threshold 0.2]
+    python -m benchmarks.suite --input new.json --baseline results.json
+
+Runs offline by default: the blank spaCy tokenizer with a sentencizer and
+the hashing embedder, with the embedding cache and batcher off. Set
+SPACY_MODEL, SPACY_SEGMENTATION or EMBEDDING_BACKEND to benchmark the
+real models instead. OCR recognition is measured only when Tesseract is
+installed; OCR preprocessing always is.
+
+Results are keyed by stage and corpus size. Comparing against a baseline
+flags any stage whose median latency or peak memory grew by more than the
+threshold, and exits with status 1 if any did.
+"""
+
+import argparse
+import difflib
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import make_corpus, render_pages
+
+OFFLINE_DEFAULTS = {
+    "SPACY_MODEL": "blank:en",
+    "SPACY_SEGMENTATION": "sentencizer",
+    "EMBEDDING_BACKEND": "hashing",
+    "EMBEDDING_CACHE_ENABLED": "false",
+    "EMBEDDING_BATCH_ENABLED": "false",
+    "METRICS_DB_PATH": "",
+}
+
+SIZES = (100, 1000, 10000, 50000)
+
+# Latency changes smaller than this are timer noise, not regressions
+MIN_SECONDS = 0.002
+MIN_MB = 1.0
+
+
+def measure(fn, repeat: int) -> dict:
+    """
+    Time fn over repeat runs, then run it once more under tracemalloc
+
+    Returns:
+        Dict with median_s, min_s and peak_mb (Python-allocated memory)
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_s": round(statistics.median(timings), 6),
+        "min_s": round(min(timings), 6),
+        "peak_mb": round(peak / 1e6, 2),
+    }
+
+
+def run_text_stages(words: int, repeat: int) -> list:
+    """Measure each flashcard pipeline stage on a corpus of the given size"""
+    from app.services.flashcard_service import SPARSE_GRAPH_MIN_SENTENCES, FlashcardService
+    from app.services.nlp_pipeline import nlp_pipeline
+
+    text = make_corpus(words)
+    word_count = len(text.split())
+    sentences = nlp_pipeline.preprocess_text(text)
+    embeddings = nlp_pipeline.generate_embeddings(sentences)
+    if len(sentences) > SPARSE_GRAPH_MIN_SENTENCES:
+        similarity = lambda: nlp_pipeline.calculate_sparse_similarity_matrix(embeddings)
+    else:
+        similarity = lambda: nlp_pipeline.calculate_similarity_matrix(embeddings)
+    matrix = similarity()
+    scores = nlp_pipeline.rank_sentences_pagerank(matrix)
+
+    stages = {
+        "preprocess": lambda: nlp_pipeline.preprocess_text(text),
+        "embedding": lambda: nlp_pipeline.generate_embeddings(sentences),
+        "similarity": similarity,
+        "pagerank": lambda: nlp_pipeline.rank_sentences_pagerank(matrix),
+        "selection": lambda: FlashcardService.select_flashcards(text, sentences, scores),
+        "end_to_end": lambda: FlashcardService.generate_flashcards(text),
+    }
+    results = []
+    for stage, fn in stages.items():
+        result = measure(fn, repeat)
+        results.append({
+            "stage": stage,
+            "words": word_count,
+            "items": len(sentences),
+            **result,
+            "words_per_s": round(word_count / max(result["median_s"], 1e-9), 1),
+        })
+    return results
+
+
+def tesseract_available() -> bool:
+    """Whether the configured OCR backend can run"""
+    from app.services.ocr_service import ocr_service
+
+    if ocr_service.backend == "tesserocr":
+        return True
+    import pytesseract
+
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except (pytesseract.TesseractNotFoundError, OSError):
+        return False
+
+
+def run_ocr_stages(words: int, repeat: int) -> list:
+    """Measure OCR preprocessing (and recognition, if available) on rendered pages"""
+    from app.services.ocr_service import ocr_service
+
+    pages = render_pages(make_corpus(words))
+    word_count = sum(len(page_text.split()) for _, page_text in pages)
+    processed = [ocr_service.preprocess_image(img) for img, _ in pages]
+
+    stages = {"ocr_preprocess": lambda: [ocr_service.preprocess_image(img) for img, _ in pages]}
+    recognize = None
+    if tesseract_available():
+        recognize = lambda: [ocr_service.recognize(img) for img in processed]
+        stages["ocr_recognize"] = recognize
+    else:
+        print("Tesseract not found; skipping ocr_recognize", file=sys.stderr)
+
+    results = []
+    for stage, fn in stages.items():
+        result = measure(fn, repeat)
+        results.append({
+            "stage": stage,
+            "words": word_count,
+            "items": len(pages),
+            **result,
+            "words_per_s": round(word_count / max(result["median_s"], 1e-9), 1),
+        })
+
+    if recognize is not None:
+        # Character accuracy guards against "faster" preprocessing that breaks OCR
+        recognized = recognize()
+        accuracy = statistics.mean(
+            difflib.SequenceMatcher(None, " ".join(text.split()), expected).ratio()
+            for text, (_, expected) in zip(recognized, pages)
+        )
+        results[-1]["char_accuracy"] = round(accuracy, 4)
+    return results
+
+
+def environment() -> dict:
+    """Settings that make results comparable (or not) across runs"""
+    from app.services.nlp_pipeline import nlp_pipeline
+    from app.services.ocr_service import ocr_service
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "spacy_model": nlp_pipeline.spacy_model,
+        "segmentation": nlp_pipeline.segmentation_mode,
+        "embedding": nlp_pipeline.embedding_identity,
+        "ocr_backend": ocr_service.backend,
+    }
+
+
+def result_key(result: dict) -> str:
+    return f"{result['stage']}@{result['words']}"
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Find stages that got slower or used more memory than the baseline allows
+
+    Args:
+        baseline: Earlier suite output
+        current: New suite output
+        threshold: Allowed relative growth, e.g. 0.2 for 20%
+
+    Returns:
+        List of (key, metric, baseline value, current value) regressions
+    """
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        for metric, floor in (("median_s", MIN_SECONDS), ("peak_mb", MIN_MB)):
+            old, new = before[metric], result[metric]
+            if new > old * (1 + threshold) and new - old > floor:
+                regressions.append((result_key(result), metric, old, new))
+    return regressions
+
+
+def print_results(current: dict, baseline: dict = None):
+    previous = {result_key(result): result for result in (baseline or {}).get("results", [])}
+    print(f"{'stage':>15} {'words':>7} {'items':>6} {'median (ms)':>12} {'words/s':>11} {'peak MB':>8}"
+          + (f" {'vs baseline':>12}" if previous else ""))
+    for result in current["results"]:
+        line = (f"{result['stage']:>15} {result['words']:>7} {result['items']:>6} "
+                f"{result['median_s'] * 1000:>12.2f} {result['words_per_s']:>11.0f} {result['peak_mb']:>8.2f}")
+        before = previous.get(result_key(result))
+        if before is not None and before["median_s"]:
+            line += f" {result['median_s'] / before['median_s']:>11.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Corpus sizes in words")
+    parser.add_argument("--ocr-words", type=int, default=1000, help="Words rendered into OCR pages (0 = skip OCR)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--input", help="Compare an existing results file instead of running")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative growth (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input) as f:
+            current = json.load(f)
+    else:
+        for name, value in OFFLINE_DEFAULTS.items():
+            os.environ.setdefault(name, value)
+        from app.services.nlp_pipeline import nlp_pipeline
+
+        nlp_pipeline.load()
+        results = []
+        for words in map(int, args.sizes.split(",")):
+            results += run_text_stages(words, args.repeat)
+        if args.ocr_words:
+            results += run_ocr_stages(args.ocr_words, args.repeat)
+        current = {
+            "created_at": time.time(),
+            "environment": environment(),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "results": results,
+        }
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(current, baseline)
+    if baseline is None:
+        return
+
+    if baseline.get("environment") != current.get("environment"):
+        print("warning: baseline was recorded with different settings:", file=sys.stderr)
+        for name, value in current.get("environment", {}).items():
+            if baseline.get("environment", {}).get(name) != value:
+                print(f"  {name}: {baseline.get('environment', {}).get(name)} -> {value}", file=sys.stderr)
+
+    regressions = compare_results(baseline, current, args.threshold)
+    for key, metric, old, new in regressions:
+        print(f"REGRESSION {key} {metric}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
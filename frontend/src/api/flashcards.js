@@ -25,6 +25,39 @@ export const generateFlashcardsFromText = async (text) => {
   }
 };
 
+/**
+ * Stream flashcard generation (NDJSON events)
+ * Calls onEvent for each stage/card/done event; abort via signal to stop the pipeline
+ */
+export const streamFlashcardsFromText = async (text, onEvent, signal) => {
+  const response = await fetch(`${API_BASE_URL}/flashcards/text/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ text }),
+    signal,
+  });
+  if (!response.ok) {
+    throw new Error(`Streaming request failed: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.filter(Boolean).forEach((line) => onEvent(JSON.parse(line)));
+  }
+  if (buffer.trim()) {
+    onEvent(JSON.parse(buffer));
+  }
+};
+
 /**
  * Extract text from image (OCR)
  */
@@ -88,6 +121,27 @@ export const generateAudio = async (text) => {
   }
 };
 
+/**
+ * URL that streams speech for an <audio> element
+ * Playback starts with the first synthesized sentence instead of after the whole file
+ */
+export const getStreamingAudioUrl = (text) =>
+  `${API_BASE_URL}/tts/stream?text=${encodeURIComponent(text)}`;
+
+/**
+ * Generate audio for a whole deck in one request
+ * format: 'track' (one file with per-card offsets) or 'zip' (one file per card)
+ */
+export const generateDeckAudio = async (flashcards, format = 'track') => {
+  try {
+    const response = await api.post('/tts/deck', { flashcards, format });
+    return response.data;
+  } catch (error) {
+    console.error('Error generating deck audio:', error);
+    throw error;
+  }
+};
+
 /**
  * Get usage statistics
  */
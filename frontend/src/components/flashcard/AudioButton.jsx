@@ -1,28 +1,17 @@
 import { useState } from 'react';
 import { Volume2, Loader } from 'lucide-react';
-import { generateAudio } from '../../api/flashcards';
+import { getStreamingAudioUrl } from '../../api/flashcards';
 
 const AudioButton = ({ text }) => {
   const [loading, setLoading] = useState(false);
-  const [audioUrl, setAudioUrl] = useState(null);
 
   const handlePlayAudio = async () => {
     try {
       setLoading(true);
 
-      // Generate audio from backend
-      const url = await generateAudio(text);
-      setAudioUrl(url);
-
-      // Play audio
-      const audio = new Audio(url);
-      audio.play();
-
-      // Cleanup URL after playing
-      audio.onended = () => {
-        URL.revokeObjectURL(url);
-        setAudioUrl(null);
-      };
+      // Stream audio from backend; playback starts with the first sentence
+      const audio = new Audio(getStreamingAudioUrl(text));
+      await audio.play();
     } catch (error) {
       console.error('Failed to play audio:', error);
       alert('Failed to generate audio');